@@ -2,21 +2,19 @@
 
 # TODO:
 # - merge with link-checker.py?
-# - cache the status results in the database, limit the number of checks per URL per day (and week/month too)
 # - per-domain whitelist for HTTP to HTTPS conversion (more suitable for link-checker.py, unless we need to compare the results for both requests)
 # - GRRR: When you get 404, unless you have Javascript enabled, in which case the code loaded on the 404 page might execute a redirection to a different address. Example: https://nzbget.net/Performance_tips
 
 import logging
 import datetime
 import ipaddress
-import asyncio
-from concurrent.futures import ThreadPoolExecutor
 
 import requests
 import requests.packages.urllib3 as urllib3
 import mwparserfromhell
 
 from ws.client import API, APIError
+from ws.checkers import URLStatusCache, CircuitBreaker, URLCheckPool
 from ws.interactive import edit_interactive, require_login, InteractiveQuit
 import ws.ArchWiki.lang as lang
 from ws.parser_helpers.wikicode import get_parent_wikicode, ensure_flagged_by_template, ensure_unflagged_by_template
@@ -25,10 +23,17 @@ logger = logging.getLogger(__name__)
 
 
 class ExtlinkStatusChecker:
-    def __init__(self, timeout, max_retries):
+    def __init__(self, timeout, max_retries, url_cache=None, max_workers=20, max_per_host=2, host_failure_threshold=5):
         self.timeout = timeout
+        # persistent cache (ws.checkers.URLStatusCache) shared by multiple runs
+        self.url_cache = url_cache
+        # skip hosts which repeatedly fail to respond
+        self.breaker = CircuitBreaker(threshold=host_failure_threshold)
+        self.pool = URLCheckPool(self.check_url, lambda url: url.host, max_workers=max_workers,
+                                 max_per_host=max_per_host, breaker=self.breaker)
+        # the session is shared by all workers, connections are reused for each host
         self.session = requests.Session()
-        adapter = requests.adapters.HTTPAdapter(max_retries=max_retries)
+        adapter = requests.adapters.HTTPAdapter(max_retries=max_retries, pool_connections=max_workers, pool_maxsize=max_per_host)
         self.session.mount("https://", adapter)
         self.session.mount("http://", adapter)
 
@@ -43,12 +48,22 @@ class ExtlinkStatusChecker:
         self.cache_invalid_urls = {}
         # indeterminate - 3xx, 5xx
         self.cache_indeterminate_urls = set()
+        # URLs which could not be checked due to connection errors (only for the current run)
+        self.cache_failed_urls = set()
 
         now = datetime.datetime.utcnow()
         self.deadlink_params = [now.year, now.month, now.day]
         self.deadlink_params = ["{:02d}".format(i) for i in self.deadlink_params]
 
-    def check_extlink_status(self, wikicode, extlink):
+    def get_extlink_url(self, wikicode, extlink):
+        """
+        Get the normalized URL of an external link to be checked. Note that the
+        wikicode may be modified if the link is immediately followed by a
+        template.
+
+        :returns: a :py:class:`urllib3.util.url.Url` object, or ``None`` if
+                  the link should not be checked
+        """
         # make a copy of the URL object (the skip_style_flags parameter is False,
         # so we will also properly parse URLs terminated by a wiki markup)
         url = mwparserfromhell.parse(str(extlink.url))
@@ -110,8 +125,45 @@ class ExtlinkStatusChecker:
         # drop the fragment from the URL (to optimize caching)
         if url.fragment:
             url = urllib3.util.url.parse_url(url.url.rsplit("#", maxsplit=1)[0])
+        return url
 
-        logger.info("Checking link {} ...".format(extlink))
+    def get_extlink_urls(self, wikicode):
+        """
+        Returns a list of ``(extlink, url)`` tuples for all external links to be
+        checked in the wikicode. See :py:meth:`get_extlink_url`.
+        """
+        result = []
+        for extlink in wikicode.filter_external_links(recursive=True):
+            url = self.get_extlink_url(wikicode, extlink)
+            if url is not None:
+                result.append((extlink, url))
+        return result
+
+    def check_urls(self, urls):
+        """
+        Check all given URLs concurrently. The results are saved in the caches,
+        so that the following calls to :py:meth:`check_url` do not make any
+        requests.
+        """
+        urls = set(url for url in urls if not self._is_cached(url))
+        if not urls:
+            return
+        logger.info("Checking {} URLs on {} hosts ...".format(len(urls), len(set(url.host for url in urls))))
+        for i, (url, status) in enumerate(self.pool.run(urls), start=1):
+            if i % 1000 == 0:
+                logger.info("Checked {} of {} URLs".format(i, len(urls)))
+
+    def _is_cached(self, url):
+        return (url in self.cache_valid_urls or
+                url in self.cache_invalid_urls or
+                url in self.cache_indeterminate_urls or
+                url in self.cache_failed_urls)
+
+    def check_extlink_status(self, wikicode, extlink, url=None):
+        if url is None:
+            url = self.get_extlink_url(wikicode, extlink)
+            if url is None:
+                return
 
         status = self.check_url(url)
         if status is True:
@@ -143,9 +195,23 @@ class ExtlinkStatusChecker:
             return True
         elif url in self.cache_invalid_urls:
             return False
-        elif url in self.cache_indeterminate_urls:
+        elif url in self.cache_indeterminate_urls or url in self.cache_failed_urls:
+            return None
+
+        if not self.breaker.allow(url.host):
+            logger.debug("skipped URL {} on a host which does not respond".format(url))
             return None
 
+        if self.url_cache is not None:
+            cached = self.url_cache.get(url.url)
+            if cached is not None:
+                logger.debug("using cached status {} for URL {}".format(cached, url))
+                return self._set_status(url, *cached, persistent=False)
+            if not self.url_cache.acquire_check(url.host):
+                logger.warning("the limit of checks per day has been reached for the domain {}, skipping URL {}".format(url.host, url))
+                return None
+
+        logger.info("Checking URL {} ...".format(url))
         try:
             # We need to use GET requests instead of HEAD, because many servers just return 404
             # (or do not reply at all) to HEAD requests. Instead, we skip the downloading of the
@@ -154,42 +220,66 @@ class ExtlinkStatusChecker:
         # SSLError inherits from ConnectionError so it has to be checked first
         except requests.exceptions.SSLError as e:
             logger.error("SSLError ({}) for URL {}".format(e, url))
-            self.cache_invalid_urls[url] = "SSL error"
-            return False
+            return self._set_status(url, "invalid", "SSL error")
         except requests.exceptions.ConnectionError as e:
             # TODO: how to handle DNS errors properly?
             if "name or service not known" in str(e).lower():
                 logger.error("domain name could not be resolved for URL {}".format(url))
-                self.cache_invalid_urls[url] = "domain name not resolved"
-                return False
-            # other connection error - indeterminate, do not cache
+                return self._set_status(url, "invalid", "domain name not resolved")
+            # other connection error - indeterminate, do not cache persistently
+            self.breaker.record_failure(url.host)
+            self.cache_failed_urls.add(url)
             return None
         except requests.exceptions.TooManyRedirects as e:
             logger.error("TooManyRedirects error ({}) for URL {}".format(e, url))
-            self.cache_invalid_urls[url] = "too many redirects"
-            return False
+            return self._set_status(url, "invalid", "too many redirects")
+        except requests.exceptions.Timeout:
+            logger.warning("timeout for URL {}".format(url))
+            self.breaker.record_failure(url.host)
+            self.cache_failed_urls.add(url)
+            return None
         except requests.exceptions.RequestException as e:
             # base class exception - indeterminate error, do not cache
             logger.exception("URL {} could not be checked due to {}".format(url, e))
             return None
 
+        self.breaker.record_success(url.host)
         if response.status_code >= 200 and response.status_code < 300:
-            self.cache_valid_urls.add(url)
-            return True
+            return self._set_status(url, "valid", response.status_code)
         elif response.status_code >= 400 and response.status_code < 500:
             logger.error("status code {} for URL {}".format(response.status_code, url))
-            self.cache_invalid_urls[url] = response.status_code
-            return False
+            return self._set_status(url, "invalid", response.status_code)
         else:
             logger.warning("status code {} for URL {}".format(response.status_code, url))
+            return self._set_status(url, "indeterminate", response.status_code)
+
+    def _set_status(self, url, status, reason, *, persistent=True):
+        """
+        Save the status of the URL in the caches.
+
+        :returns: ``True``, ``False`` or ``None`` for valid, invalid and
+                  indeterminate URLs, respectively
+        """
+        if persistent is True and self.url_cache is not None:
+            self.url_cache.set(url.url, status, reason)
+        if status == "valid":
+            self.cache_valid_urls.add(url)
+            return True
+        elif status == "invalid":
+            self.cache_invalid_urls[url] = reason
+            return False
+        else:
             self.cache_indeterminate_urls.add(url)
             return None
 
 
 class Checker(ExtlinkStatusChecker):
-    def __init__(self, api, first=None, title=None, langnames=None, connection_timeout=60, max_retries=3):
+    def __init__(self, api, first=None, title=None, langnames=None, connection_timeout=60, max_retries=3, url_cache=None,
+                 max_workers=20, max_per_host=2, host_failure_threshold=5):
         # init inherited
-        ExtlinkStatusChecker.__init__(self, connection_timeout, max_retries)
+        ExtlinkStatusChecker.__init__(self, connection_timeout, max_retries, url_cache=url_cache,
+                                      max_workers=max_workers, max_per_host=max_per_host,
+                                      host_failure_threshold=host_failure_threshold)
 
         # ensure that we are authenticated
         require_login(api)
@@ -207,6 +297,8 @@ class Checker(ExtlinkStatusChecker):
         present_groups = [group.title for group in argparser._action_groups]
         if "Connection parameters" not in present_groups:
             API.set_argparser(argparser)
+        if "URL status cache" not in present_groups:
+            URLStatusCache.set_argparser(argparser)
 
         group = argparser.add_argument_group(title="script parameters")
         mode = group.add_mutually_exclusive_group()
@@ -216,6 +308,12 @@ class Checker(ExtlinkStatusChecker):
                 help="the title of the only page to be processed")
         group.add_argument("--lang", default="en",
                 help="comma-separated list of language tags to process (default: en, choices: {})".format(lang.get_internal_tags()))
+        group.add_argument("--max-workers", type=int, default=20, metavar="N",
+                help="maximum number of concurrent requests (default: %(default)s)")
+        group.add_argument("--max-connections-per-host", type=int, default=2, metavar="N",
+                help="maximum number of concurrent requests to one host (default: %(default)s)")
+        group.add_argument("--host-failure-threshold", type=int, default=5, metavar="N",
+                help="number of consecutive connection failures after which the host is skipped (default: %(default)s)")
 
     @classmethod
     def from_argparser(klass, args, api=None):
@@ -230,9 +328,11 @@ class Checker(ExtlinkStatusChecker):
             langnames = {lang.langname_for_tag(tag) for tag in tags}
         else:
             langnames = set()
-        return klass(api, first=args.first, title=args.title, langnames=langnames, connection_timeout=args.connection_timeout, max_retries=args.connection_max_retries)
+        url_cache = URLStatusCache.from_argparser(args)
+        return klass(api, first=args.first, title=args.title, langnames=langnames, connection_timeout=args.connection_timeout, max_retries=args.connection_max_retries, url_cache=url_cache,
+                     max_workers=args.max_workers, max_per_host=args.max_connections_per_host, host_failure_threshold=args.host_failure_threshold)
 
-    async def update_page(self, src_title, text):
+    def update_page(self, src_title, text):
         """
         Parse the content of the page and call various methods to update the links.
 
@@ -245,23 +345,12 @@ class Checker(ExtlinkStatusChecker):
         # FIXME: skip_style_tags=True is a partial workaround for https://github.com/earwig/mwparserfromhell/issues/40
         wikicode = mwparserfromhell.parse(text, skip_style_tags=True)
 
-        # We could use the default single-threaded executor with basically the same performance
-        # (because of Python's GIL), but the ThreadPoolExecutor allows to limit the maximum number
-        # of workers and thus the maximum number of concurrent connections.
-        with ThreadPoolExecutor(max_workers=10) as executor:
-            with requests.Session() as session:
-                loop = asyncio.get_event_loop()
-                tasks = [
-                    loop.run_in_executor(
-                        executor,
-                        self.check_extlink_status,
-                        # a way to pass multiple arguments to the check_extlink_status method
-                        *(wikicode, extlink)
-                    )
-                    for extlink in wikicode.ifilter_external_links(recursive=True)
-                ]
-                for result in await asyncio.gather(*tasks):
-                    pass
+        extlinks = self.get_extlink_urls(wikicode)
+        # check all links on the page concurrently (does nothing if the URLs
+        # were already checked by process_allpages)
+        self.check_urls(url for extlink, url in extlinks)
+        for extlink, url in extlinks:
+            self.check_extlink_status(wikicode, extlink, url)
 
         edit_summary = "update status of external links (interactive)"
         return str(wikicode), edit_summary
@@ -282,10 +371,10 @@ class Checker(ExtlinkStatusChecker):
         page = list(result["pages"].values())[0]
         timestamp = page["revisions"][0]["timestamp"]
         text_old = page["revisions"][0]["slots"]["main"]["*"]
-        text_new, edit_summary = asyncio.run(self.update_page(title, text_old))
+        text_new, edit_summary = self.update_page(title, text_old)
         self._edit(title, page["pageid"], text_new, text_old, timestamp, edit_summary)
 
-    def process_allpages(self, apfrom=None, langnames=None):
+    def _iter_allpages(self, apfrom=None, langnames=None):
         namespaces = [0, 4, 12, 14]
 
         # rewind to the right namespace (the API throws BadTitle error if the
@@ -306,14 +395,28 @@ class Checker(ExtlinkStatusChecker):
                 title = page["title"]
                 if langnames and lang.detect_language(title)[1] not in langnames:
                     continue
-                _title = self.api.Title(title)
-                timestamp = page["revisions"][0]["timestamp"]
-                text_old = page["revisions"][0]["slots"]["main"]["*"]
-                text_new, edit_summary = asyncio.run(self.update_page(title, text_old))
-                self._edit(title, page["pageid"], text_new, text_old, timestamp, edit_summary)
+                yield page
             # the apfrom parameter is valid only for the first namespace
             apfrom = ""
 
+    def process_allpages(self, apfrom=None, langnames=None):
+        # first collect the URLs from all pages and check them at once, so
+        # that the throughput is not limited by the order of the pages
+        urls = set()
+        for page in self._iter_allpages(apfrom, langnames):
+            text = page["revisions"][0]["slots"]["main"]["*"]
+            wikicode = mwparserfromhell.parse(text, skip_style_tags=True)
+            urls.update(url for extlink, url in self.get_extlink_urls(wikicode))
+        self.check_urls(urls)
+
+        # then fetch the pages again and update them with the cached results
+        for page in self._iter_allpages(apfrom, langnames):
+            title = page["title"]
+            timestamp = page["revisions"][0]["timestamp"]
+            text_old = page["revisions"][0]["slots"]["main"]["*"]
+            text_new, edit_summary = self.update_page(title, text_old)
+            self._edit(title, page["pageid"], text_new, text_old, timestamp, edit_summary)
+
     def run(self):
         if self.title is not None:
             checker.process_page(self.title)
@@ -1,11 +1,13 @@
 #! /usr/bin/env python3
 
+import os.path
 import re
 import logging
 
 import mwparserfromhell
 
 from ws.client import API
+from ws.db.database import Database
 from ws.parser_helpers.wikicode import is_redirect
 
 logger = logging.getLogger(__name__)
@@ -71,6 +73,30 @@ class DoubleRedirects:
 
 if __name__ == "__main__":
     import ws.config
-    api = ws.config.object_from_argparser(API, description="Fix double redirects")
+    import ws.logging
+
+    argparser = ws.config.getArgParser(description="Fix double redirects")
+    API.set_argparser(argparser)
+    Database.set_argparser(argparser)
+    _group = argparser.add_argument_group("redirects")
+    _group.add_argument("--use-database", action="store_true",
+            help="read the redirects from the local database (synchronized before use) instead of the API")
+
+    args = argparser.parse_args()
+
+    # set up logging
+    ws.logging.init(args)
+
+    api = API.from_argparser(args)
+
+    if args.use_database:
+        db = Database.from_argparser(args)
+        db.sync_with_api(api)
+        db.sync_revisions_content(api, mode="latest")
+        db.update_parser_cache()
+        api.redirects.map = api.redirects.fetch(db=db)
+    else:
+        api.redirects.load_cache(os.path.join(args.cache_dir, "{}.redirects.json".format(args.site)))
+
     dr = DoubleRedirects(api)
     dr.fixall()
@@ -1,15 +1,25 @@
 #! /usr/bin/env python3
 
+import os.path
+import json
+import logging
+
 from ws.client import API
+from ws.db.database import Database
 from ws.interlanguage.Categorization import Categorization
 from ws.interlanguage.Decategorization import Decategorization
 from ws.interlanguage.CategoryGraph import CategoryGraph
 from ws.interlanguage.InterlanguageLinks import InterlanguageLinks
 from ws.interactive import require_login
+from ws.utils import parse_date, format_date
+
+logger = logging.getLogger(__name__)
 
-modes = ["update", "orphans", "rename"]
+modes = ["update", "update-recent", "orphans", "rename"]
 _modes_desc = {
     "update": "fix categorization of i18n pages, init wanted categories and update all interlanguage links",
+    "update-recent": "update interlanguage links only in the families affected by the changes since the last update (the full 'update' should still be run periodically); "
+                     "this saves time only with --use-database, otherwise the langlinks of all pages are still fetched from the API",
     "orphans": "list all orphans",
     "rename": "rename non-English pages to match the English title after renaming",
 }
@@ -17,8 +27,25 @@ modes_description = "The available modes are:"
 for m in modes:
     modes_description += "\n- '{}': {}".format(m, _modes_desc[m])
 
-def main(args, api):
+def load_last_update(path):
+    """
+    Returns the timestamp of the last update saved in the state file, or
+    ``None`` if the file does not exist.
+    """
+    if not os.path.isfile(path):
+        return None
+    with open(path) as f:
+        return parse_date(json.load(f)["last_update"])
+
+def save_last_update(path, timestamp):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"last_update": format_date(timestamp)}, f)
+
+def main(args, api, db=None):
+    state_path = os.path.join(args.cache_dir, "{}.interlanguage.json".format(args.site))
     if args.mode == "update":
+        timestamp = api.newest_rc_timestamp
         # first fix categorization
         cat = Categorization(api)
         cat.fix_allpages()
@@ -28,14 +55,25 @@ def main(args, api):
         cg = CategoryGraph(api)
         cg.init_wanted_categories()
         # update intelanguage links
-        il = InterlanguageLinks(api)
+        il = InterlanguageLinks(api, db, jobs=args.jobs, fetch_workers=args.fetch_workers)
         il.update_allpages()
+        save_last_update(state_path, timestamp)
+    elif args.mode == "update-recent":
+        il = InterlanguageLinks(api, db, jobs=args.jobs, fetch_workers=args.fetch_workers)
+        since = load_last_update(state_path)
+        if since is None:
+            logger.info("The time of the last update is not known, running the full update.")
+            timestamp = api.newest_rc_timestamp
+            il.update_allpages()
+        else:
+            timestamp = il.update_changed_pages(since)
+        save_last_update(state_path, timestamp)
     elif args.mode == "orphans":
-        il = InterlanguageLinks(api)
+        il = InterlanguageLinks(api, db, jobs=args.jobs, fetch_workers=args.fetch_workers)
         for title in il.find_orphans():
             print("* [[{}]]".format(title))
     elif args.mode == "rename":
-        il = InterlanguageLinks(api)
+        il = InterlanguageLinks(api, db, jobs=args.jobs, fetch_workers=args.fetch_workers)
         il.rename_non_english()
     else:
         raise Exception("Unknown mode: {}".format(args.mode))
@@ -46,8 +84,16 @@ if __name__ == "__main__":
 
     argparser = ws.config.getArgParser(description="Update interlanguage links", epilog=modes_description)
     API.set_argparser(argparser)
+    Database.set_argparser(argparser)
     _group = argparser.add_argument_group("interlanguage")
     _group.add_argument("--mode", choices=modes, default="update", help="operation mode of the script")
+    _group.add_argument("--use-database", action="store_true",
+            help="read the langlinks of all pages from the local database (synchronized before use) instead of the API")
+    _group.add_argument("-j", "--jobs", type=int, default=1, metavar="N",
+            help="number of worker processes for updating the wikicode of the pages (default: %(default)s)")
+    _group.add_argument("--fetch-workers", type=int, default=1, metavar="N",
+            help="number of concurrent queries for the content of the pages to be updated, "
+                 "all queries are subject to the same rate limit (default: %(default)s)")
 
     args = argparser.parse_args()
 
@@ -57,4 +103,9 @@ if __name__ == "__main__":
     api = API.from_argparser(args)
     require_login(api)
 
-    main(args, api)
+    if args.use_database:
+        db = Database.from_argparser(args)
+    else:
+        db = None
+
+    main(args, api, db)
@@ -7,18 +7,18 @@
 #   changes rejected interactively should be logged
 #   warn if the link leads to an archived page
 
-import difflib
 import re
 import logging
 import contextlib
 import datetime
+import multiprocessing
 
 import requests
 import mwparserfromhell
 
 from ws.client import API, APIError
 from ws.db.database import Database
-from ws.utils import LazyProperty
+from ws.utils import LazyProperty, FuzzyIndex, iter_chunks
 from ws.interactive import edit_interactive, require_login, InteractiveQuit
 from ws.diff import diff_highlighted
 import ws.ArchWiki.lang as lang
@@ -29,26 +29,13 @@ from ws.parser_helpers.wikicode import get_anchors, ensure_flagged_by_template,
 logger = logging.getLogger(__name__)
 
 
-def get_ranks(key, iterable):
-    """
-    Get a list of similarity ratios for a key in iterable.
-
-    :param str key: the main key to compare
-    :param iterable:
-        an iterable containing secondary keys to compare against the main key
-    :returns:
-        a list of ``(item, ratio)`` tuples sorted by ``ratio`` in descending
-        order, where ``item`` is an item from ``iterable`` and ``ratio`` its
-        similarity ratio
-    """
-    sm = difflib.SequenceMatcher(a=key)
-    ranks = []
-    for item in iterable:
-        sm.set_seq2(item)
-        ratio = sm.ratio()
-        ranks.append( (item, ratio) )
-    ranks.sort(key=lambda match: match[1], reverse=True)
-    return ranks
+# LinkChecker instance used by the worker processes of LinkChecker.process_allpages
+# (inherited from the parent process on fork)
+_worker_checker = None
+
+def _update_page_worker(args):
+    title, text = args
+    return _worker_checker.update_page(title, text)
 
 
 def get_edit_checker(wikicode, summary_parts):
@@ -207,15 +194,39 @@ class WikilinkRules:
         self.db = db
         self.interactive = interactive
 
-        # mapping of canonical titles to displaytitles
-        self.displaytitles = {}
+        self.void_update_cache = set()
+
+        # mapping of page titles to the (headings, anchors) tuples of their
+        # sections, or None for missing pages (the database is synchronized
+        # only once at startup, so the cache is valid for the whole run)
+        self.sections_cache = {}
+        # mapping of page titles to the FuzzyIndex objects of their anchors
+        self.anchor_indexes = {}
+
+    @LazyProperty
+    def displaytitles(self):
+        """
+        A mapping of canonical titles to displaytitles of all pages.
+
+        It is loaded from the database on first access, i.e. after the
+        database has been synchronized and only when a displaytitle is
+        actually needed (in the interactive mode).
+        """
+        displaytitles = {}
         for ns in self.api.site.namespaces.keys():
             if ns < 0:
                 continue
-            for page in self.api.generator(generator="allpages", gaplimit="max", gapnamespace=ns, prop="info", inprop="displaytitle"):
-                self.displaytitles[page["title"]] = page["displaytitle"]
+            for page in self.db.query(generator="allpages", gaplimit="max", gapnamespace=ns, prop="info", inprop={"displaytitle"}):
+                displaytitles[page["title"]] = page["displaytitle"]
+        return displaytitles
 
-        self.void_update_cache = set()
+    @LazyProperty
+    def titles_index(self):
+        """
+        A :py:class:`ws.utils.FuzzyIndex` of all page titles for suggestions
+        of the targets of broken links.
+        """
+        return FuzzyIndex(self.displaytitles)
 
     def check_trivial(self, wikilink, title):
         """
@@ -364,7 +375,11 @@ class WikilinkRules:
             return
         # report pages without DISPLAYTITLE (red links)
         if title.fullpagename not in self.displaytitles:
-            logger.warning("wikilink to non-existing page: {}".format(wikilink))
+            suggestions = [t for t, _ in self.titles_index.search(title.fullpagename, limit=3, cutoff=0.8)]
+            if suggestions:
+                logger.warning("wikilink to non-existing page: {} (similar titles: {})".format(wikilink, ", ".join(suggestions)))
+            else:
+                logger.warning("wikilink to non-existing page: {}".format(wikilink))
             return
 
         # FIXME: very common false positive
@@ -393,6 +408,51 @@ class WikilinkRules:
                 wikilink.title = first_letter + wikilink.title[1:]
             title.parse(wikilink.title)
 
+    def fetch_sections(self, titles):
+        """
+        Load the section headings and anchors of the given pages into
+        :py:attr:`sections_cache` using one database query.
+
+        :param titles: a set of full page names
+        """
+        sections = dict((title, None) for title in titles)
+        for page in self.db.query(titles=titles, prop="sections", secprop={"title", "anchor"}):
+            if "missing" in page:
+                continue
+            _sections = page.get("sections", [])
+            headings = [section["title"] for section in _sections]
+            anchors = [section["anchor"] for section in _sections]
+            sections[page["title"]] = (headings, anchors)
+        self.sections_cache.update(sections)
+
+    def prefetch_sections(self, src_title, wikilinks):
+        """
+        Load the sections of all pages targeted by the given wikilinks with a
+        section fragment, so that :py:meth:`check_anchor` does not have to
+        query the database for each link separately.
+
+        :param str src_title: the title of the page containing the links
+        :param wikilinks: an iterable of
+            :py:class:`mwparserfromhell.nodes.wikilink.Wikilink` objects
+        """
+        targets = set()
+        for wikilink in wikilinks:
+            try:
+                title = self.api.Title(wikilink.title)
+            except TitleError:
+                continue
+            if title.iwprefix or not title.sectionname:
+                continue
+            target = title.make_absolute(src_title)
+            if target.namespacenumber < 0:
+                continue
+            if target.fullpagename in self.api.redirects.map:
+                target = self.api.Title(self.api.redirects.resolve(target.fullpagename))
+            if target.fullpagename not in self.sections_cache:
+                targets.add(target.fullpagename)
+        if targets:
+            self.fetch_sections(targets)
+
     def check_anchor(self, src_title, wikilink, title):
         """
         :returns:
@@ -427,14 +487,13 @@ class WikilinkRules:
                 anchor_on_redirect_to_section = True
 
         # get lists of section headings and anchors
-        _result = self.db.query(titles=_target_title.fullpagename, prop="sections", secprop={"title", "anchor"})
-        _result = list(_result)
-        assert len(_result) == 1
-        if "missing" in _result[0]:
+        if _target_title.fullpagename not in self.sections_cache:
+            self.fetch_sections({_target_title.fullpagename})
+        sections = self.sections_cache[_target_title.fullpagename]
+        if sections is None:
             logger.error("could not find content of page: '{}' (wikilink {})".format(_target_title.fullpagename, wikilink))
             return None
-        headings = [section["title"] for section in _result[0].get("sections", [])]
-        anchors = [section["anchor"] for section in _result[0].get("sections", [])]
+        headings, anchors = sections
 
         if len(headings) == 0:
             logger.warning("wikilink with broken section fragment: {}".format(wikilink))
@@ -456,8 +515,9 @@ class WikilinkRules:
         # otherwise try case-insensitive match to detect differences in capitalization
         elif self.interactive is True:
             # FIXME: first detect section renaming properly, fuzzy search should be only the last resort to deal with typos and such
-            ranks = get_ranks(anchor, anchors)
-            ranks = list(filter(lambda rank: rank[1] >= 0.8, ranks))
+            if _target_title.fullpagename not in self.anchor_indexes:
+                self.anchor_indexes[_target_title.fullpagename] = FuzzyIndex(anchors)
+            ranks = self.anchor_indexes[_target_title.fullpagename].search(anchor, limit=2, cutoff=0.8)
             if len(ranks) == 1 or ( len(ranks) >= 2 and ranks[0][1] - ranks[1][1] > 0.2 ):
                 logger.debug("wikilink {}: replacing anchor '{}' with '{}' on similarity level {}".format(wikilink, anchor, ranks[0][0], ranks[0][1]))
                 anchor = ranks[0][0]
@@ -681,7 +741,12 @@ class LinkChecker(ExtlinkRules, WikilinkRules, ManTemplateRules):
     # article status templates, lowercase
     skip_templates = ["accuracy", "archive", "bad translation", "expansion", "laptop style", "merge", "move", "out of date", "remove", "stub", "style", "translateme"]
 
-    def __init__(self, api, db, interactive=False, dry_run=False, first=None, title=None, langnames=None, connection_timeout=30, max_retries=3):
+    def __init__(self, api, db, interactive=False, dry_run=False, first=None, title=None, langnames=None, connection_timeout=30, max_retries=3, jobs=1):
+        if jobs < 1:
+            raise ValueError("The number of jobs must be positive.")
+        if jobs > 1 and interactive is True:
+            raise ValueError("Parallel jobs can't be used in the interactive mode.")
+
         if not dry_run:
             # ensure that we are authenticated
             require_login(api)
@@ -700,10 +765,13 @@ class LinkChecker(ExtlinkRules, WikilinkRules, ManTemplateRules):
         self.first = first
         self.title = title
         self.langnames = langnames
+        self.jobs = jobs
 
         self.db.sync_with_api(api)
         self.db.sync_revisions_content(api, mode="latest")
         self.db.update_parser_cache()
+        # the redirects table is up to date after the sync
+        self.api.redirects.map = self.api.redirects.fetch(db=self.db)
 
     @staticmethod
     def set_argparser(argparser):
@@ -726,6 +794,8 @@ class LinkChecker(ExtlinkRules, WikilinkRules, ManTemplateRules):
                 help="the title of the only page to be processed")
         group.add_argument("--lang", default=None,
                 help="comma-separated list of language tags to process (default: all, choices: {})".format(lang.get_internal_tags()))
+        group.add_argument("-j", "--jobs", type=int, default=1, metavar="N",
+                help="number of worker processes for checking the pages, not allowed in the interactive mode (default: %(default)s)")
 
     @classmethod
     def from_argparser(klass, args, api=None, db=None):
@@ -742,7 +812,7 @@ class LinkChecker(ExtlinkRules, WikilinkRules, ManTemplateRules):
             langnames = {lang.langname_for_tag(tag) for tag in tags}
         else:
             langnames = set()
-        return klass(api, db, interactive=args.interactive, dry_run=args.dry_run, first=args.first, title=args.title, langnames=langnames, connection_timeout=args.connection_timeout, max_retries=args.connection_max_retries)
+        return klass(api, db, interactive=args.interactive, dry_run=args.dry_run, first=args.first, title=args.title, langnames=langnames, connection_timeout=args.connection_timeout, max_retries=args.connection_max_retries, jobs=args.jobs)
 
     def update_page(self, src_title, text):
         """
@@ -775,6 +845,8 @@ class LinkChecker(ExtlinkRules, WikilinkRules, ManTemplateRules):
             with summary("replaced external links"):
                 self.update_extlink(wikicode, extlink)
 
+        self.prefetch_sections(src_title, wikicode.ifilter_wikilinks(recursive=True))
+
         for wikilink in wikicode.ifilter_wikilinks(recursive=True):
             # skip links inside article status templates
             parent = wikicode.get(wikicode.index(wikilink, recursive=True))
@@ -865,19 +937,57 @@ class LinkChecker(ExtlinkRules, WikilinkRules, ManTemplateRules):
             # apfrom must be without namespace prefix
             apfrom = _title.pagename
 
-        for ns in namespaces:
-            for page in self.db.query(generator="allpages", gaplimit="max", gapfilterredir="nonredirects", gapnamespace=ns, gapfrom=apfrom,
-                                      prop="latestrevisions", rvprop={"timestamp", "content"}):
-                title = page["title"]
-                if langnames and lang.detect_language(title)[1] not in langnames:
-                    continue
-                _title = self.api.Title(title)
-                timestamp = page["revisions"][0]["timestamp"]
-                text_old = page["revisions"][0]["*"]
-                text_new, edit_summary = self.update_page(title, text_old)
-                self._edit(title, page["pageid"], text_new, text_old, timestamp, edit_summary)
-            # the apfrom parameter is valid only for the first namespace
-            apfrom = ""
+        pool = None
+        if self.jobs > 1:
+            # evaluate the lazy properties needed by update_page before forking
+            # so that the workers don't fetch them again
+            self.api.Title("Main page")
+            self.api.site.interlanguagemap
+            self.api.redirects.resolved
+            self.extlink_regex
+            # the workers must not share the database connections with the parent
+            self.db.engine.dispose()
+            global _worker_checker
+            _worker_checker = self
+            pool = multiprocessing.get_context("fork").Pool(self.jobs)
+
+        try:
+            for ns in namespaces:
+                pages = self.db.query(generator="allpages", gaplimit="max", gapfilterredir="nonredirects", gapnamespace=ns, gapfrom=apfrom,
+                                      prop="latestrevisions", rvprop={"timestamp", "content"})
+                if langnames:
+                    pages = (page for page in pages if lang.detect_language(page["title"])[1] in langnames)
+                for page, (text_new, edit_summary) in self._update_pages(pages, pool):
+                    timestamp = page["revisions"][0]["timestamp"]
+                    text_old = page["revisions"][0]["*"]
+                    self._edit(page["title"], page["pageid"], text_new, text_old, timestamp, edit_summary)
+                # the apfrom parameter is valid only for the first namespace
+                apfrom = ""
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+
+    def _update_pages(self, pages, pool=None):
+        """
+        Call :py:meth:`update_page` for the given pages, either in this process
+        or in the worker processes of ``pool``.
+
+        :param pages: an iterable of pages with the latest revision content
+        :param pool: an instance of :py:class:`multiprocessing.pool.Pool`
+        :returns: a generator of ``(page, (text_new, edit_summary))`` tuples
+                  in the order of ``pages``
+        """
+        if pool is None:
+            for page in pages:
+                yield page, self.update_page(page["title"], page["revisions"][0]["*"])
+            return
+
+        # limit the number of pages held in memory
+        for chunk in iter_chunks(pages, self.jobs * 16):
+            chunk = list(chunk)
+            args = [(page["title"], page["revisions"][0]["*"]) for page in chunk]
+            yield from zip(chunk, pool.imap(_update_page_worker, args))
 
     def run(self):
         if self.title is not None:
@@ -0,0 +1,106 @@
+#! /usr/bin/env python3
+
+"""
+Micro-benchmark of the timestamp handling in
+:py:meth:`ws.client.connection.Connection.call_api`.
+
+Compares the old approach (``json.loads`` followed by a recursive walk with
+:py:func:`ws.utils.parse_timestamps_in_struct`) with the ``object_hook``
+applied during decoding (:py:func:`ws.utils.timestamps_object_hook`).
+
+A recorded API response can be passed with ``--response``, e.g. saved with
+
+    curl -o response.json "https://wiki.archlinux.org/api.php?action=query&format=json&generator=allpages&gaplimit=50&prop=revisions&rvprop=content|timestamp|user|comment&rvslots=main"
+
+Otherwise a synthetic response of similar structure is generated.
+"""
+
+import argparse
+import copy
+import datetime
+import json
+import timeit
+
+from ws.utils import parse_timestamps_in_struct, timestamps_object_hook, \
+                     serialize_timestamps_in_struct, serialize_timestamps_in_params
+
+def synthetic_response(pages, content_size):
+    result = {"batchcomplete": "", "query": {"pages": {}}}
+    for pageid in range(1, pages + 1):
+        result["query"]["pages"][str(pageid)] = {
+            "pageid": pageid,
+            "ns": 0,
+            "title": "Page {}".format(pageid),
+            "touched": "2020-01-01T00:00:00Z",
+            "revisions": [{
+                "revid": pageid * 10,
+                "parentid": pageid * 10 - 1,
+                "user": "Some user",
+                "timestamp": "2019-12-31T23:59:59Z",
+                "comment": "some edit summary",
+                "slots": {
+                    "main": {
+                        "contentmodel": "wikitext",
+                        "contentformat": "text/x-wiki",
+                        "*": "[[Category:Foo]]\n== Section ==\nLorem ipsum dolor sit amet. " * (content_size // 60),
+                    },
+                },
+            }],
+        }
+    return json.dumps(result)
+
+def old_decode(text):
+    result = json.loads(text)
+    parse_timestamps_in_struct(result)
+    return result
+
+def new_decode(text):
+    return json.loads(text, object_hook=timestamps_object_hook)
+
+def old_serialize(params):
+    params = copy.deepcopy(params)
+    serialize_timestamps_in_struct(params)
+    return params
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark the timestamp parsing in API responses")
+    ap.add_argument("--response", metavar="PATH",
+            help="path to a recorded JSON response of the API (default: synthetic response)")
+    ap.add_argument("--pages", type=int, default=500,
+            help="number of pages in the synthetic response (default: %(default)s)")
+    ap.add_argument("--content-size", type=int, default=10000,
+            help="size of the content of each page in the synthetic response (default: %(default)s)")
+    ap.add_argument("--repeat", type=int, default=5,
+            help="number of repetitions (default: %(default)s)")
+    args = ap.parse_args()
+
+    if args.response:
+        with open(args.response) as f:
+            text = f.read()
+    else:
+        text = synthetic_response(args.pages, args.content_size)
+    print("Response size: {:.2f} MiB".format(len(text) / 2**20))
+
+    assert old_decode(text) == new_decode(text)
+
+    def report(name, func, arg, number=1):
+        best = min(timeit.repeat(lambda: func(arg), number=number, repeat=args.repeat)) / number
+        print("{:<45} {:10.3f} ms".format(name, best * 1000))
+
+    report("json.loads", json.loads, text)
+    report("json.loads + parse_timestamps_in_struct", old_decode, text)
+    report("json.loads(object_hook=timestamps_object_hook)", new_decode, text)
+
+    params = {
+        "action": "edit",
+        "title": "Some page",
+        "text": text.encode("utf-8"),
+        "basetimestamp": datetime.datetime(2020, 1, 1),
+        "summary": "summary",
+        "tags": ["wiki-scripts"],
+    }
+    report("deepcopy + serialize_timestamps_in_struct", old_serialize, params, number=100)
+    report("serialize_timestamps_in_params", serialize_timestamps_in_params, params, number=100)
+
+if __name__ == "__main__":
+    main()
@@ -228,7 +228,7 @@ divided by the number of days between the user's first and last edits.
         self.MINRECEDITS = minrecedits
 
         self.db_userprops = list(self.db.query(list="allusers", aulimit="max", auprop={"blockinfo", "groups", "editcount", "registration"}))
-        self.modules = UserStatsModules(self.db, round_to_midnight=True, active_days=days)
+        self.modules = UserStatsModules(self.db, round_to_midnight=True, active_days=days, backend="rollup")
 
     def update(self):
         rows = self._compose_rows()
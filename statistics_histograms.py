@@ -1,12 +1,17 @@
 #! /usr/bin/env python3
 
 # NOTE:
-# * only diffable changes are recorded (edits and moves, not deletions)
+# * only revisions are counted (including deleted revisions), not log events
 # * bots vs nobots
 # * different notion of active user ("calendar month" vs "30 days")
 
+import collections
+import datetime
 import logging
 
+import numpy as np
+import sqlalchemy as sa
+
 from ws.client import API
 from ws.interactive import require_login
 from ws.db.database import Database
@@ -20,7 +25,7 @@ def plot_date_bars(bin_data, bin_edges, title, ylabel, fname):
     x-ticks are formatted accordingly.
 
     To plot a histogram, the histogram data must be calculated manually outside
-    this function, either manually or using :py:func`numpy.histogram`.
+    this function, either manually or using :py:func`numpy.bincount`.
 
     :param bin_data: list of data for each bin
     :param bin_edges: list of bin edges (:py:class:`datetime.date` objects), its
@@ -49,38 +54,83 @@ def plot_date_bars(bin_data, bin_edges, title, ylabel, fname):
 
     plt.savefig(fname, papertype="a4")
 
-def create_histograms(revisions):
+# columnar representation of the activity: timestamps as datetime64[s] (int64),
+# users as integer codes into the user_names array and the number of edits
+Activity = collections.namedtuple("Activity", ["timestamps", "users", "edits", "user_names"])
+
+def _activity(timestamps, users, edits):
+    """
+    Build the :py:class:`Activity` arrays from the given sequences.
+    """
+    user_names, codes = np.unique(np.asarray(users, dtype=object), return_inverse=True)
+    timestamps = np.asarray(timestamps, dtype="datetime64[s]")
+    edits = np.asarray(edits, dtype=np.int64)
+    order = np.argsort(timestamps, kind="stable")
+    return Activity(timestamps[order], codes[order], edits[order], user_names)
+
+def load_activity(db):
+    """
+    Load the daily activity of all users from the ``ws_user_activity`` table
+    (see :py:mod:`ws.db.user_activity`).
+
+    :param ws.db.database.Database db: the database
+    :returns: an :py:class:`Activity` tuple with one entry per user and day,
+              the timestamps are the midnights of the days
+    """
+    ua = db.ws_user_activity
+    query = sa.select([ua.c.wsua_day, ua.c.wsua_user_text, sa.func.sum(ua.c.wsua_edits)]) \
+              .group_by(ua.c.wsua_day, ua.c.wsua_user_text)
+    with db.engine.connect() as conn:
+        rows = conn.execute(query).fetchall()
+    if not rows:
+        return _activity([], [], [])
+    days, users, edits = zip(*rows)
+    return _activity(np.array(days, dtype="datetime64[D]"), users, edits)
+
+def activity_from_revisions(revisions):
+    """
+    Convert revisions with the ``"timestamp"`` and ``"user"`` keys (e.g. from
+    ``list=allrevisions``) into an :py:class:`Activity` tuple with one entry
+    per revision.
+    """
+    revisions = list(revisions)
+    timestamps = [revision["timestamp"] for revision in revisions]
+    users = [revision["user"] for revision in revisions]
+    return _activity(timestamps, users, np.ones(len(revisions), dtype=np.int64))
+
+def create_histograms(activity):
     """
-    Build some histograms from the revisions data:
+    Build some histograms from the activity data:
       - count of total edits per month since the wiki has been created
       - count of active users in each month
 
-    Reference: http://stackoverflow.com/a/3035824 (highly adjusted)
+    :param Activity activity: the activity data, see :py:func:`load_activity`
+                              and :py:func:`activity_from_revisions`
     """
-    import numpy as np
-    from matplotlib.dates import date2num
+    if len(activity.timestamps) == 0:
+        logger.warning("No activity, nothing to plot.")
+        return
 
-    # list of timestamps for each revision
-    timestamps = [revision["timestamp"] for revision in revisions]
     # alternatively exclude bots
-#    timestamps = [revision["timestamp"] for revision in revisions if revision["user"] not in ["Kynikos.bot", "Lahwaacz.bot", "Strcat"]]
+#    bots = np.isin(activity.user_names, ["Kynikos.bot", "Lahwaacz.bot", "Strcat"])
+#    mask = ~bots[activity.users]
+#    activity = Activity(activity.timestamps[mask], activity.users[mask], activity.edits[mask], activity.user_names)
 
     # construct an array of bin edges, one bin per calendar month
-    bin_edges = range_by_months(timestamps[0], timestamps[-1])
-
-    # "bin" the timestamps (this will implicitly bin also the revisions)
-    # NOTE: np.digitize returns a list of bin indexes for each revision
-    bin_indexes = np.digitize(date2num(timestamps), date2num(bin_edges))
-
-    # the returned indexes are 1-based indices!!! so let's turn them into 0-based
-    bin_indexes = np.subtract(bin_indexes, 1)
+    # (the day after the last timestamp ensures that the last edge is on its right)
+    first = activity.timestamps[0].astype(datetime.datetime)
+    last = activity.timestamps[-1].astype(datetime.datetime) + datetime.timedelta(days=1)
+    bin_edges = range_by_months(first, last)
+    num_bins = len(bin_edges) - 1
 
+    # "bin" the timestamps: index of the last edge which is less than or equal
+    # to the timestamp
+    edges = np.array(bin_edges, dtype="datetime64[s]")
+    bin_indexes = np.searchsorted(edges, activity.timestamps, side="right") - 1
 
     # histogram for all edits
     logger.info("Plotting hist_alledits.png")
-    # since it is calculated by counting revisions in each bin, it is enough to count
-    # the indexes
-    hist_alledits, _ = np.histogram(bin_indexes, bins=range(len(bin_edges)))
+    hist_alledits = np.bincount(bin_indexes, weights=activity.edits, minlength=num_bins).astype(np.int64)
 
     plot_date_bars(hist_alledits, bin_edges, title="ArchWiki edits per month",
             ylabel="edit count", fname="stub/hist_alledits.png")
@@ -88,16 +138,11 @@ def create_histograms(revisions):
 #            title="ArchWiki edits per month (without bots)", ylabel="edit count",
 #            fname="stub/hist_alledits_nobots.png")
 
-
-    # histogram for active users
+    # histogram for active users: count the unique (bin, user) pairs in each bin
     logger.info("Plotting hist_active_users.png")
-    hist_active_users = []
-    num_bins = len(bin_edges) - 1
-    for i in range(num_bins):
-        # array of indexes for revisions in current bin
-        current_bin, = np.where(bin_indexes == i)
-        active_users = list(set([revisions[ii]["user"] for ii in current_bin]))
-        hist_active_users.append(len(active_users))
+    num_users = len(activity.user_names)
+    pairs = np.unique(bin_indexes.astype(np.int64) * num_users + activity.users)
+    hist_active_users = np.bincount(pairs // num_users, minlength=num_bins)
 
     plot_date_bars(hist_active_users, bin_edges,
             title="ArchWiki active users per month", ylabel="active users",
@@ -125,5 +170,4 @@ if __name__ == "__main__":
     # sync the database
     db.sync_with_api(api)
 
-    allrevs = list(db.query(list="allrevisions", arvlimit="max", arvdir="newer", arvprop={"timestamp", "user"}))
-    create_histograms(allrevs)
+    create_histograms(load_activity(db))
@@ -99,6 +99,14 @@ class test_conversion:
                 expected = targetlist[srclist.index(lang)]
                 assert conversion_func(lang) == expected
 
+    def test_invalid(self):
+        for _, _, conversion_func in self.testsuite:
+            with pytest.raises(KeyError):
+                conversion_func("invalid")
+
+    def test_case_insensitive_tags(self):
+        assert langname_for_tag("ZH-HANS") == langname_for_tag("zh-hans")
+
 class test_detect_language:
     default = get_local_language()
 
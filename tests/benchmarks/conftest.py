@@ -0,0 +1,35 @@
+#! /usr/bin/env python3
+
+import pytest
+
+from fixtures.benchmark import BenchmarkResults
+
+@pytest.fixture(scope="session")
+def benchmark_results(request):
+    results = BenchmarkResults(request.config.getoption("--benchmark-history"))
+    request.config._benchmark_results = results
+    return results
+
+def pytest_generate_tests(metafunc):
+    if "scale" in metafunc.fixturenames:
+        scales = [int(scale) for scale in metafunc.config.getoption("--benchmark-scales").split(",")]
+        metafunc.parametrize("scale", scales)
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    results = getattr(config, "_benchmark_results", None)
+    if results is None or not results.results:
+        return
+    history = results.save()
+    current = history[-1]
+    # compare with the last run covering the same scenarios
+    previous = None
+    for run in reversed(history[:-1]):
+        if set(run["results"]) & set(current["results"]):
+            previous = run
+            break
+    terminalreporter.section("benchmark results")
+    if previous is not None:
+        terminalreporter.write_line("compared with the run from {} ({})".format(previous["timestamp"], previous["revision"]))
+    for line in results.compare(previous, current):
+        terminalreporter.write_line(line)
+    terminalreporter.write_line("history saved to {}".format(results.path))
@@ -0,0 +1,102 @@
+#! /usr/bin/env python3
+
+"""
+Benchmark of :py:class:`ws.utils.FuzzyIndex` against a linear scan with
+:py:class:`difflib.SequenceMatcher` (the original implementation of the
+anchor suggestions in ``link-checker.py``).
+
+Run with::
+
+    pytest tests/benchmarks/test_fuzzy_benchmark.py --benchmark --benchmark-titles titles.txt -s
+
+The file with titles can be created from a synchronized database, e.g.::
+
+    psql -At -c "SELECT page_title FROM page WHERE page_namespace = 0" > titles.txt
+
+Without the ``--benchmark-titles`` option, synthetic titles are used with
+``scale / 10`` titles for each scale.
+"""
+
+import difflib
+import random
+import time
+
+import pytest
+
+from ws.utils import FuzzyIndex
+
+WORDS = ["Arch", "Linux", "installation", "guide", "network", "configuration",
+         "wireless", "systemd", "boot", "loader", "kernel", "module", "parameters",
+         "graphics", "driver", "NVIDIA", "Intel", "AMD", "audio", "PulseAudio",
+         "Xorg", "Wayland", "desktop", "environment", "security", "firewall",
+         "power", "management", "laptop", "Dell", "Lenovo", "ThinkPad", "XPS",
+         "file", "systems", "Btrfs", "ext4", "encryption", "backup", "programs"]
+
+def synthetic_titles(count, rng):
+    titles = set()
+    while len(titles) < count:
+        words = rng.sample(WORDS, rng.randint(1, 4))
+        title = " ".join(words)
+        if rng.random() < 0.3:
+            title += " ({})".format(rng.choice(WORDS))
+        titles.add(title[0].upper() + title[1:])
+    return sorted(titles)
+
+def typo(title, rng):
+    i = rng.randrange(len(title))
+    operation = rng.choice(["delete", "insert", "replace", "case"])
+    if operation == "delete":
+        return title[:i] + title[i+1:]
+    elif operation == "insert":
+        return title[:i] + rng.choice("abcdefghijklmnopqrstuvwxyz") + title[i:]
+    elif operation == "replace":
+        return title[:i] + rng.choice("abcdefghijklmnopqrstuvwxyz") + title[i+1:]
+    return title[:i] + title[i:].swapcase()
+
+def linear_scan(key, titles, cutoff):
+    sm = difflib.SequenceMatcher(a=key)
+    ranks = []
+    for title in titles:
+        sm.set_seq2(title)
+        ratio = sm.ratio()
+        if ratio >= cutoff:
+            ranks.append( (title, ratio) )
+    ranks.sort(key=lambda match: match[1], reverse=True)
+    return ranks
+
+@pytest.mark.benchmark
+def test_fuzzy_index(request, scale, benchmark_results):
+    rng = random.Random(0)
+    path = request.config.getoption("--benchmark-titles")
+    if path is not None:
+        with open(path) as f:
+            titles = [line.strip().replace("_", " ") for line in f if line.strip()]
+        scenario = "fuzzy-titles-file"
+    else:
+        titles = synthetic_titles(max(scale // 10, 100), rng)
+        scenario = "fuzzy-titles-{}".format(scale)
+    keys = [typo(rng.choice(titles), rng) for _ in range(100)]
+
+    start = time.perf_counter()
+    index = FuzzyIndex(titles)
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    indexed = [index.search(key, limit=3, cutoff=0.8) for key in keys]
+    index_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scanned = [linear_scan(key, titles, 0.8)[:3] for key in keys]
+    scan_seconds = time.perf_counter() - start
+
+    # the best match must be the same (the ratio is not strictly symmetric,
+    # so the order of equally ranked candidates may differ)
+    for a, b in zip(indexed, scanned):
+        assert [ratio for _, ratio in a[:1]] == pytest.approx([ratio for _, ratio in b[:1]])
+
+    benchmark_results.record(scenario,
+        titles=len(titles),
+        index_build_seconds=build_seconds,
+        index_queries_per_second=len(keys) / index_seconds,
+        difflib_queries_per_second=len(keys) / scan_seconds,
+        speedup=scan_seconds / index_seconds)
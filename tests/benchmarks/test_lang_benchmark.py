@@ -0,0 +1,69 @@
+#! /usr/bin/env python3
+
+"""
+Micro-benchmark of the title and language functions in
+:py:mod:`ws.ArchWiki.lang`.
+
+Run with::
+
+    pytest tests/benchmarks/test_lang_benchmark.py --benchmark --benchmark-titles titles.txt -s
+
+See :py:mod:`test_fuzzy_benchmark` for how to create the file with titles. Without the
+``--benchmark-titles`` option, ``scale / 10`` synthetic titles are used for
+each scale.
+"""
+
+import random
+import time
+
+import pytest
+
+import ws.ArchWiki.lang as lang
+
+def synthetic_titles(count, rng):
+    names = lang.get_language_names()
+    titles = []
+    for i in range(count):
+        title = "Page {}".format(i)
+        if rng.random() < 0.2:
+            title += "/Subpage"
+        if rng.random() < 0.7:
+            title = lang.format_title(title, rng.choice(names))
+        titles.append(title)
+    return titles
+
+def measure(func, items, repeat=3):
+    """
+    Returns the number of calls per second.
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for item in items:
+            func(item)
+    return repeat * len(items) / (time.perf_counter() - start)
+
+@pytest.mark.benchmark
+def test_lang(request, scale, benchmark_results):
+    rng = random.Random(0)
+    path = request.config.getoption("--benchmark-titles")
+    if path is not None:
+        with open(path) as f:
+            titles = [line.strip().replace("_", " ") for line in f if line.strip()]
+        scenario = "lang-titles-file"
+    else:
+        titles = synthetic_titles(max(scale // 10, 100), rng)
+        scenario = "lang-titles-{}".format(scale)
+    tags = [rng.choice(lang.get_language_tags()) for _ in range(10000)]
+
+    lang.detect_language.cache_clear()
+    uncached = measure(lang.detect_language.__wrapped__, titles)
+    cold = measure(lang.detect_language, titles, repeat=1)
+    warm = measure(lang.detect_language, titles)
+
+    benchmark_results.record(scenario,
+        titles=len(titles),
+        detect_language_uncached_per_second=uncached,
+        detect_language_cold_cache_per_second=cold,
+        detect_language_warm_cache_per_second=warm,
+        langname_for_tag_per_second=measure(lang.langname_for_tag, tags),
+        is_language_tag_per_second=measure(lang.is_language_tag, tags))
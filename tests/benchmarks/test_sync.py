@@ -0,0 +1,129 @@
+#! /usr/bin/env python3
+
+"""
+End-to-end benchmarks of the database synchronization against synthetic wikis
+served by :py:class:`fixtures.fake_api.FakeAPIServer`.
+
+Run with::
+
+    pytest tests/benchmarks/ --benchmark --benchmark-scales 10000,100000,1000000 -s
+
+For each scale (number of revisions), the full synchronization, the
+synchronization of the latest revisions content, the parser cache update and
+an incremental synchronization are measured. The results (rows per second,
+peak RSS of the client process and time spent in each grabber) are appended to
+the history file given by ``--benchmark-history`` and compared with the
+previous run.
+"""
+
+import multiprocessing
+
+import pytest
+import sqlalchemy as sa
+
+from ws.client.api import API
+
+from fixtures.fake_api import SyntheticWiki, FakeAPIServer
+from fixtures.benchmark import PeakRSS
+
+def wiki_parameters(scale):
+    """
+    Parameters of :py:class:`SyntheticWiki` for the given number of revisions.
+    """
+    pages = max(scale // 10, 1)
+    return {
+        "pages": pages,
+        "revisions": 10,
+        "users": max(pages // 20, 2),
+        "templates": max(pages // 100, 1),
+        "deleted_pages": max(pages // 100, 1),
+    }
+
+def _serve(wiki_kwargs, pipe):
+    wiki = SyntheticWiki(**wiki_kwargs)
+    with FakeAPIServer(wiki) as server:
+        pipe.send((server.api_url, server.index_url))
+        while True:
+            command, kwargs = pipe.recv()
+            if command == "grow":
+                with server._server.lock:
+                    wiki.grow(**kwargs)
+                pipe.send(None)
+            elif command == "stop":
+                break
+
+class RemoteWiki:
+    """
+    Runs the fake API server in a separate process, so that its memory is not
+    included in the measurements of the client.
+    """
+
+    def __init__(self, **wiki_kwargs):
+        # the child process must inherit sys.path to import the fixtures
+        ctx = multiprocessing.get_context("fork")
+        self._pipe, child_pipe = ctx.Pipe()
+        self._process = ctx.Process(target=_serve, args=(wiki_kwargs, child_pipe), daemon=True)
+        self._process.start()
+        self.api_url, self.index_url = self._pipe.recv()
+
+    def grow(self, **kwargs):
+        self._pipe.send(("grow", kwargs))
+        self._pipe.recv()
+
+    def stop(self):
+        self._pipe.send(("stop", None))
+        self._process.join()
+
+def count_rows(db):
+    total = 0
+    with db.engine.connect() as conn:
+        for table in db.metadata.sorted_tables:
+            total += conn.execute(sa.select([sa.func.count()]).select_from(table)).scalar()
+    return total
+
+@pytest.mark.benchmark
+def test_sync(db, scale, benchmark_results):
+    wiki = RemoteWiki(**wiki_parameters(scale))
+    try:
+        api = API(wiki.api_url, wiki.index_url, API.make_session())
+        scenario = "sync-{}".format(scale)
+
+        with PeakRSS() as m:
+            timings = db.sync_with_api(api)
+        rows = count_rows(db)
+        benchmark_results.record(scenario,
+            full_seconds=m.seconds,
+            full_rows_per_second=rows / m.seconds,
+            full_peak_rss_mib=m.peak_rss_mib,
+            **dict(("full_" + name + "_seconds", seconds) for name, seconds in timings.items()))
+
+        with PeakRSS() as m:
+            db.sync_revisions_content(api, mode="latest")
+        new_rows = count_rows(db)
+        benchmark_results.record(scenario,
+            content_seconds=m.seconds,
+            content_rows_per_second=(new_rows - rows) / m.seconds,
+            content_peak_rss_mib=m.peak_rss_mib)
+        rows = new_rows
+
+        with PeakRSS() as m:
+            db.update_parser_cache()
+        new_rows = count_rows(db)
+        benchmark_results.record(scenario,
+            parser_cache_seconds=m.seconds,
+            parser_cache_rows_per_second=(new_rows - rows) / m.seconds,
+            parser_cache_peak_rss_mib=m.peak_rss_mib)
+        rows = new_rows
+
+        # about 1% of new changes
+        wiki.grow(pages=max(scale // 1000, 1), edits=max(scale // 100, 1), deleted_pages=max(scale // 10000, 1))
+        with PeakRSS() as m:
+            timings = db.sync_with_api(api)
+        new_rows = count_rows(db)
+        benchmark_results.record(scenario,
+            incremental_seconds=m.seconds,
+            incremental_rows_per_second=(new_rows - rows) / m.seconds,
+            incremental_peak_rss_mib=m.peak_rss_mib,
+            **dict(("incremental_" + name + "_seconds", seconds) for name, seconds in timings.items()))
+    finally:
+        wiki.stop()
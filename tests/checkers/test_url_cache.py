@@ -0,0 +1,61 @@
+#! /usr/bin/env python3
+
+import time
+
+import pytest
+
+from ws.checkers import URLStatusCache
+
+@pytest.fixture(scope="function")
+def cache(tmp_path):
+    cache = URLStatusCache(str(tmp_path / "cache" / "urls.sqlite"), max_checks_per_domain=2)
+    yield cache
+    cache.close()
+
+def test_get_set(cache):
+    assert cache.get("https://example.org/") is None
+    cache.set("https://example.org/", "valid", 200)
+    cache.set("https://example.org/foo", "invalid", 404)
+    assert cache.get("https://example.org/") == ("valid", "200")
+    assert cache.get("https://example.org/foo") == ("invalid", "404")
+    cache.set("https://example.org/foo", "valid")
+    assert cache.get("https://example.org/foo") == ("valid", None)
+
+def test_invalid_status(cache):
+    with pytest.raises(ValueError):
+        cache.set("https://example.org/", "foo")
+    with pytest.raises(ValueError):
+        URLStatusCache(":memory:", recheck_days={"foo": 1})
+
+def test_persistent(tmp_path):
+    path = str(tmp_path / "urls.sqlite")
+    cache = URLStatusCache(path)
+    cache.set("https://example.org/", "invalid", "SSL error")
+    cache.close()
+    cache = URLStatusCache(path)
+    assert cache.get("https://example.org/") == ("invalid", "SSL error")
+    cache.close()
+
+def test_expiration(monkeypatch):
+    cache = URLStatusCache(":memory:", recheck_days={"valid": 2, "indeterminate": 0})
+    cache.set("https://example.org/", "valid")
+    cache.set("https://example.org/foo", "indeterminate", 503)
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 86400)
+    assert cache.get("https://example.org/") == ("valid", None)
+    assert cache.get("https://example.org/foo") is None
+    monkeypatch.setattr(time, "time", lambda: now + 3 * 86400)
+    assert cache.get("https://example.org/") is None
+    cache.expire()
+    assert cache._conn.execute("SELECT count(*) FROM url_status").fetchone()[0] == 0
+
+def test_max_checks_per_domain(cache):
+    assert cache.acquire_check("example.org") is True
+    assert cache.acquire_check("example.org") is True
+    assert cache.acquire_check("example.org") is False
+    assert cache.acquire_check("example.com") is True
+
+def test_unlimited_checks():
+    cache = URLStatusCache(":memory:")
+    for i in range(100):
+        assert cache.acquire_check("example.org") is True
@@ -0,0 +1,92 @@
+#! /usr/bin/env python3
+
+import collections
+import threading
+import time
+
+import pytest
+
+from ws.checkers import CircuitBreaker, URLCheckPool
+
+def host(url):
+    return url.split("/")[2]
+
+class test_url_check_pool:
+    def test_all_checked_once(self):
+        urls = ["https://host{}.org/{}".format(i % 5, i) for i in range(50)]
+        counter = collections.Counter()
+        def check(url):
+            counter[url] += 1
+            return True
+        pool = URLCheckPool(check, host, max_workers=8, max_per_host=2)
+        results = dict(pool.run(urls + urls[:10]))
+        assert results == dict((url, True) for url in urls)
+        assert set(counter.values()) == {1}
+
+    def test_per_host_limit(self):
+        urls = ["https://slow.org/{}".format(i) for i in range(10)]
+        urls += ["https://fast{}.org/".format(i) for i in range(10)]
+        lock = threading.Lock()
+        active = collections.Counter()
+        maximum = collections.Counter()
+        def check(url):
+            h = host(url)
+            with lock:
+                active[h] += 1
+                maximum[h] = max(maximum[h], active[h])
+            time.sleep(0.01)
+            with lock:
+                active[h] -= 1
+            return True
+        pool = URLCheckPool(check, host, max_workers=10, max_per_host=3)
+        assert len(list(pool.run(urls))) == 20
+        assert maximum["slow.org"] <= 3
+        assert max(maximum.values()) <= 3
+
+    def test_exception(self):
+        def check(url):
+            raise ValueError(url)
+        pool = URLCheckPool(check, host)
+        assert list(pool.run(["https://example.org/"])) == [("https://example.org/", None)]
+
+    def test_breaker(self):
+        breaker = CircuitBreaker(threshold=2)
+        checked = []
+        def check(url):
+            checked.append(url)
+            if host(url) == "dead.org":
+                breaker.record_failure("dead.org")
+                return None
+            breaker.record_success(host(url))
+            return True
+        urls = ["https://dead.org/{}".format(i) for i in range(10)] + ["https://example.org/"]
+        pool = URLCheckPool(check, host, max_workers=1, max_per_host=1, breaker=breaker)
+        results = dict(pool.run(urls))
+        assert len(results) == 11
+        assert results["https://example.org/"] is True
+        assert len([url for url in checked if host(url) == "dead.org"]) == 2
+
+    def test_invalid_parameters(self):
+        with pytest.raises(ValueError):
+            URLCheckPool(None, host, max_workers=0)
+
+class test_circuit_breaker:
+    def test_open_close(self):
+        breaker = CircuitBreaker(threshold=2, reset_timeout=0)
+        assert breaker.allow("example.org")
+        breaker.record_failure("example.org")
+        assert not breaker.is_open("example.org")
+        breaker.record_failure("example.org")
+        assert breaker.is_open("example.org")
+        # half-open after the timeout, one failure opens it again
+        assert breaker.allow("example.org")
+        breaker.record_failure("example.org")
+        assert breaker.is_open("example.org")
+        breaker.record_success("example.org")
+        assert not breaker.is_open("example.org")
+
+    def test_timeout(self):
+        breaker = CircuitBreaker(threshold=1, reset_timeout=3600)
+        breaker.record_failure("example.org")
+        assert not breaker.allow("example.org")
+        assert breaker.allow("example.com")
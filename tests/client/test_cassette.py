@@ -0,0 +1,78 @@
+#! /usr/bin/env python3
+
+import time
+
+import pytest
+
+from ws.client.cassette import Cassette, CassetteMiss
+
+class test_cassette:
+    params = {
+        "list": "allrevisions",
+        "arvprop": "ids|timestamp|user|content",
+        "arvslots": "main",
+        "arvlimit": 10,
+    }
+
+    def _fetch(self, api):
+        return list(api.list(self.params))
+
+    def test_record_replay(self, fake_api, tmp_path):
+        path = str(tmp_path / "cassette.json")
+        with Cassette(path, mode="record") as cassette:
+            cassette.install(fake_api.api)
+            recorded = self._fetch(fake_api.api)
+
+        # change the wiki to make sure that the responses are replayed
+        fake_api.wiki.grow(edits=5)
+        api = fake_api.make_api()
+        with Cassette(path, mode="replay") as cassette:
+            cassette.install(api)
+            assert self._fetch(api) == recorded
+            # requests missing in the cassette are not sent to the server
+            with pytest.raises(CassetteMiss):
+                api.call_api(action="query", meta="siteinfo")
+
+    def test_stream(self, fake_api, tmp_path):
+        pytest.importorskip("ijson")
+        path = str(tmp_path / "cassette.json")
+        with Cassette(path, mode="record") as cassette:
+            cassette.install(fake_api.api)
+            recorded = list(fake_api.api.list(self.params, stream=True))
+        api = fake_api.make_api()
+        with Cassette(path, mode="replay") as cassette:
+            cassette.install(api)
+            assert list(api.list(self.params, stream=True)) == recorded
+
+    def test_auto(self, fake_api, tmp_path):
+        path = str(tmp_path / "cassette.json")
+        with Cassette(path, mode="auto") as cassette:
+            cassette.install(fake_api.api)
+            first = fake_api.api.newest_rc_timestamp
+        fake_api.wiki.grow(edits=1)
+        api = fake_api.make_api()
+        with Cassette(path, mode="auto") as cassette:
+            cassette.install(api)
+            # recorded response
+            assert api.newest_rc_timestamp == first
+            # new request is recorded
+            api.call_api(action="query", meta="siteinfo")
+        with Cassette(path, mode="replay") as cassette:
+            cassette.install(api)
+            api.call_api(action="query", meta="siteinfo")
+
+    def test_latency(self, fake_api, tmp_path):
+        path = str(tmp_path / "cassette.json")
+        with Cassette(path, mode="record") as cassette:
+            cassette.install(fake_api.api)
+            fake_api.api.call_api(action="query", meta="siteinfo")
+        api = fake_api.make_api()
+        cassette = Cassette(path, mode="replay", latency=0.2)
+        cassette.install(api)
+        start = time.time()
+        api.call_api(action="query", meta="siteinfo")
+        assert time.time() - start >= 0.2
+
+    def test_missing_file(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            Cassette(str(tmp_path / "cassette.json"), mode="replay")
@@ -0,0 +1,65 @@
+#! /usr/bin/env python3
+
+import pytest
+
+from ws.client.redirects import Redirects
+
+class test_resolve:
+    redirects_data = {
+        "Main Page": "Main page",
+        "ABS": "Arch Build System",
+        "foo": "bar#baz",
+        "A1": "B1",
+        "B1": "C1",
+        "A2": "B2#section",
+        "B2": "C2",
+        "A3": "B3#section",
+        "B3": "C3#section2",
+        "x": "y",
+        "y": "x",
+        "self": "self",
+        "into loop": "x",
+        "D1": "D2",
+        "D2": "D3",
+        "D3": "D4#section",
+        "D4": "D5",
+    }
+
+    redirects_resolved = {
+        "Main page": None,
+        "Main Page": "Main page",
+        "ABS": "Arch Build System",
+        "foo": "bar#baz",
+        "A1": "C1",
+        "B1": "C1",
+        "A2": "C2#section",
+        "A3": "C3#section2",
+        "x": None,
+        "y": None,
+        "self": None,
+        "into loop": None,
+        "D1": "D5#section",
+        "D2": "D5#section",
+        "D3": "D5#section",
+        "D4": "D5",
+    }
+
+    @pytest.fixture
+    def redirects(self):
+        redirects = Redirects(None)
+        redirects.map = self.redirects_data
+        return redirects
+
+    @pytest.mark.parametrize("source, expected_target", redirects_resolved.items())
+    def test_resolve(self, redirects, source, expected_target):
+        assert redirects.resolve(source) == expected_target
+
+    def test_loops(self):
+        resolved, loops = Redirects.resolve_all(self.redirects_data)
+        assert loops == {"x", "y", "self", "into loop"}
+        assert set(resolved) == set(self.redirects_data) - loops
+
+    def test_reset(self, redirects):
+        assert redirects.resolve("A1") == "C1"
+        redirects.map = {"A1": "B1"}
+        assert redirects.resolve("A1") == "B1"
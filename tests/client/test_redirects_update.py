@@ -0,0 +1,186 @@
+#! /usr/bin/env python3
+
+import datetime
+import json
+
+from ws.client.redirects import Redirects
+from ws.utils import format_date
+
+class FakeAPI:
+    """
+    Stub of :py:class:`ws.client.api.API` with the queries used by
+    :py:class:`Redirects`. ``wiki`` is the current mapping of redirects on the
+    wiki and ``changes`` is the list of recent changes.
+    """
+    max_ids_per_query = 2
+
+    class site:
+        namespaces = {0: {}, -1: {}}
+
+    def __init__(self, wiki, changes=(), oldest=datetime.datetime(2020, 1, 1), newest=datetime.datetime(2020, 2, 1)):
+        self.wiki = wiki
+        self.changes = list(changes)
+        self.oldest_rc_timestamp = oldest
+        self.newest_rc_timestamp = newest
+        self.queried_titles = []
+        self.allpages_queries = 0
+
+    def generator(self, **params):
+        assert params["generator"] == "allpages"
+        assert params["prop"] == "redirects"
+        self.allpages_queries += 1
+        pages = {}
+        for source, target in self.wiki.items():
+            title, _, fragment = target.partition("#")
+            redirect = {"title": source}
+            if fragment:
+                redirect["fragment"] = fragment
+            pages.setdefault(title, {"title": title, "redirects": []})["redirects"].append(redirect)
+        # all namespaces are merged together
+        if params["gapnamespace"] == 0:
+            return list(pages.values())
+        return []
+
+    def list(self, **params):
+        assert params["list"] == "recentchanges"
+        return [change for change in self.changes if change["timestamp"] >= params["rcstart"]]
+
+    def call_api(self, **params):
+        titles = params["titles"].split("|")
+        assert len(titles) <= self.max_ids_per_query
+        self.queried_titles.extend(titles)
+        # MediaWiki follows the double redirects
+        redirects = []
+        pending = list(titles)
+        while pending:
+            title = pending.pop(0)
+            if title in self.wiki and not any(r["from"] == title for r in redirects):
+                target, _, fragment = self.wiki[title].partition("#")
+                redirect = {"from": title, "to": target}
+                if fragment:
+                    redirect["tofragment"] = fragment
+                redirects.append(redirect)
+                pending.append(target)
+        result = {}
+        if redirects:
+            result["redirects"] = redirects
+        return result
+
+def change(title, day, type="edit", **kwargs):
+    entry = {"type": type, "title": title, "timestamp": datetime.datetime(2020, 1, day)}
+    entry.update(kwargs)
+    return entry
+
+class test_update:
+    initial = {
+        "A": "B",
+        "Old": "Target#section",
+        "Deleted": "Target",
+        "Unchanged": "Target",
+    }
+
+    def _redirects(self, wiki, changes):
+        api = FakeAPI(wiki, changes)
+        redirects = Redirects(api)
+        redirects.map = dict(self.initial)
+        timestamp = redirects.update(datetime.datetime(2020, 1, 2))
+        return api, redirects, timestamp
+
+    def test_no_changes(self):
+        api, redirects, timestamp = self._redirects(self.initial, [])
+        assert timestamp == datetime.datetime(2020, 1, 2)
+        assert redirects.map == self.initial
+        assert api.queried_titles == []
+
+    def test_redirect_edited_to_page(self):
+        wiki = dict(self.initial)
+        del wiki["Old"]
+        api, redirects, timestamp = self._redirects(wiki, [change("Old", 3)])
+        assert timestamp == datetime.datetime(2020, 1, 3)
+        assert "Old" not in redirects.map
+        assert redirects.resolve("Old") is None
+        assert api.queried_titles == ["Old"]
+
+    def test_move_leaving_redirect(self):
+        wiki = dict(self.initial)
+        wiki["Page"] = "Moved page"
+        changes = [change("Page", 4, type="log", logtype="move", logparams={"target_title": "Moved page"})]
+        api, redirects, timestamp = self._redirects(wiki, changes)
+        assert redirects.map["Page"] == "Moved page"
+        assert "Moved page" not in redirects.map
+        assert sorted(api.queried_titles) == ["Moved page", "Page"]
+
+    def test_deleted_redirect(self):
+        wiki = dict(self.initial)
+        del wiki["Deleted"]
+        changes = [change("Deleted", 5, type="log", logtype="delete")]
+        api, redirects, timestamp = self._redirects(wiki, changes)
+        assert "Deleted" not in redirects.map
+        assert redirects.map["Unchanged"] == "Target"
+
+    def test_double_redirect(self):
+        wiki = dict(self.initial)
+        wiki["B"] = "C#c"
+        api, redirects, timestamp = self._redirects(wiki, [change("A", 3), change("B", 3, type="new")])
+        assert redirects.map["A"] == "B"
+        assert redirects.map["B"] == "C#c"
+        assert redirects.resolve("A") == "C#c"
+
+    def test_double_redirect_in_result(self):
+        # only "A" changed, but the result includes the next step of the chain
+        wiki = dict(self.initial)
+        wiki["A"] = "Old"
+        api, redirects, timestamp = self._redirects(wiki, [change("A", 3)])
+        assert api.queried_titles == ["A"]
+        assert redirects.map["A"] == "Old"
+        assert redirects.map["Old"] == "Target#section"
+        assert redirects.resolve("A") == "Target#section"
+
+    def test_ignored_log_events(self):
+        changes = [change("User:Foo", 3, type="log", logtype="block")]
+        api, redirects, timestamp = self._redirects(self.initial, changes)
+        assert timestamp == datetime.datetime(2020, 1, 3)
+        assert api.queried_titles == []
+
+class test_load_cache:
+    wiki = {"A": "B", "B": "C"}
+
+    def _write(self, path, timestamp, mapping):
+        with open(path, "w") as f:
+            json.dump({"timestamp": format_date(timestamp), "map": mapping}, f)
+
+    def _read(self, path):
+        with open(path) as f:
+            return json.load(f)
+
+    def test_missing_file(self, tmp_path):
+        path = str(tmp_path / "cache" / "redirects.json")
+        api = FakeAPI(self.wiki)
+        redirects = Redirects(api)
+        redirects.load_cache(path)
+        assert api.allpages_queries == 1
+        assert redirects.resolve("A") == "C"
+        assert self._read(path) == {"timestamp": "2020-02-01T00:00:00Z", "map": self.wiki}
+
+    def test_incremental(self, tmp_path):
+        path = str(tmp_path / "redirects.json")
+        self._write(path, datetime.datetime(2020, 1, 10), {"A": "B"})
+        api = FakeAPI(self.wiki, [change("B", 11)])
+        redirects = Redirects(api)
+        redirects.load_cache(path)
+        assert api.allpages_queries == 0
+        assert redirects.map == self.wiki
+        assert self._read(path) == {"timestamp": "2020-01-11T00:00:00Z", "map": self.wiki}
+
+    def test_stale_cache(self, tmp_path):
+        path = str(tmp_path / "redirects.json")
+        # the cache is older than the oldest recent change, so the changes
+        # since then are not known
+        self._write(path, datetime.datetime(2019, 12, 1), {"A": "Outdated", "Removed": "X"})
+        api = FakeAPI(self.wiki, [change("B", 11)])
+        redirects = Redirects(api)
+        redirects.load_cache(path)
+        assert api.allpages_queries == 1
+        assert api.queried_titles == []
+        assert redirects.map == self.wiki
+        assert self._read(path) == {"timestamp": "2020-02-01T00:00:00Z", "map": self.wiki}
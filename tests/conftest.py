@@ -9,11 +9,32 @@ import ws.db.schema as schema
 
 from fixtures.postgresql import *
 from fixtures.mediawiki import *
+from fixtures.fake_api import *
+
+def pytest_addoption(parser):
+    group = parser.getgroup("benchmarks")
+    group.addoption("--benchmark", action="store_true", default=False,
+            help="run the benchmarks in tests/benchmarks/ (they are skipped by default)")
+    group.addoption("--benchmark-scales", default="10000",
+            help="comma-separated numbers of revisions of the synthetic wikis (default: %(default)s)")
+    group.addoption("--benchmark-history", default=".benchmarks/sync.json",
+            help="path to the JSON file with the history of the benchmark results (default: %(default)s)")
+    group.addoption("--benchmark-titles", default=None,
+            help="path to a file with page titles (one per line) for the fuzzy matching benchmark (default: synthetic titles)")
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--benchmark"):
+        return
+    skip = pytest.mark.skip(reason="benchmarks are enabled with the --benchmark option")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
 
 # disable rate-limiting for tests
 def pytest_configure(config):
     import ws
     ws._tests_are_running = True
+    config.addinivalue_line("markers", "benchmark: slow benchmark, enabled with the --benchmark option")
 
 def pytest_unconfigure(config):
     import ws
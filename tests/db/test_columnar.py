@@ -0,0 +1,76 @@
+#! /usr/bin/env python3
+
+import datetime
+import struct
+
+import pytest
+
+from ws.db import columnar
+
+np = pytest.importorskip("numpy")
+
+def _copy_binary(rows):
+    """
+    Encode rows into the binary COPY format of PostgreSQL.
+    """
+    data = bytearray(b"PGCOPY\n\xff\r\n\x00")
+    data += struct.pack(">ii", 0, 0)
+    epoch = datetime.datetime(2000, 1, 1)
+    for row in rows:
+        data += struct.pack(">h", len(columnar.REVISION_FIELDS))
+        for (name, type_), value in zip(columnar.REVISION_FIELDS, row):
+            if name == "timestamp":
+                value = (value - epoch) // datetime.timedelta(microseconds=1)
+            fmt = {">i4": ">i", ">i8": ">q", "u1": ">B"}[type_]
+            data += struct.pack(">i", struct.calcsize(fmt)) + struct.pack(fmt, value)
+    data += struct.pack(">h", -1)
+    return bytes(data)
+
+def test_decode_copy_binary():
+    rows = [
+        (1, 1, 0, 2, datetime.datetime(2018, 1, 1, 12, 30, 5), 100, 0, 0),
+        (2, 0, 4, 0, datetime.datetime(1999, 12, 31, 23, 59, 59, 500000), -1, 1, 1),
+    ]
+    result = columnar.decode_copy_binary(_copy_binary(rows))
+    assert result.dtype == columnar.revision_dtype()
+    assert result["revid"].tolist() == [1, 2]
+    assert result["pageid"].tolist() == [1, 0]
+    assert result["namespace"].tolist() == [0, 4]
+    assert result["userid"].tolist() == [2, 0]
+    assert result["timestamp"].astype(datetime.datetime).tolist() == [row[4] for row in rows]
+    assert result["size"].tolist() == [100, -1]
+    assert result["minor"].tolist() == [False, True]
+    assert result["deleted"].tolist() == [False, True]
+
+def test_decode_copy_binary_empty():
+    result = columnar.decode_copy_binary(_copy_binary([]))
+    assert len(result) == 0
+
+def test_decode_copy_binary_invalid():
+    with pytest.raises(ValueError):
+        columnar.decode_copy_binary(b"foo")
+    data = _copy_binary([(1, 1, 0, 2, datetime.datetime(2018, 1, 1), 100, 0, 0)])
+    with pytest.raises(ValueError):
+        columnar.decode_copy_binary(data[:-3] + b"\xff\xff")
+
+def test_parquet_roundtrip(tmp_path):
+    pytest.importorskip("pyarrow")
+    rows = [(1, 1, 0, 2, datetime.datetime(2018, 1, 1), 100, 0, 0)]
+    array = columnar.decode_copy_binary(_copy_binary(rows))
+    path = str(tmp_path / "revisions.parquet")
+    columnar.write_parquet(array, path)
+    assert columnar.read_parquet(path).tolist() == array.tolist()
+
+def test_load_revisions(db, fake_api):
+    db.sync_with_api(fake_api.api)
+    array = db.load_revisions_metadata()
+    revisions = list(db.query(list="allrevisions", arvlimit="max", arvprop={"ids", "timestamp", "userid", "size"}))
+    deleted = list(db.query(list="alldeletedrevisions", adrlimit="max", adrprop={"ids", "timestamp", "userid", "size"}))
+    assert len(array) == len(revisions) + len(deleted)
+    assert int(array["deleted"].sum()) == len(deleted)
+    assert set(array["revid"].tolist()) == set(r["revid"] for r in revisions + deleted)
+    assert np.all(np.diff(array["timestamp"].astype(np.int64)) >= 0)
+
+    live = db.load_revisions_metadata(deleted=False, namespaces=[0])
+    assert not live["deleted"].any()
+    assert set(live["namespace"].tolist()) <= {0}
@@ -0,0 +1,50 @@
+#! /usr/bin/env python3
+
+import datetime
+
+import sqlalchemy as sa
+
+from ws.db import user_activity
+
+def _rollup(db):
+    ua = db.ws_user_activity
+    with db.engine.connect() as conn:
+        return sorted(tuple(row) for row in conn.execute(ua.select()))
+
+def _expected(db):
+    with db.engine.connect() as conn:
+        return sorted(tuple(row) for row in conn.execute(user_activity.select_activity(db)))
+
+def test_gen_refresh_params(db):
+    keys = {("Foo", datetime.date(2018, 1, 31)), ("Bar", datetime.date(2018, 1, 1))}
+    items = list(user_activity.gen_refresh(db, keys))
+    assert len(items) == 4
+    delete, params = items[0]
+    assert params == {
+        "b_user_text": "Bar",
+        "b_day": datetime.date(2018, 1, 1),
+        "b_start": datetime.datetime(2018, 1, 1),
+        "b_end": datetime.datetime(2018, 1, 2),
+    }
+    assert items[1][1] is params
+    assert items[3][1]["b_end"] == datetime.datetime(2018, 2, 1)
+
+def test_incremental(db, fake_api):
+    db.sync_with_api(fake_api.api)
+    rollup = _rollup(db)
+    assert rollup
+    assert rollup == _expected(db)
+    total = sum(row[3] for row in rollup)
+    with db.engine.connect() as conn:
+        revisions = conn.execute(sa.select([sa.func.count()]).select_from(db.revision)).scalar()
+        deleted = conn.execute(sa.select([sa.func.count()]).select_from(db.archive)).scalar()
+    assert total == revisions + deleted
+
+    fake_api.wiki.grow(pages=3, edits=10, deleted_pages=1)
+    db.sync_with_api(fake_api.api)
+    assert _rollup(db) == _expected(db)
+
+    # rebuilding from scratch gives the same result
+    incremental = _rollup(db)
+    user_activity.rebuild(db)
+    assert _rollup(db) == incremental
@@ -0,0 +1,197 @@
+#! /usr/bin/env python3
+
+import datetime
+import gzip
+import io
+import os.path
+import types
+
+import sqlalchemy as sa
+
+from ws.db.xml_dump import parse_xml_dump, XMLDumpExporter, _DumpWriter
+import ws.db.mw_constants as mwconst
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "..", "..", "misc", "MediaWiki-import-data.xml")
+
+DUMP = """\
+<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.10/" version="0.10" xml:lang="en">
+  <siteinfo>
+    <sitename>MySite</sitename>
+  </siteinfo>
+  <page>
+    <title>Foo</title>
+    <ns>0</ns>
+    <id>2</id>
+    <redirect title="Bar" />
+    <revision>
+      <id>3</id>
+      <timestamp>2018-01-01T00:00:00Z</timestamp>
+      <contributor>
+        <ip>127.0.0.1</ip>
+      </contributor>
+      <comment deleted="deleted" />
+      <model>wikitext</model>
+      <format>text/x-wiki</format>
+      <text xml:space="preserve" bytes="0" />
+      <sha1 />
+    </revision>
+    <revision>
+      <id>5</id>
+      <parentid>3</parentid>
+      <timestamp>2018-01-02T00:00:00Z</timestamp>
+      <contributor deleted="deleted" />
+      <minor />
+      <model>wikitext</model>
+      <format>text/x-wiki</format>
+      <text id="5" bytes="14" />
+      <sha1 />
+    </revision>
+  </page>
+  <logitem>
+    <id>7</id>
+    <timestamp>2018-01-03T00:00:00Z</timestamp>
+    <contributor>
+      <username>Admin</username>
+      <id>2</id>
+    </contributor>
+    <comment>reason</comment>
+    <type>delete</type>
+    <action>delete</action>
+    <logtitle>Talk:Baz</logtitle>
+    <params xml:space="preserve">a:0:{}</params>
+  </logitem>
+</mediawiki>
+"""
+
+class test_parse_xml_dump:
+    def test_fixture(self):
+        items = list(parse_xml_dump(FIXTURE))
+        assert [item[0] for item in items] == ["revision", "page"]
+
+        rev = items[0][2]
+        assert rev["revid"] == 1
+        assert rev["parentid"] is None
+        assert rev["timestamp"] == datetime.datetime(2017, 12, 23, 17, 32, 40)
+        assert rev["user"] == "Some user"
+        assert rev["userid"] == 1
+        assert rev["comment"] == "test"
+        assert rev["text"] == "Some text..."
+        assert rev["size"] == 12
+        # converted from base36
+        assert rev["sha1"] == "240799c17265a172c66036e7013ceca294fb0bbe"
+
+        page = items[1][1]
+        assert page == {
+            "pageid": 1,
+            "title": "Test",
+            "ns": 0,
+            "redirect": None,
+            "lastrevid": 1,
+            "touched": datetime.datetime(2017, 12, 23, 17, 32, 40),
+            "length": 12,
+            "contentmodel": "wikitext",
+            "new": True,
+        }
+
+    def test_hidden_and_stub(self):
+        items = list(parse_xml_dump(io.BytesIO(DUMP.encode("utf-8"))))
+        assert [item[0] for item in items] == ["revision", "revision", "page", "logitem"]
+
+        rev = items[0][2]
+        assert rev["user"] == "127.0.0.1"
+        assert rev["userid"] == 0
+        assert rev["commenthidden"] is True
+        assert rev["text"] == ""
+        assert rev["sha1"] is None
+
+        rev = items[1][2]
+        assert rev["userhidden"] is True
+        assert rev["minor"] is True
+        # stub revision - the text is not in the dump
+        assert rev["text"] is None
+        assert rev["size"] == 14
+
+        page = items[2][1]
+        assert page["redirect"] == "Bar"
+        assert page["lastrevid"] == 5
+        assert page["length"] == 14
+        assert page["new"] is False
+
+        logitem = items[3][1]
+        assert logitem["logid"] == 7
+        assert logitem["type"] == "delete"
+        assert logitem["title"] == "Talk:Baz"
+        assert logitem["params"] == "a:0:{}"
+        assert logitem["actionhidden"] is False
+
+    def test_compressed(self, tmpdir):
+        path = str(tmpdir / "dump.xml.gz")
+        with gzip.open(path, "wb") as f:
+            f.write(DUMP.encode("utf-8"))
+        items = list(parse_xml_dump(path))
+        assert len(items) == 4
+
+def test_import(db, fake_api):
+    api = fake_api.api
+    timestamp = db.import_xml_dump(api, FIXTURE)
+    assert timestamp == datetime.datetime(2017, 12, 23, 17, 32, 40)
+
+    with db.engine.connect() as conn:
+        page = conn.execute(db.page.select().where(db.page.c.page_id == 1)).fetchone()
+        assert page.page_title == "Test"
+        assert page.page_latest == 1
+
+        rev = conn.execute(db.revision.select().where(db.revision.c.rev_id == 1)).fetchone()
+        assert rev.rev_user_text == "Some user"
+        assert rev.rev_sha1 == "240799c17265a172c66036e7013ceca294fb0bbe"
+        text = conn.execute(sa.select([db.text.c.old_text]).where(db.text.c.old_id == rev.rev_text_id)).scalar()
+        assert text == "Some text..."
+
+        sync = dict(conn.execute(sa.select([db.ws_sync.c.wss_key, db.ws_sync.c.wss_timestamp])).fetchall())
+        assert sync["GrabberPages"] == timestamp
+        assert sync["GrabberRevisions"] == timestamp
+        # the dump does not contain any log events
+        assert "GrabberLogging" not in sync
+
+def test_export(db, fake_api, tmpdir):
+    db.import_xml_dump(fake_api.api, FIXTURE)
+    path = str(tmpdir / "dump.xml.bz2")
+    db.export_xml_dump(path, history="full", namespaces=[0])
+
+    imported = list(parse_xml_dump(FIXTURE))
+    exported = list(parse_xml_dump(path))
+    assert exported == imported
+
+def test_export_roundtrip():
+    row = types.SimpleNamespace(
+        rev_id=5, rev_parent_id=3, rev_timestamp=datetime.datetime(2018, 1, 2),
+        rev_user=0, rev_user_text="127.0.0.1", rev_minor_edit=True,
+        rev_comment="", rev_deleted=mwconst.DELETED_COMMENT, rev_len=3,
+        rev_sha1="240799c17265a172c66036e7013ceca294fb0bbe",
+        rev_content_model="wikitext", rev_content_format="text/x-wiki",
+        old_text="<a>",
+    )
+    f = io.BytesIO()
+    w = _DumpWriter(f)
+    w.gen.startDocument()
+    w.start("mediawiki", {"xmlns": XMLDumpExporter.xmlns})
+    w.start("page")
+    w.element("title", "Foo")
+    w.element("ns", "0")
+    w.element("id", "2")
+    XMLDumpExporter(None)._write_revision(w, row)
+    w.end("page")
+    w.end("mediawiki")
+    w.gen.endDocument()
+
+    f.seek(0)
+    items = list(parse_xml_dump(f))
+    assert [item[0] for item in items] == ["revision", "page"]
+    rev = items[0][2]
+    assert rev["revid"] == 5
+    assert rev["parentid"] == 3
+    assert rev["user"] == "127.0.0.1"
+    assert rev["minor"] is True
+    assert rev["commenthidden"] is True
+    assert rev["text"] == "<a>"
+    assert rev["sha1"] == "240799c17265a172c66036e7013ceca294fb0bbe"
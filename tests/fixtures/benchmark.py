@@ -0,0 +1,109 @@
+#! /usr/bin/env python3
+
+"""
+Helpers for the benchmarks in ``tests/benchmarks/``.
+"""
+
+import datetime
+import json
+import os
+import platform
+import resource
+import subprocess
+import time
+
+__all__ = ("PeakRSS", "BenchmarkResults")
+
+class PeakRSS:
+    """
+    Context manager measuring the peak resident set size of the process.
+
+    On Linux, the peak is reset when entering the context (by writing ``5``
+    into ``/proc/self/clear_refs``), so only the peak inside the context is
+    measured. Elsewhere, the peak over the lifetime of the process is reported.
+    """
+
+    def __enter__(self):
+        try:
+            with open("/proc/self/clear_refs", "w") as f:
+                f.write("5")
+        except OSError:
+            pass
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.seconds = time.perf_counter() - self.start
+        self.peak_rss_mib = None
+        try:
+            with open("/proc/self/status") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        self.peak_rss_mib = int(line.split()[1]) / 1024
+        except OSError:
+            pass
+        if self.peak_rss_mib is None:
+            # ru_maxrss is in KiB on Linux
+            self.peak_rss_mib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+class BenchmarkResults:
+    """
+    Collects the results of the benchmarks in the session. The results are
+    appended to the history file and compared with the previous run at the
+    end of the session.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.results = {}
+
+    def record(self, scenario, **metrics):
+        self.results.setdefault(scenario, {}).update(metrics)
+
+    def load_history(self):
+        if not os.path.isfile(self.path):
+            return []
+        with open(self.path) as f:
+            return json.load(f)
+
+    def save(self):
+        history = self.load_history()
+        try:
+            revision = subprocess.run(["git", "describe", "--always", "--dirty"],
+                                      stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                      universal_newlines=True).stdout.strip()
+        except OSError:
+            revision = None
+        history.append({
+            "timestamp": datetime.datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "revision": revision,
+            "python": platform.python_version(),
+            "results": self.results,
+        })
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump(history, f, indent=4, sort_keys=True)
+        return history
+
+    @staticmethod
+    def compare(previous, current):
+        """
+        Format a table comparing the metrics of two runs.
+        """
+        lines = []
+        row = "{:<32} {:<36} {:>14} {:>14} {:>9}"
+        lines.append(row.format("scenario", "metric", "previous", "current", "change"))
+        for scenario in sorted(current["results"]):
+            metrics = current["results"][scenario]
+            old_metrics = previous["results"].get(scenario, {}) if previous else {}
+            for metric in sorted(metrics):
+                new = metrics[metric]
+                old = old_metrics.get(metric)
+                if old:
+                    change = "{:+.1f}%".format((new - old) / old * 100)
+                    old = "{:.2f}".format(old)
+                else:
+                    change = ""
+                    old = "-"
+                lines.append(row.format(scenario, metric, old, "{:.2f}".format(new), change))
+        return lines
@@ -0,0 +1,839 @@
+#! /usr/bin/env python3
+
+"""
+A lightweight stand-in for MediaWiki's ``api.php`` serving a synthetic wiki.
+
+Unlike the :py:func:`mediawiki` fixture, which runs a real MediaWiki instance
+with nginx, PHP and PostgreSQL, the :py:class:`FakeAPIServer` is a plain
+:py:mod:`http.server` running in a background thread. It implements the subset
+of the API used by :py:func:`ws.db.grabbers.synchronize` and
+:py:meth:`ws.db.database.Database.sync_revisions_content`, with the same
+response format (``formatversion=1``), limits and query continuation as
+MediaWiki. The content of the wiki is generated by :py:class:`SyntheticWiki`
+from a random seed, so it is deterministic and its scale is configurable.
+"""
+
+import bisect
+import datetime
+import hashlib
+import http.server
+import json
+import random
+import threading
+import urllib.parse
+
+import pytest
+
+from ws.client.api import API
+
+__all__ = ("SyntheticWiki", "FakeAPIServer", "fake_api_server", "fake_api")
+
+LEGALTITLECHARS = " %!\"$&'()*,\\-.\\/0-9:;=?@A-Z\\\\^_`a-z~\\x80-\\xFF+"
+
+NAMESPACES = {
+    -2: "Media",
+    -1: "Special",
+    0: "",
+    1: "Talk",
+    2: "User",
+    3: "User talk",
+    4: "Project",
+    5: "Project talk",
+    6: "File",
+    7: "File talk",
+    8: "MediaWiki",
+    9: "MediaWiki talk",
+    10: "Template",
+    11: "Template talk",
+    12: "Help",
+    13: "Help talk",
+    14: "Category",
+    15: "Category talk",
+}
+
+INTERWIKIMAP = [
+    {"prefix": "de", "local": "", "language": "Deutsch", "url": "https://wiki.example.org/de/$1"},
+    {"prefix": "fr", "local": "", "language": "Français", "url": "https://wiki.example.org/fr/$1"},
+    {"prefix": "wikipedia", "url": "https://en.wikipedia.org/wiki/$1"},
+]
+
+# rights of the user connected to the fake API (a sysop on a real wiki)
+USER_RIGHTS = ["read", "edit", "createpage", "createtalk", "writeapi", "apihighlimits",
+               "noratelimit", "delete", "deletedhistory", "deletedtext", "browsearchive",
+               "patrol", "autopatrol", "move", "applychangetags"]
+
+LOREM = "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor. "
+
+# limits for users with the apihighlimits right
+LIMIT_BIG = 5000
+LIMIT_SMALL = 500
+LIMIT_CONTENT = 50
+
+def _format_ts(timestamp):
+    return timestamp.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def _parse_ts(value):
+    return datetime.datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ")
+
+class SyntheticWiki:
+    """
+    A synthetic wiki with users, pages, revisions, deleted pages, log events
+    and recent changes. All changes happen at distinct timestamps ending at the
+    time of the construction, so the wiki can be synchronized and then grown
+    with :py:meth:`grow` to test incremental synchronization.
+
+    :param int pages: number of pages (excluding templates)
+    :param int revisions: average number of revisions per page
+    :param int users: number of users
+    :param int templates: number of templates; pages transclude random
+        templates and templates are nested up to ``template_depth`` levels
+    :param int template_depth: maximum nesting of templates
+    :param int deleted_pages: number of pages which are deleted at the end of
+        the history
+    :param int content_size: approximate size of the content of revisions
+    :param int seed: seed for the random number generator
+    """
+
+    def __init__(self, *, pages=100, revisions=3, users=10, templates=0, template_depth=3,
+                 deleted_pages=0, content_size=1000, seed=0):
+        self.content_size = content_size
+        self.template_depth = template_depth
+        self._random = random.Random(seed)
+
+        self.users = []
+        self.pages = {}
+        self.titles = {}
+        # all revisions, including deleted, indexed by revid
+        self.revisions = {}
+        self.logevents = []
+        self.recentchanges = []
+        # texts of revisions created by action=edit
+        self._texts = {}
+        # names of the templates (without the namespace prefix)
+        self._templates = ["Template {}".format(i) for i in range(templates)]
+        # deleted page IDs indexed by title
+        self._deleted_titles = {}
+        # derived data for the API, cleared on every change
+        self._cache = {}
+
+        # number of ticks needed to build the history (users and pages
+        # need two ticks, for the creation and the log event)
+        n_events = 2 * users + 2 * templates + pages * (revisions + 1) + deleted_pages
+        self._now = datetime.datetime.utcnow().replace(microsecond=0) - datetime.timedelta(seconds=n_events)
+
+        for i in range(users):
+            self.create_user("Admin" if i == 0 else "User {}".format(i))
+        for name in self._templates:
+            self.create_page("Template:" + name)
+        created = [self.create_page("Page {}".format(i)) for i in range(pages)]
+        for i in range(pages * revisions - pages):
+            self.edit_page(self._random.choice(created))
+        for pageid in self._random.sample(created, min(deleted_pages, len(created))):
+            self.delete_page(pageid)
+
+    def _tick(self):
+        self._cache.clear()
+        # all events happen at distinct times, but never in the future
+        self._now = max(self._now + datetime.timedelta(seconds=1),
+                        datetime.datetime.utcnow().replace(microsecond=0))
+        return self._now
+
+    def _user(self):
+        return self._random.choice(self.users)
+
+    def _text(self, revid):
+        if revid in self._texts:
+            return self._texts[revid]
+        rev = self.revisions[revid]
+        page = self.pages[rev["pageid"]]
+        rnd = random.Random(revid)
+        parts = ["== Section {} ==\n".format(revid)]
+        # transclude templates, templates transclude only templates with a higher index
+        if page["ns"] == 10:
+            name = page["title"][len("Template:"):]
+            if name in self._templates:
+                index = self._templates.index(name)
+                if (index + 1) % self.template_depth != 0 and index + 1 < len(self._templates):
+                    parts.append("{{" + self._templates[index + 1] + "}}\n")
+        else:
+            for name in rnd.sample(self._templates, min(2, len(self._templates))):
+                parts.append("{{" + name + "}}\n")
+        parts.append("[[Page {}]] [[Category:Category {}]]\n".format(rnd.randrange(1000), rnd.randrange(10)))
+        parts.append(LOREM * max(1, self.content_size // len(LOREM)))
+        return "".join(parts)
+
+    def create_user(self, name):
+        user = {
+            "userid": len(self.users) + 1,
+            "name": name,
+            "groups": ["*", "user", "autoconfirmed"] + (["sysop"] if not self.users else []),
+            "editcount": 0,
+            "registration": self._tick(),
+        }
+        self.users.append(user)
+        self._log("newusers", "create", "User:" + name, 0, user, params={"userid": user["userid"]})
+        return user["userid"]
+
+    def create_page(self, title, text=None, user=None):
+        user = user or self._user()
+        ns = 0
+        if ":" in title:
+            prefix = title.split(":", 1)[0]
+            for id, name in NAMESPACES.items():
+                if name == prefix:
+                    ns = id
+        pageid = len(self.pages) + 1
+        page = {"pageid": pageid, "ns": ns, "title": title, "revisions": [], "deleted": False}
+        self.pages[pageid] = page
+        self.titles[title] = pageid
+        self._add_revision(page, user, "create page", text)
+        self._log("create", "create", title, pageid, user)
+        return pageid
+
+    def edit_page(self, pageid, text=None, user=None, summary="edit"):
+        return self._add_revision(self.pages[pageid], user or self._user(), summary, text)
+
+    def delete_page(self, pageid, user=None):
+        page = self.pages[pageid]
+        page["deleted"] = True
+        del self.titles[page["title"]]
+        self._deleted_titles.setdefault(page["title"], []).append(pageid)
+        self._log("delete", "delete", page["title"], pageid, user or self.users[0])
+
+    def grow(self, *, pages=0, edits=0, deleted_pages=0):
+        """
+        Add new changes to the wiki, their timestamps are in the future
+        relative to all previous changes.
+        """
+        existing = [p["pageid"] for p in self.pages.values() if not p["deleted"]]
+        first = len(self.pages)
+        for i in range(pages):
+            existing.append(self.create_page("New page {}".format(first + i)))
+        for i in range(edits):
+            self.edit_page(self._random.choice(existing))
+        for pageid in self._random.sample(existing, min(deleted_pages, len(existing))):
+            self.delete_page(pageid)
+
+    def _add_revision(self, page, user, comment, text=None):
+        revid = len(self.revisions) + 1
+        parent = page["revisions"][-1] if page["revisions"] else None
+        rev = {
+            "revid": revid,
+            "parentid": parent["revid"] if parent else 0,
+            "pageid": page["pageid"],
+            "user": user["name"],
+            "userid": user["userid"],
+            "timestamp": self._tick(),
+            "comment": comment,
+            "minor": self._random.random() < 0.3 and parent is not None,
+        }
+        self.revisions[revid] = rev
+        page["revisions"].append(rev)
+        if text is not None:
+            self._texts[revid] = text
+        content = self._text(revid).encode("utf-8")
+        rev["size"] = len(content)
+        rev["sha1"] = hashlib.sha1(content).hexdigest()
+        user["editcount"] += 1
+
+        rc = {
+            "type": "new" if parent is None else "edit",
+            "ns": page["ns"],
+            "title": page["title"],
+            "pageid": page["pageid"],
+            "revid": revid,
+            "old_revid": parent["revid"] if parent else 0,
+            "rcid": len(self.recentchanges) + 1,
+            "user": user["name"],
+            "userid": user["userid"],
+            "oldlen": parent["size"] if parent else 0,
+            "newlen": rev["size"],
+            "timestamp": rev["timestamp"],
+            "comment": comment,
+            "sha1": rev["sha1"],
+            "tags": [],
+        }
+        if parent is None:
+            rc["new"] = ""
+        if rev["minor"]:
+            rc["minor"] = ""
+        self.recentchanges.append(rc)
+        return revid
+
+    def _log(self, type, action, title, pageid, user, params=None):
+        ns = 0
+        if ":" in title:
+            prefix = title.split(":", 1)[0]
+            for id, name in NAMESPACES.items():
+                if name == prefix:
+                    ns = id
+        le = {
+            "logid": len(self.logevents) + 1,
+            "ns": ns,
+            "title": title,
+            "pageid": pageid if type != "delete" else 0,
+            "logpage": pageid,
+            "params": params or {},
+            "type": type,
+            "action": action,
+            "user": user["name"],
+            "userid": user["userid"],
+            "timestamp": self._tick(),
+            "comment": "",
+            "tags": [],
+        }
+        self.logevents.append(le)
+        # MediaWiki does not list page creations as log entries in recentchanges
+        if type != "create":
+            self.recentchanges.append({
+                "type": "log",
+                "ns": ns,
+                "title": title,
+                "pageid": pageid,
+                "revid": 0,
+                "old_revid": 0,
+                "rcid": len(self.recentchanges) + 1,
+                "user": user["name"],
+                "userid": user["userid"],
+                "oldlen": 0,
+                "newlen": 0,
+                "timestamp": le["timestamp"],
+                "comment": "",
+                "logid": le["logid"],
+                "logtype": type,
+                "logaction": action,
+                "logparams": le["params"],
+                "tags": [],
+            })
+
+    # API implementation
+
+    def api(self, params):
+        """
+        Handle an ``api.php`` request.
+
+        :param dict params: the parameters of the request (str values)
+        :returns: a JSON-serializable dictionary
+        """
+        action = params.get("action", "help")
+        try:
+            if action == "query":
+                return self._query(params)
+            elif action == "edit":
+                return self._edit(params)
+            raise _APIError("unknown_action", "Unrecognized value for parameter \"action\": {}.".format(action))
+        except _APIError as e:
+            return {"error": {"code": e.code, "info": e.info}}
+
+    @staticmethod
+    def _limit(params, name, maximum):
+        value = params.get(name, "10")
+        if value == "max":
+            return maximum
+        return min(int(value), maximum)
+
+    @staticmethod
+    def _props(params, name):
+        return set(params.get(name, "").split("|")) - {""}
+
+    def _query(self, params):
+        result = {"batchcomplete": ""}
+        query = {}
+        cont = {}
+
+        for meta in self._props(params, "meta"):
+            if meta == "siteinfo":
+                query.update(self._siteinfo(self._props(params, "siprop") or {"general"}))
+            elif meta == "userinfo":
+                query["userinfo"] = self._userinfo(self._props(params, "uiprop"))
+            elif meta == "tokens":
+                query["tokens"] = {"csrftoken": "fake-csrf-token+\\"}
+            else:
+                raise _APIError("unknown_meta", "Unrecognized value for parameter \"meta\": {}.".format(meta))
+
+        list_ = params.get("list")
+        if list_:
+            handler = getattr(self, "_list_" + list_, None)
+            if handler is None:
+                raise _APIError("unknown_list", "Unrecognized value for parameter \"list\": {}.".format(list_))
+            query[list_], list_cont = handler(params)
+            cont.update(list_cont)
+
+        if "generator" in params:
+            if params["generator"] != "allpages":
+                raise _APIError("unknown_generator", "Unrecognized value for parameter \"generator\": {}.".format(params["generator"]))
+            pages, gen_cont = self._list_allpages(params, prefix="gap")
+            cont.update(gen_cont)
+            self._add_pages(query, params, [self.pages[p["pageid"]] for p in pages])
+        elif "titles" in params:
+            pages = []
+            for title in params["titles"].split("|"):
+                if title in self.titles:
+                    pages.append(self.pages[self.titles[title]])
+                else:
+                    pages.append({"title": title, "ns": 0, "missing": True})
+            self._add_pages(query, params, pages)
+        elif "pageids" in params:
+            pages = []
+            for pageid in params["pageids"].split("|"):
+                page = self.pages.get(int(pageid))
+                if page is None or page["deleted"]:
+                    pages.append({"pageid": int(pageid), "missing": True})
+                else:
+                    pages.append(page)
+            self._add_pages(query, params, pages)
+        elif "revids" in params:
+            revids = [int(r) for r in params["revids"].split("|")]
+            pages = []
+            for revid in revids:
+                page = self.pages[self.revisions[revid]["pageid"]]
+                if page not in pages:
+                    pages.append(page)
+            self._add_pages(query, params, pages, revids=set(revids))
+
+        if query:
+            result["query"] = query
+        if cont:
+            cont["continue"] = "-||"
+            result["continue"] = cont
+            del result["batchcomplete"]
+        return result
+
+    def _siteinfo(self, siprop):
+        result = {}
+        for prop in siprop:
+            if prop == "general":
+                result["general"] = {
+                    "mainpage": "Main page",
+                    "sitename": "FakeWiki",
+                    "generator": "MediaWiki 1.33.1",
+                    "case": "first-letter",
+                    "lang": "en",
+                    "legaltitlechars": LEGALTITLECHARS,
+                    "server": "http://localhost",
+                    "articlepath": "/index.php/$1",
+                    "scriptpath": "",
+                }
+            elif prop == "namespaces":
+                namespaces = {}
+                for id, name in NAMESPACES.items():
+                    ns = {"id": id, "case": "first-letter", "*": name}
+                    if id != 0:
+                        ns["canonical"] = name
+                    if id >= 0 and id != 0 and id != 6 and id != 14:
+                        ns["subpages"] = ""
+                    if id == 0:
+                        ns["content"] = ""
+                    namespaces[str(id)] = ns
+                result["namespaces"] = namespaces
+            elif prop == "namespacealiases":
+                result["namespacealiases"] = [{"id": 6, "*": "Image"}, {"id": 7, "*": "Image talk"}]
+            elif prop == "interwikimap":
+                result["interwikimap"] = INTERWIKIMAP
+            elif prop == "statistics":
+                existing = [p for p in self.pages.values() if not p["deleted"]]
+                result["statistics"] = {
+                    "pages": len(existing),
+                    "articles": sum(1 for p in existing if p["ns"] == 0),
+                    "edits": len(self.revisions),
+                    "images": 0,
+                    "users": len(self.users),
+                    "activeusers": len(self.users),
+                    "admins": 1,
+                    "jobs": 0,
+                }
+            else:
+                raise _APIError("unknown_siprop", "Unrecognized value for parameter \"siprop\": {}.".format(prop))
+        return result
+
+    def _userinfo(self, uiprop):
+        user = self.users[0]
+        result = {"id": user["userid"], "name": user["name"]}
+        if "rights" in uiprop:
+            result["rights"] = USER_RIGHTS
+        if "groups" in uiprop:
+            result["groups"] = user["groups"]
+        if "ratelimits" in uiprop:
+            result["ratelimits"] = {}
+        return result
+
+    def _cached(self, key, func):
+        if key not in self._cache:
+            self._cache[key] = func()
+        return self._cache[key]
+
+    def _select(self, key, items, params, prefix, limit):
+        """
+        Select the items for the current response of a list module and return
+        them with the continuation parameters.
+
+        :param key: key for caching the timestamps of ``items``
+        :param list items: items sorted by their timestamps
+        :returns: a ``(items, continue)`` tuple
+
+        The continuation value is an offset into the items matching the time
+        range given by the ``start``, ``end`` and ``dir`` parameters, which is
+        stable because new changes are always appended at the end.
+        """
+        timestamps = self._cached(("timestamps", key), lambda: [i["timestamp"] for i in items])
+        newer = params.get(prefix + "dir", "older") == "newer"
+        start = params.get(prefix + "start")
+        end = params.get(prefix + "end")
+        lo = 0
+        hi = len(items)
+        if newer:
+            if start is not None:
+                lo = bisect.bisect_left(timestamps, _parse_ts(start))
+            if end is not None:
+                hi = bisect.bisect_right(timestamps, _parse_ts(end))
+        else:
+            if start is not None:
+                hi = bisect.bisect_right(timestamps, _parse_ts(start))
+            if end is not None:
+                lo = bisect.bisect_left(timestamps, _parse_ts(end))
+        total = max(hi - lo, 0)
+
+        offset = int(params.get(prefix + "continue", 0))
+        if newer:
+            selected = items[lo + offset:min(lo + offset + limit, hi)]
+        else:
+            stop = hi - offset
+            selected = items[max(stop - limit, lo):max(stop, lo)][::-1]
+        if offset + limit < total:
+            return selected, {prefix + "continue": str(offset + limit)}
+        return selected, {}
+
+    @staticmethod
+    def _paginate(items, params, prefix, limit):
+        offset = int(params.get(prefix + "continue", 0))
+        if offset + limit < len(items):
+            return items[offset:offset + limit], {prefix + "continue": str(offset + limit)}
+        return items[offset:offset + limit], {}
+
+    def _list_recentchanges(self, params):
+        items = self.recentchanges
+        key = "recentchanges"
+        if "rctype" in params:
+            types = self._props(params, "rctype")
+            key = ("recentchanges", params["rctype"])
+            items = self._cached(key, lambda: [rc for rc in self.recentchanges if rc["type"] in types])
+        items, cont = self._select(key, items, params, "rc", self._limit(params, "rclimit", LIMIT_BIG))
+        patrolled = "patrolled" in self._props(params, "rcprop")
+        result = []
+        for rc in items:
+            rc = dict(rc)
+            if patrolled:
+                rc["patrolled"] = ""
+            result.append(rc)
+        return result, cont
+
+    def _list_logevents(self, params):
+        items = self.logevents
+        key = "logevents"
+        if "letype" in params:
+            key = ("logevents", params["letype"])
+            items = self._cached(key, lambda: [le for le in self.logevents if le["type"] == params["letype"]])
+        elif "leaction" in params:
+            type, action = params["leaction"].split("/")
+            key = ("logevents", params["leaction"])
+            items = self._cached(key, lambda: [le for le in self.logevents if le["type"] == type and le["action"] == action])
+        return self._select(key, items, params, "le", self._limit(params, "lelimit", LIMIT_BIG))
+
+    def _list_allusers(self, params):
+        items = self._cached("allusers", lambda: sorted(self.users, key=lambda u: u["name"]))
+        items, cont = self._paginate(items, params, "au", self._limit(params, "aulimit", LIMIT_SMALL))
+        return [self._format_user(u) for u in items], cont
+
+    def _list_users(self, params):
+        by_name = dict((u["name"], u) for u in self.users)
+        result = []
+        for name in params.get("ususers", "").split("|"):
+            if name in by_name:
+                result.append(self._format_user(by_name[name]))
+            else:
+                result.append({"name": name, "missing": ""})
+        return result, {}
+
+    @staticmethod
+    def _format_user(user):
+        user = dict(user)
+        user["groupmemberships"] = [{"group": g, "expiry": "infinity"} for g in user["groups"] if g == "sysop"]
+        return user
+
+    def _list_blocks(self, params):
+        return [], {}
+
+    def _list_protectedtitles(self, params):
+        return [], {}
+
+    def _list_tags(self, params):
+        return [], {}
+
+    def _list_allpages(self, params, prefix="ap"):
+        ns = int(params.get(prefix + "namespace", 0))
+        items = self._cached(("allpages", ns),
+                             lambda: sorted((p for p in self.pages.values() if p["ns"] == ns and not p["deleted"]),
+                                            key=lambda p: p["title"]))
+        items, cont = self._paginate(items, params, prefix, self._limit(params, prefix + "limit", LIMIT_BIG))
+        return [{"pageid": p["pageid"], "ns": p["ns"], "title": p["title"]} for p in items], cont
+
+    def _format_revision(self, rev, prop, slots):
+        result = {}
+        if "ids" in prop:
+            result["revid"] = rev["revid"]
+            result["parentid"] = rev["parentid"]
+        if "flags" in prop and rev["minor"]:
+            result["minor"] = ""
+        if "timestamp" in prop:
+            result["timestamp"] = rev["timestamp"]
+        if "user" in prop:
+            result["user"] = rev["user"]
+        if "userid" in prop:
+            result["userid"] = rev["userid"]
+        if "comment" in prop:
+            result["comment"] = rev["comment"]
+        if "size" in prop:
+            result["size"] = rev["size"]
+        if "sha1" in prop:
+            result["sha1"] = rev["sha1"]
+        if "tags" in prop:
+            result["tags"] = []
+        slot = {}
+        if "contentmodel" in prop:
+            slot["contentmodel"] = "wikitext"
+        if "content" in prop:
+            slot["contentformat"] = "text/x-wiki"
+            slot["*"] = self._text(rev["revid"])
+        if slot:
+            if slots:
+                result["slots"] = {"main": slot}
+            else:
+                result.update(slot)
+        return result
+
+    def _list_allrevisions(self, params, prefix="arv", deleted=False):
+        prop = self._props(params, prefix + "prop") or {"ids", "timestamp", "flags", "comment", "user"}
+        limit = self._limit(params, prefix + "limit", LIMIT_CONTENT if "content" in prop else LIMIT_SMALL)
+        key = ("revisions", deleted)
+        items = self._cached(key, lambda: [rev for rev in self.revisions.values()
+                                           if self.pages[rev["pageid"]]["deleted"] is deleted])
+        items, cont = self._select(key, items, params, prefix, limit)
+        # consecutive revisions of the same page are grouped
+        result = []
+        for rev in items:
+            page = self.pages[rev["pageid"]]
+            if not result or result[-1]["title"] != page["title"]:
+                result.append({
+                    "pageid": 0 if deleted else page["pageid"],
+                    "revisions": [],
+                    "ns": page["ns"],
+                    "title": page["title"],
+                })
+            result[-1]["revisions"].append(self._format_revision(rev, prop, prefix + "slots" in params))
+        return result, cont
+
+    def _list_alldeletedrevisions(self, params):
+        return self._list_allrevisions(params, prefix="adr", deleted=True)
+
+    def _add_pages(self, query, params, pages, revids=None):
+        props = self._props(params, "prop")
+        inprop = self._props(params, "inprop")
+        result = query.setdefault("pages", {})
+        missing_id = -1
+        for page in pages:
+            if page.get("missing") is True:
+                entry = dict((k, v) for k, v in page.items() if k != "missing")
+                entry["missing"] = ""
+                if "protection" in inprop:
+                    entry["protection"] = []
+                if "pageid" in entry:
+                    key = str(entry["pageid"])
+                else:
+                    key = str(missing_id)
+                    missing_id -= 1
+                # deleted revisions are available for missing pages
+                if "deletedrevisions" in props:
+                    archived = [self.pages[pageid] for pageid in self._deleted_titles.get(entry.get("title"), [])]
+                    if archived:
+                        prop = self._props(params, "drvprop")
+                        entry["deletedrevisions"] = [self._format_revision(rev, prop, "drvslots" in params)
+                                                     for p in archived for rev in p["revisions"]]
+                result[key] = entry
+                continue
+
+            entry = {"pageid": page["pageid"], "ns": page["ns"], "title": page["title"]}
+            latest = page["revisions"][-1]
+            if "info" in props:
+                entry.update({
+                    "contentmodel": "wikitext",
+                    "pagelanguage": "en",
+                    "pagelanguagehtmlcode": "en",
+                    "pagelanguagedir": "ltr",
+                    "touched": latest["timestamp"],
+                    "lastrevid": latest["revid"],
+                    "length": latest["size"],
+                })
+                if len(page["revisions"]) == 1:
+                    entry["new"] = ""
+                if "protection" in inprop:
+                    entry["protection"] = []
+                    entry["restrictiontypes"] = ["edit", "move"]
+            if "revisions" in props:
+                prop = self._props(params, "rvprop") or {"ids", "timestamp", "flags", "comment", "user"}
+                if revids is not None:
+                    revs = [rev for rev in page["revisions"] if rev["revid"] in revids]
+                elif "rvlimit" in params and len(pages) == 1:
+                    revs = page["revisions"]
+                    if params.get("rvdir", "older") == "older":
+                        revs = revs[::-1]
+                else:
+                    revs = [latest]
+                entry["revisions"] = [self._format_revision(rev, prop, "rvslots" in params) for rev in revs]
+            result[str(page["pageid"])] = entry
+
+    def _edit(self, params):
+        if params.get("token") != "fake-csrf-token+\\":
+            raise _APIError("badtoken", "Invalid CSRF token.")
+        text = params.get("text", "")
+        user = self.users[0]
+        if "pageid" in params:
+            pageid = int(params["pageid"])
+        else:
+            pageid = self.titles.get(params.get("title"))
+        if pageid is None or self.pages[pageid]["deleted"]:
+            if "nocreate" in params:
+                raise _APIError("missingtitle", "The page you specified doesn't exist.")
+            pageid = self.create_page(params["title"], text=text, user=user)
+            page = self.pages[pageid]
+            return {"edit": {"result": "Success", "pageid": pageid, "title": page["title"],
+                             "contentmodel": "wikitext", "new": "", "oldrevid": 0,
+                             "newrevid": page["revisions"][-1]["revid"],
+                             "newtimestamp": _format_ts(page["revisions"][-1]["timestamp"])}}
+        if "createonly" in params:
+            raise _APIError("articleexists", "The article you tried to create has been created already.")
+        page = self.pages[pageid]
+        latest = page["revisions"][-1]
+        if "basetimestamp" in params and _parse_ts(params["basetimestamp"]) < latest["timestamp"]:
+            raise _APIError("editconflict", "Edit conflict.")
+        if text == self._text(latest["revid"]):
+            return {"edit": {"result": "Success", "pageid": pageid, "title": page["title"],
+                             "contentmodel": "wikitext", "nochange": ""}}
+        revid = self.edit_page(pageid, text=text, user=user, summary=params.get("summary", ""))
+        return {"edit": {"result": "Success", "pageid": pageid, "title": page["title"],
+                         "contentmodel": "wikitext", "oldrevid": latest["revid"], "newrevid": revid,
+                         "newtimestamp": _format_ts(self.revisions[revid]["timestamp"])}}
+
+class _APIError(Exception):
+    def __init__(self, code, info):
+        self.code = code
+        self.info = info
+
+class _DatetimeEncoder(json.JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, datetime.datetime):
+            return _format_ts(obj)
+        return super().default(obj)
+
+class _RequestHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # the headers and body are written separately, avoid delayed ACKs
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        self._handle(url.path, url.query)
+
+    def do_POST(self):
+        url = urllib.parse.urlsplit(self.path)
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length).decode("utf-8")
+        self._handle(url.path, url.query + "&" + body if url.query else body)
+
+    def _handle(self, path, query):
+        # PHP keeps the last value of repeated parameters
+        params = dict(urllib.parse.parse_qsl(query, keep_blank_values=True))
+        if path != "/api.php":
+            self.send_error(404)
+            return
+        with self.server.lock:
+            result = self.server.wiki.api(params)
+            body = json.dumps(result, cls=_DatetimeEncoder).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class FakeAPIServer:
+    """
+    An HTTP server running :py:meth:`SyntheticWiki.api` in a background
+    thread. The :py:attr:`wiki` attribute can be replaced at any time.
+
+    :param SyntheticWiki wiki: the served wiki (default: a small wiki)
+    """
+
+    def __init__(self, wiki=None, host="127.0.0.1", port=0):
+        self._server = http.server.ThreadingHTTPServer((host, port), _RequestHandler)
+        self._server.daemon_threads = True
+        self._server.lock = threading.Lock()
+        self.wiki = wiki or SyntheticWiki()
+        self._thread = None
+
+    @property
+    def wiki(self):
+        return self._server.wiki
+
+    @wiki.setter
+    def wiki(self, wiki):
+        self._server.wiki = wiki
+
+    @property
+    def api_url(self):
+        host, port = self._server.server_address[:2]
+        return "http://{}:{}/api.php".format(host, port)
+
+    @property
+    def index_url(self):
+        host, port = self._server.server_address[:2]
+        return "http://{}:{}/index.php".format(host, port)
+
+    def make_api(self):
+        """
+        :returns: a new :py:class:`ws.client.api.API` instance connected to the server
+        """
+        return API(self.api_url, self.index_url, API.make_session())
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="FakeAPIServer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+@pytest.fixture(scope="session")
+def fake_api_server():
+    with FakeAPIServer() as server:
+        yield server
+
+@pytest.fixture(scope="function")
+def fake_api(fake_api_server):
+    """
+    Return a :py:class:`FakeAPIServer` serving a fresh small
+    :py:class:`SyntheticWiki`. The ``api`` attribute is an
+    :py:class:`ws.client.api.API` instance connected to the server.
+    """
+    fake_api_server.wiki = SyntheticWiki(pages=20, revisions=3, users=5, deleted_pages=2)
+    fake_api_server.api = fake_api_server.make_api()
+    return fake_api_server
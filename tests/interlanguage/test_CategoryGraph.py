@@ -0,0 +1,79 @@
+#! /usr/bin/env python3
+
+import random
+import sys
+
+from ws.interlanguage.CategoryGraph import CategoryGraph
+
+def recursive_walk(graph, node, levels=None, visited=None):
+    # reference implementation (the original recursive walk)
+    if levels is None:
+        levels = []
+    if visited is None:
+        visited = set()
+    for i, child in enumerate(sorted(graph.get(node, []), key=str.lower)):
+        if child not in visited:
+            levels.append(i)
+            visited.add(child)
+            yield child, node, list(levels)
+            yield from recursive_walk(graph, child, levels, visited)
+            visited.remove(child)
+            levels.pop(-1)
+
+def walk(graph, node):
+    return [(child, parent, list(levels)) for child, parent, levels in CategoryGraph.walk(graph, node)]
+
+class test_walk:
+    graph = {
+        "Category:English": ["Category:b", "Category:A", "Category:C"],
+        "Category:A": ["Category:A1", "Category:a2"],
+        "Category:C": ["Category:A", "Category:C1"],
+        # cycle
+        "Category:C1": ["Category:C"],
+    }
+
+    def test_empty(self):
+        assert walk(self.graph, "Category:Nonexisting") == []
+
+    def test_order(self):
+        expected = [
+            ("Category:A", "Category:English", [0]),
+            ("Category:A1", "Category:A", [0, 0]),
+            ("Category:a2", "Category:A", [0, 1]),
+            ("Category:b", "Category:English", [1]),
+            ("Category:C", "Category:English", [2]),
+            ("Category:A", "Category:C", [2, 0]),
+            ("Category:A1", "Category:A", [2, 0, 0]),
+            ("Category:a2", "Category:A", [2, 0, 1]),
+            ("Category:C1", "Category:C", [2, 1]),
+        ]
+        assert walk(self.graph, "Category:English") == expected
+
+    def test_random(self):
+        rng = random.Random(0)
+        nodes = ["Category:{}".format(i) for i in range(30)]
+        graph = {}
+        for node in nodes:
+            graph[node] = rng.sample(nodes, rng.randint(0, 3))
+        assert walk(graph, nodes[0]) == list(recursive_walk(graph, nodes[0]))
+
+    def test_deep(self):
+        depth = sys.getrecursionlimit() * 2
+        graph = {"Category:{}".format(i): ["Category:{}".format(i + 1)] for i in range(depth)}
+        result = walk(graph, "Category:0")
+        assert len(result) == depth
+        assert result[-1][0] == "Category:{}".format(depth)
+        assert len(result[-1][2]) == depth
+
+class test_compare_components:
+    def test_translations(self):
+        graph = {
+            "Category:English": ["Category:Foo", "Category:Bar"],
+            "Category:Česky": ["Category:Foo (Česky)", "Category:Baz (Česky)"],
+        }
+        result = list(CategoryGraph.compare_components(graph, "Category:English", "Category:Česky"))
+        assert result == [
+            (("Category:Bar", "Category:English", [0]), None),
+            (None, ("Category:Baz (Česky)", "Category:Česky", [0])),
+            (("Category:Foo", "Category:English", [1]), ("Category:Foo (Česky)", "Category:Česky", [1])),
+        ]
@@ -5,7 +5,7 @@ import warnings
 import sqlalchemy as sa
 import pytest
 
-from ws.client.api import LoginFailed
+from ws.client.api import API, LoginFailed
 
 class test_simple_queries:
 # TODO: figure out how to restore the fixture state after the test
@@ -138,3 +138,45 @@ class test_query_continue:
     def test_query_continue_params_kwargs(self, mediawiki):
         with pytest.raises(ValueError):
             next(mediawiki.api.query_continue(params={"foo": 0}, bar=1))
+
+    def test_list_stream(self, mediawiki):
+        pytest.importorskip("ijson")
+        mediawiki.clear()
+        api = mediawiki.api
+
+        for title in self.titles:
+            api.create(title, title, title)
+
+        pages = api.list(list="allpages", aplimit=3, stream=True)
+        assert [p["title"] for p in pages] == self.titles
+
+    def test_generator_stream(self, mediawiki):
+        pytest.importorskip("ijson")
+        mediawiki.clear()
+        api = mediawiki.api
+
+        for title in self.titles:
+            api.create(title, title, title)
+
+        pages = api.generator(generator="allpages", gaplimit=3, prop="revisions", rvprop="content|timestamp", rvslots="main", stream=True)
+        pages = sorted(pages, key=lambda p: p["title"])
+        assert [p["title"] for p in pages] == self.titles
+        assert [p["revisions"][0]["slots"]["main"]["*"] for p in pages] == self.titles
+
+class test_site_cache:
+    def test_persistent(self, mediawiki, tmp_path):
+        api = API(mediawiki.api.api_url, mediawiki.api.index_url, mediawiki.api.session, cache_dir=str(tmp_path))
+        general = api.site.general
+        assert len(list(tmp_path.iterdir())) == 1
+
+        # a new instance must not query the API
+        api2 = API(mediawiki.api.api_url, mediawiki.api.index_url, mediawiki.api.session, cache_dir=str(tmp_path))
+        api2.call_api = None
+        assert api2.site.general == general
+        assert api2.site.namespaces == api.site.namespaces
+
+    def test_invalidate(self, mediawiki, tmp_path):
+        api = API(mediawiki.api.api_url, mediawiki.api.index_url, mediawiki.api.session, cache_dir=str(tmp_path))
+        api.site.general
+        api.site.invalidate()
+        assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,61 @@
+#! /usr/bin/env python3
+
+import pytest
+
+from ws.client.edit_queue import EditQueue
+
+class test_edit_queue:
+    titles = ["Test {}".format(i) for i in range(5)]
+
+    def _get_content_api(self, api, title):
+        result = api.call_api(action="query", titles=title, prop="revisions", rvprop="content|timestamp", rvslots="main")
+        page = list(result["pages"].values())[0]
+        text = page["revisions"][0]["slots"]["main"]["*"]
+        timestamp = page["revisions"][0]["timestamp"]
+        return text, timestamp, page["pageid"]
+
+    def test_create(self, mediawiki):
+        mediawiki.clear()
+        api = mediawiki.api
+        with EditQueue(api) as queue:
+            for title in self.titles:
+                queue.create(title, title, title)
+        assert [r.title for r in queue.report] == self.titles
+        assert all(r.status == "success" for r in queue.report)
+        pages = api.list(list="allpages", aplimit="max")
+        assert [p["title"] for p in pages] == self.titles
+
+    def test_closed(self, mediawiki):
+        queue = EditQueue(mediawiki.api)
+        queue.join()
+        with pytest.raises(ValueError):
+            queue.create("Test", "Test", "Test")
+
+    def test_failed(self, mediawiki):
+        mediawiki.clear()
+        api = mediawiki.api
+        api.create("Test page", "text", "summary")
+        with EditQueue(api) as queue:
+            # createonly fails on an existing page
+            queue.create("Test page", "text", "summary")
+        result = queue.report[0]
+        assert result.status == "failed"
+        assert result.error.server_response["code"] == "articleexists"
+
+    def test_edit_conflict(self, mediawiki):
+        mediawiki.clear()
+        api = mediawiki.api
+        api.create("Test page", "a", "summary")
+        text, timestamp, pageid = self._get_content_api(api, "Test page")
+        # make the base revision outdated
+        api.edit("Test page", pageid, "b", timestamp, "summary 1")
+
+        def rebase(title, text):
+            return text + "c"
+
+        with EditQueue(api) as queue:
+            queue.edit("Test page", pageid, "ac", timestamp, "summary 2", rebase=rebase)
+        result = queue.report[0]
+        assert result.status == "success"
+        assert result.conflicts == 1
+        assert self._get_content_api(api, "Test page")[0] == "bc"
@@ -0,0 +1,50 @@
+#! /usr/bin/env python3
+
+import json
+
+import pytest
+
+from ws.client import APIError
+from ws.client.instrumentation import MetricsCollector
+
+class test_metrics_collector:
+    @pytest.fixture
+    def collector(self, mediawiki):
+        collector = MetricsCollector()
+        collector.install(mediawiki.api)
+        yield collector
+        collector.uninstall(mediawiki.api)
+
+    def test_requests(self, mediawiki, collector):
+        api = mediawiki.api
+        api.call_api(action="query", meta="siteinfo")
+        api.call_api(action="query", meta="siteinfo")
+        list(api.list(list="allpages", aplimit="max"))
+        data = collector.to_dict()
+        modules = {(m["action"], m["module"]): m for m in data["modules"]}
+        siteinfo = modules[("query", "meta=siteinfo")]
+        assert siteinfo["requests"] == 2
+        assert siteinfo["errors"] == 0
+        assert siteinfo["response_bytes"] > 0
+        # the +Inf bucket counts all requests
+        assert siteinfo["latency_seconds_buckets"][-1] == ["+Inf", 2]
+        assert ("query", "list=allpages") in modules
+
+    def test_api_error(self, mediawiki, collector):
+        with pytest.raises(APIError):
+            mediawiki.api.call_api(action="query", list="allpages", apnamespace=-42)
+        data = collector.to_dict()
+        assert data["events"][0]["event"] == "api_error"
+        assert data["events"][0]["count"] == 1
+
+    def test_dump(self, mediawiki, collector, tmp_path):
+        mediawiki.api.call_api(action="query", meta="siteinfo")
+        path = str(tmp_path / "metrics.json")
+        collector.dump(path)
+        with open(path) as f:
+            assert json.load(f) == collector.to_dict()
+        path = str(tmp_path / "metrics.prom")
+        collector.dump(path)
+        with open(path) as f:
+            text = f.read()
+        assert 'ws_api_requests_total{entry="api",action="query",module="meta=siteinfo"} 1' in text
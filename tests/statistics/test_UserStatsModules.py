@@ -0,0 +1,52 @@
+#! /usr/bin/env python3
+
+import pytest
+
+from ws.statistics.UserStatsModules import UserStatsModules
+
+@pytest.fixture(scope="function")
+def synced_db(db, fake_api):
+    db.sync_with_api(fake_api.api)
+    return db
+
+def test_invalid_backend(synced_db):
+    with pytest.raises(ValueError):
+        UserStatsModules(synced_db, backend="foo")
+
+@pytest.mark.parametrize("round_to_midnight", [False, True])
+def test_backends_agree(synced_db, round_to_midnight):
+    sql = UserStatsModules(synced_db, round_to_midnight=round_to_midnight, backend="sql")
+    py = UserStatsModules(synced_db, round_to_midnight=round_to_midnight, backend="python")
+    # the same "today" is needed for comparable results
+    py.today = sql.today
+
+    assert sorted(sql.users()) == sorted(py.users())
+    assert sql.users()
+    assert sql.active_users_count() == py.active_users_count()
+
+    for user in sql.users():
+        assert sql.total_edit_count(user) == py.total_edit_count(user)
+        assert sql.recent_edit_count(user) == py.recent_edit_count(user)
+        assert sql.active_edits_per_day(user) == py.active_edits_per_day(user)
+        assert sql.get_streaks(user) == py.get_streaks(user)
+
+def test_unknown_user(synced_db):
+    usm = UserStatsModules(synced_db)
+    assert usm.total_edit_count("Nobody") == 0
+    assert usm.recent_edit_count("Nobody") == 0
+    assert usm.get_streaks("Nobody") == (None, None)
+
+def test_rollup_backend(synced_db):
+    sql = UserStatsModules(synced_db, round_to_midnight=True, backend="sql")
+    rollup = UserStatsModules(synced_db, round_to_midnight=True, backend="rollup")
+    rollup.today = sql.today
+
+    assert sorted(sql.users()) == sorted(rollup.users())
+    assert sql.active_users_count() == rollup.active_users_count()
+
+    for user in sql.users():
+        assert sql.total_edit_count(user) == rollup.total_edit_count(user)
+        assert sql.recent_edit_count(user) == rollup.recent_edit_count(user)
+        longest, current = rollup.get_streaks(user)
+        assert longest is not None
+        assert longest["editcount"] <= rollup.total_edit_count(user)
@@ -1,5 +1,9 @@
 #! /usr/bin/env python3
 
+import copy
+import datetime
+import json
+
 import pytest
 
 from ws.utils import *
@@ -184,3 +188,60 @@ class test_gen_nested_values:
             ([1, "c", "f", 1, "j"], "k"),
         ]
         assert result == expected
+
+class test_timestamps:
+    struct = {
+        "query": {
+            "pages": {
+                "1": {
+                    "title": "infinity",
+                    "touched": "2020-01-02T03:04:05Z",
+                    "protection": [
+                        {"type": "edit", "level": "sysop", "expiry": "infinity"},
+                        {"type": "move", "level": "sysop", "expiry": "indefinite"},
+                    ],
+                    "revisions": [
+                        {"user": "2020-01-02T03:04:05Z", "timestamp": "2019-01-02T03:04:05Z", "size": 42},
+                    ],
+                },
+            },
+            "blocks": [
+                {"user": "Foo", "expiry": "-infinity", "timestamps": ["2018-01-02T03:04:05Z", "foo"]},
+            ],
+        },
+    }
+
+    def test_object_hook(self):
+        expected = copy.deepcopy(self.struct)
+        parse_timestamps_in_struct(expected)
+        result = json.loads(json.dumps(self.struct), object_hook=timestamps_object_hook)
+        assert result == expected
+
+    def test_parsed_values(self):
+        result = json.loads(json.dumps(self.struct), object_hook=timestamps_object_hook)
+        page = result["query"]["pages"]["1"]
+        assert page["title"] == "infinity"
+        assert page["touched"] == datetime.datetime(2020, 1, 2, 3, 4, 5)
+        assert page["protection"][0]["expiry"] == datetime.datetime.max
+        assert page["protection"][1]["expiry"] is None
+        assert page["revisions"][0]["user"] == "2020-01-02T03:04:05Z"
+        assert page["revisions"][0]["timestamp"] == datetime.datetime(2019, 1, 2, 3, 4, 5)
+        assert page["revisions"][0]["size"] == 42
+        block = result["query"]["blocks"][0]
+        assert block["expiry"] == datetime.datetime.min
+        assert block["timestamps"] == [datetime.datetime(2018, 1, 2, 3, 4, 5), "foo"]
+
+    def test_serialize_params(self):
+        params = {
+            "action": "query",
+            "rcstart": datetime.datetime(2020, 1, 2, 3, 4, 5),
+            "list": ["recentchanges", datetime.datetime(2019, 1, 2, 3, 4, 5)],
+        }
+        expected = {
+            "action": "query",
+            "rcstart": "2020-01-02T03:04:05Z",
+            "list": ["recentchanges", "2019-01-02T03:04:05Z"],
+        }
+        original = copy.deepcopy(params)
+        assert serialize_timestamps_in_params(params) == expected
+        assert params == original
@@ -0,0 +1,69 @@
+#! /usr/bin/env python3
+
+import difflib
+
+from ws.utils import FuzzyIndex
+
+titles = [
+    "Installation guide",
+    "General recommendations",
+    "List of applications",
+    "Network configuration",
+    "Wireless network configuration",
+    "Systemd",
+    "Systemd/Timers",
+]
+
+def test_add():
+    index = FuzzyIndex(titles)
+    assert len(index) == len(titles)
+    index.add("Systemd")
+    assert len(index) == len(titles)
+    assert "Systemd" in index
+    assert "Foo" not in index
+    assert list(index) == titles
+
+def test_exact():
+    index = FuzzyIndex(titles)
+    assert index.search("Systemd", limit=1) == [("Systemd", 1.0)]
+
+def test_typo():
+    index = FuzzyIndex(titles)
+    result = index.search("Instalation guide", limit=1)
+    assert [item for item, _ in result] == ["Installation guide"]
+
+def test_capitalization():
+    index = FuzzyIndex(titles)
+    result = index.search("network Configuration", limit=2)
+    assert [item for item, _ in result] == ["Network configuration", "Wireless network configuration"]
+
+def test_no_match():
+    index = FuzzyIndex(titles)
+    assert index.search("xyz") == []
+
+def test_empty():
+    index = FuzzyIndex()
+    assert index.search("Foo") == []
+
+def test_cutoff():
+    index = FuzzyIndex(titles)
+    for item, ratio in index.search("Systemd/Timer", limit=None, cutoff=0.5):
+        assert ratio >= 0.5
+    assert [item for item, _ in index.search("Systemd/Timer", cutoff=0.9)] == ["Systemd/Timers"]
+
+def test_same_as_difflib():
+    index = FuzzyIndex(titles)
+    for key in ["Network configuraton", "General recomendations", "Systemd timers"]:
+        expected = []
+        for title in titles:
+            ratio = difflib.SequenceMatcher(a=title, b=key).ratio()
+            if ratio >= 0.8:
+                expected.append((title, ratio))
+        expected.sort(key=lambda match: match[1], reverse=True)
+        assert index.search(key, limit=None, cutoff=0.8) == expected
+
+def test_limit():
+    index = FuzzyIndex(titles)
+    result = index.search("configuration", limit=2)
+    assert len(result) == 2
+    assert result == index.search("configuration", limit=None)[:2]
@@ -0,0 +1,64 @@
+#! /usr/bin/env python3
+
+import datetime
+import json
+
+import pytest
+
+from ws.utils import iter_json_items, timestamps_object_hook
+
+pytest.importorskip("ijson")
+
+def _chunks(struct, size=7):
+    text = json.dumps(struct).encode("utf-8")
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+def _consume(gen):
+    items = []
+    while True:
+        try:
+            items.append(next(gen))
+        except StopIteration as e:
+            return items, e.value
+
+class test_iter_json_items:
+    def test_object(self):
+        struct = {
+            "batchcomplete": "",
+            "continue": {"gapcontinue": "Foo", "continue": "gapcontinue||"},
+            "query": {
+                "normalized": [{"from": "a", "to": "A"}],
+                "pages": {
+                    "1": {"pageid": 1, "title": "A", "touched": "2020-01-02T03:04:05Z"},
+                    "2": {"pageid": 2, "title": "B", "revisions": [{"size": 1.5, "minor": True, "x": None}]},
+                },
+            },
+        }
+        items, rest = _consume(iter_json_items(_chunks(struct), "query.pages", object_hook=timestamps_object_hook))
+        assert items == [
+            {"pageid": 1, "title": "A", "touched": datetime.datetime(2020, 1, 2, 3, 4, 5)},
+            {"pageid": 2, "title": "B", "revisions": [{"size": 1.5, "minor": True, "x": None}]},
+        ]
+        assert rest == {
+            "batchcomplete": "",
+            "continue": {"gapcontinue": "Foo", "continue": "gapcontinue||"},
+            "query": {
+                "normalized": [{"from": "a", "to": "A"}],
+                "pages": {},
+            },
+        }
+
+    def test_array(self):
+        struct = {
+            "query": {"allpages": [{"title": "A"}, "B", [1, 2]]},
+            "continue": {"apcontinue": "C"},
+        }
+        items, rest = _consume(iter_json_items(_chunks(struct, size=3), "query.allpages"))
+        assert items == [{"title": "A"}, "B", [1, 2]]
+        assert rest == {"query": {"allpages": []}, "continue": {"apcontinue": "C"}}
+
+    def test_missing_path(self):
+        struct = {"error": {"code": "foo", "info": "bar"}}
+        items, rest = _consume(iter_json_items(_chunks(struct), "query.pages"))
+        assert items == []
+        assert rest == struct
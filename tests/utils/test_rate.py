@@ -35,3 +35,40 @@
 #    def test_4(self):
 #        for i in range(round(self.rate * 2.5)):
 #            self.func()
+
+import threading
+import time
+
+import ws
+from ws.utils import RateLimited
+
+class test_rate_threads:
+    rate = 5
+    per = 0.5
+
+    def test_threads(self, monkeypatch):
+        # rate limiting is disabled inside tests
+        monkeypatch.delattr(ws, "_tests_are_running", raising=False)
+
+        calls = []
+        lock = threading.Lock()
+        def func():
+            with lock:
+                calls.append(time.monotonic())
+            # simulate the latency of a request
+            time.sleep(0.01)
+        limited = RateLimited(self.rate, self.per)(func)
+
+        threads = [threading.Thread(target=lambda: [limited() for i in range(10)]) for t in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(calls) == 40
+        calls.sort()
+        # the burst of `rate` calls is followed by one call after the timeout,
+        # so a window of `per` seconds can contain two such bursts, but not more
+        max_calls = max(sum(1 for c in calls if start <= c < start + self.per) for start in calls)
+        assert max_calls <= 2 * (self.rate + 1)
+        assert calls[-1] - calls[0] >= (len(calls) / (2 * (self.rate + 1)) - 1) * self.per
@@ -5,6 +5,7 @@ import datetime
 import logging
 
 from ws.client import API, APIError
+from ws.db.database import Database
 from ws.interactive import require_login
 from ws.autopage import AutoPage
 from ws.parser_helpers.title import canonicalize
@@ -167,9 +168,10 @@ class MediaWikiFormatter(BaseFormatter):
 
 class TableOfContents:
 
-    def __init__(self, api, cliargs):
+    def __init__(self, api, cliargs, db=None):
         self.api = api
         self.cliargs = cliargs
+        self.db = db
 
         if self.cliargs.save is False and self.cliargs.print is False:
             self.cliargs.print = True
@@ -195,6 +197,8 @@ class TableOfContents:
         present_groups = [group.title for group in argparser._action_groups]
         if "Connection parameters" not in present_groups:
             API.set_argparser(argparser)
+        if "Database parameters" not in present_groups:
+            Database.set_argparser(argparser)
 
         output = argparser.add_argument_group(title="output mode")
         _g = output.add_mutually_exclusive_group()
@@ -218,12 +222,16 @@ class TableOfContents:
         # TODO: no idea how to forbid setting this globally in the config...
         group.add_argument("--summary", default="automatic update",
                 help="the edit summary to use when saving the page (default: %(default)s)")
+        group.add_argument("--use-database", action="store_true",
+                help="build the category graph from the local database (synchronized before use) instead of the API")
 
     @classmethod
-    def from_argparser(klass, args, api=None):
+    def from_argparser(klass, args, api=None, db=None):
         if api is None:
             api = API.from_argparser(args)
-        return klass(api, args)
+        if db is None and args.use_database:
+            db = Database.from_argparser(args)
+        return klass(api, args, db)
 
     def parse_toc_table(self, title, toc_table):
         # default format is one column in the title's language
@@ -293,7 +301,7 @@ class TableOfContents:
             decat.fix_allpages()
 
         # build category graph
-        graph = CategoryGraph(self.api)
+        graph = CategoryGraph(self.api, self.db)
 
         # if we are going to save, init wanted categories
         if self.cliargs.save is True:
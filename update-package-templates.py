@@ -4,6 +4,7 @@ import os.path
 import datetime
 import json
 import logging
+import threading
 
 import requests
 import mwparserfromhell
@@ -11,6 +12,7 @@ import pycman
 import pyalpm
 
 from ws.client import API, APIError
+from ws.client.edit_queue import EditQueue
 from ws.utils import LazyProperty
 from ws.interactive import edit_interactive, require_login, InteractiveQuit
 from ws.autopage import AutoPage
@@ -197,6 +199,10 @@ class PkgUpdater:
         # where _list item_ is the text representing the warning/error + hints (formatted
         # with wiki markup)
         self.log = {}
+        # update_page modifies self.log and uses the shared pyalpm handles, so
+        # it must not run concurrently in the main thread and in the rebase
+        # callback of the edit queue
+        self._update_lock = threading.Lock()
 
     @staticmethod
     def set_argparser(argparser):
@@ -401,25 +407,43 @@ class PkgUpdater:
         # ensure that we are authenticated
         require_login(self.api)
 
-        namespaces = [0, 4, 14, 3000]
-        for ns in namespaces:
-            for page in self.api.generator(generator="allpages", gaplimit="100", gapfilterredir="nonredirects", gapnamespace=ns,
-                                           prop="revisions", rvprop="content|timestamp", rvslots="main"):
-                title = page["title"]
-                if title in self.blacklist_pages:
-                    logger.info("skipping blacklisted page [[{}]]".format(title))
-                    continue
-                timestamp = page["revisions"][0]["timestamp"]
-                text_old = page["revisions"][0]["slots"]["main"]["*"]
-                text_new = self.update_page(title, text_old)
-                if text_old != text_new:
-                    try:
+        # in non-interactive mode the edits are applied in the background
+        # while the next pages are being checked
+        queue = None if self.interactive else EditQueue(self.api)
+
+        try:
+            namespaces = [0, 4, 14, 3000]
+            for ns in namespaces:
+                for page in self.api.generator(generator="allpages", gaplimit="100", gapfilterredir="nonredirects", gapnamespace=ns,
+                                               prop="revisions", rvprop="content|timestamp", rvslots="main"):
+                    title = page["title"]
+                    if title in self.blacklist_pages:
+                        logger.info("skipping blacklisted page [[{}]]".format(title))
+                        continue
+                    timestamp = page["revisions"][0]["timestamp"]
+                    text_old = page["revisions"][0]["slots"]["main"]["*"]
+                    with self._update_lock:
+                        text_new = self.update_page(title, text_old)
+                    if text_old != text_new:
                         if self.interactive:
-                            edit_interactive(self.api, title, page["pageid"], text_old, text_new, timestamp, self.edit_summary, bot="")
+                            try:
+                                edit_interactive(self.api, title, page["pageid"], text_old, text_new, timestamp, self.edit_summary, bot="")
+                            except APIError:
+                                pass
                         else:
-                            self.api.edit(title, page["pageid"], text_new, timestamp, self.edit_summary, bot="")
-                    except APIError:
-                        pass
+                            queue.edit(title, page["pageid"], str(text_new), timestamp, self.edit_summary, rebase=self._rebase_page, bot="")
+        finally:
+            if queue is not None:
+                failed = [result.title for result in queue.join() if result.status == "failed"]
+                if failed:
+                    logger.error("Failed to edit {} page(s): {}".format(len(failed), failed))
+
+    def _rebase_page(self, title, text):
+        # called by the edit queue after an edit conflict - drop the report
+        # lines from the outdated revision and update the current text
+        with self._update_lock:
+            self.log.get(detect_language(title)[1], {}).pop(title, None)
+            return self.update_page(title, text)
 
     def add_report_line(self, title, template, message):
         message = "<nowiki>{}</nowiki> ({})".format(template, message)
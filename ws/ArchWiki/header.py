@@ -129,7 +129,7 @@ def get_header_parts(wikicode, magics=None, cats=None, langlinks=None, remove_fr
         if prefix == "category":
             _add_to_cats(link)
             _extracted_count += 1
-        elif prefix in lang.get_language_tags():
+        elif lang.is_language_tag(prefix):
             _add_to_langlinks(link)
             _extracted_count += 1
 
@@ -10,6 +10,7 @@ See the documentation on `Help:i18n`_ on ArchWiki for the specification.
 .. _`Help:i18n`: https://wiki.archlinux.org/index.php/Help:I18n
 """
 
+import functools
 import re
 
 # some module-global variables, private to the module
@@ -95,88 +96,105 @@ __interlanguage_internal = ["ar", "bs", "bg", "cs", "da", "el", "en", "es", "fi"
                             "ru", "sk", "sr", "th", "tr", "uk", "zh-hans", "zh-hant"]
 
 
+# lookup tables built from the data above
+__language_names = [lang["name"] for lang in __languages]
+__english_language_names = [lang["english"] for lang in __languages]
+__language_tags = [lang["subtag"] for lang in __languages]
+__interlanguage_tags = __interlanguage_external + __interlanguage_internal
+__language_names_set = frozenset(__language_names)
+__english_language_names_set = frozenset(__english_language_names)
+__language_tags_set = frozenset(__language_tags)
+__category_languages_set = frozenset(__category_languages)
+__rtl_set = frozenset(__rtl)
+__interlanguage_tags_set = frozenset(__interlanguage_tags)
+__external_tags_set = frozenset(__interlanguage_external)
+__internal_tags_set = frozenset(__interlanguage_internal)
+__languages_by_name = dict((lang["name"], lang) for lang in __languages)
+__languages_by_english = dict((lang["english"], lang) for lang in __languages)
+__languages_by_tag = dict((lang["subtag"], lang) for lang in __languages)
+
+__title_regex = re.compile(r"(?P<pure>.*?)[ _]\((?P<lang>[^\(\)]+)\)")
+__category_regex = re.compile(r"(?P<pure>[Cc]ategory[ _]?\:[ _]?(?P<lang>[^\(\)]+))")
+
+
 # basic accessors and checkers
 def get_local_language():
     return __local_language
 
 def get_language_names():
-    return [lang["name"] for lang in __languages]
+    return __language_names
 
 def is_language_name(lang):
-    return lang in get_language_names()
+    return lang in __language_names_set
 
 def get_english_language_names():
-    return [lang["english"] for lang in __languages]
+    return __english_language_names
 
 def is_english_language_name(lang):
-    return lang in get_english_language_names()
+    return lang in __english_language_names_set
 
 def get_language_tags():
-    return [lang["subtag"] for lang in __languages]
+    return __language_tags
 
 def is_language_tag(tag):
-    return tag.lower() in get_language_tags()
+    return tag.lower() in __language_tags_set
 
 
 def get_category_languages():
     return __category_languages
 
 def is_category_language(lang):
-    return lang in get_category_languages()
+    return lang in __category_languages_set
 
 
 def is_rtl_tag(tag):
-    return tag in __rtl
+    return tag in __rtl_set
 
 def is_rtl_language(lang):
     return is_rtl_tag(tag_for_langname(lang))
 
 
 def get_interlanguage_tags():
-    return __interlanguage_external + __interlanguage_internal
+    return __interlanguage_tags
 
 def is_interlanguage_tag(tag):
-    return tag.lower() in get_interlanguage_tags()
+    return tag.lower() in __interlanguage_tags_set
 
 def get_external_tags():
     return __interlanguage_external
 
 def is_external_tag(tag):
-    return tag.lower() in get_external_tags()
+    return tag.lower() in __external_tags_set
 
 def get_internal_tags():
     return __interlanguage_internal
 
 def is_internal_tag(tag):
-    return tag.lower() in get_internal_tags()
+    return tag.lower() in __internal_tags_set
 
 
 # conversion between (local) language names, English language names and subtags
+# (KeyError is raised for invalid values)
 def langname_for_english(lang):
-    language = [language for language in __languages if language["english"] == lang][0]
-    return language["name"]
+    return __languages_by_english[lang]["name"]
 
 def langname_for_tag(tag):
-    language = [language for language in __languages if language["subtag"] == tag.lower()][0]
-    return language["name"]
+    return __languages_by_tag[tag.lower()]["name"]
 
 def english_for_langname(lang):
-    language = [language for language in __languages if language["name"] == lang][0]
-    return language["english"]
+    return __languages_by_name[lang]["english"]
 
 def english_for_tag(tag):
-    language = [language for language in __languages if language["subtag"] == tag.lower()][0]
-    return language["english"]
+    return __languages_by_tag[tag.lower()]["english"]
 
 def tag_for_langname(lang):
-    language = [language for language in __languages if language["name"] == lang][0]
-    return language["subtag"]
+    return __languages_by_name[lang]["subtag"]
 
 def tag_for_english(lang):
-    language = [language for language in __languages if language["english"] == lang][0]
-    return language["subtag"]
+    return __languages_by_english[lang]["subtag"]
 
 
+@functools.lru_cache(maxsize=2**16)
 def detect_language(title, *, strip_all_subpage_parts=True):
     """
     Detect language of a given title. The matching is case-sensitive and spaces are
@@ -186,29 +204,28 @@ def detect_language(title, *, strip_all_subpage_parts=True):
     :returns: a ``(pure, lang)`` tuple, where ``pure`` is the pure page title without
         the language suffix and ``lang`` is the detected language in long, localized form
     """
-    title_regex = r"(?P<pure>.*?)[ _]\((?P<lang>[^\(\)]+)\)"
     pure_suffix = ""
     # matches "Page name/Subpage (Language)"
-    match = re.fullmatch(title_regex, title)
+    match = __title_regex.fullmatch(title)
     # matches "Page name (Language)/Subpage"
     if not match and "/" in title:
         base, pure_suffix = title.split("/", maxsplit=1)
         pure_suffix = "/" + pure_suffix
-        match = re.fullmatch(title_regex, base)
+        match = __title_regex.fullmatch(base)
     # matches "Category:Language"
     if not match:
-        match = re.fullmatch(r"(?P<pure>[Cc]ategory[ _]?\:[ _]?(?P<lang>[^\(\)]+))", title)
+        match = __category_regex.fullmatch(title)
     if match:
         pure = match.group("pure")
         lang = match.group("lang")
-        if lang in get_language_names():
+        if lang in __language_names_set:
             # strip "(Language)" from all subpage components to handle cases like
             # "Page name (Language)/Subpage (Language)"
             if strip_all_subpage_parts is True and "/" in pure:
                 parts = pure.split("/")
                 new_parts = []
                 for p in parts:
-                    match = re.fullmatch(title_regex, p)
+                    match = __title_regex.fullmatch(p)
                     if match:
                         part_lang = match.group("lang")
                         if part_lang == lang:
@@ -0,0 +1,8 @@
+#! /usr/bin/env python3
+
+"""
+Shared components of the link checking scripts.
+"""
+
+from .url_cache import *
+from .url_pool import *
@@ -0,0 +1,179 @@
+#! /usr/bin/env python3
+
+import datetime
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["URLStatusCache"]
+
+class URLStatusCache:
+    """
+    Persistent cache of the results of external link checks, stored in a
+    local SQLite database.
+
+    Each URL is stored with its status (``"valid"``, ``"invalid"`` or
+    ``"indeterminate"``), the reason (e.g. the HTTP status code or an error
+    description) and the time of the check. The results are considered valid
+    for a configurable number of days depending on the status, after which the
+    URL has to be checked again.
+
+    The cache also counts the checks per domain and UTC day so that the number
+    of requests sent to a single server can be limited.
+
+    The object can be shared by multiple threads.
+
+    :param str path: path to the SQLite database file (``":memory:"`` for a
+                     temporary in-memory database)
+    :param dict recheck_days: mapping of the statuses to the number of days
+                              after which the URLs are checked again
+    :param int max_checks_per_domain: maximum number of checks per domain and
+                                      UTC day (0 means unlimited)
+    """
+
+    statuses = {"valid", "invalid", "indeterminate"}
+
+    default_recheck_days = {
+        "valid": 30,
+        "invalid": 7,
+        "indeterminate": 1,
+    }
+
+    def __init__(self, path, *, recheck_days=None, max_checks_per_domain=0):
+        self.recheck_days = self.default_recheck_days.copy()
+        if recheck_days is not None:
+            unknown = set(recheck_days) - self.statuses
+            if unknown:
+                raise ValueError("Invalid statuses: {}".format(unknown))
+            self.recheck_days.update(recheck_days)
+        self.max_checks_per_domain = max_checks_per_domain
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS url_status (
+                    url TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    reason TEXT,
+                    -- Unix timestamp of the check
+                    checked REAL NOT NULL
+                )""")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS domain_checks (
+                    domain TEXT NOT NULL,
+                    -- UTC day in the ISO format
+                    day TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (domain, day)
+                )""")
+            # drop the counters from the previous days
+            self._conn.execute("DELETE FROM domain_checks WHERE day < ?", (self._today(),))
+
+    @staticmethod
+    def set_argparser(argparser):
+        """
+        Add arguments for constructing a :py:class:`URLStatusCache` object to
+        an instance of :py:class:`argparse.ArgumentParser`.
+
+        :param argparser: an instance of :py:class:`argparse.ArgumentParser`
+        """
+        group = argparser.add_argument_group(title="URL status cache")
+        group.add_argument("--url-cache-path", metavar="PATH",
+                help="path to the SQLite database with the results of URL checks (default: $cache_dir/$site.url-status.sqlite)")
+        for status, days in URLStatusCache.default_recheck_days.items():
+            group.add_argument("--recheck-{}-days".format(status), type=int, default=days, metavar="DAYS",
+                    help="number of days after which {} URLs are checked again (default: %(default)s)".format(status))
+        group.add_argument("--max-checks-per-domain", type=int, default=0, metavar="N",
+                help="maximum number of checks per domain and UTC day, 0 means unlimited (default: %(default)s)")
+
+    @classmethod
+    def from_argparser(klass, args):
+        """
+        Construct a :py:class:`URLStatusCache` object from arguments parsed by
+        :py:class:`argparse.ArgumentParser`.
+
+        :param args:
+            an instance of :py:class:`argparse.Namespace`. It is assumed that it
+            contains the arguments set by :py:meth:`set_argparser` and the
+            ``site`` and ``cache_dir`` arguments.
+        """
+        path = args.url_cache_path
+        if path is None:
+            path = os.path.join(args.cache_dir, "{}.url-status.sqlite".format(args.site))
+        recheck_days = dict((status, getattr(args, "recheck_{}_days".format(status))) for status in klass.statuses)
+        return klass(path, recheck_days=recheck_days, max_checks_per_domain=args.max_checks_per_domain)
+
+    @staticmethod
+    def _today():
+        return datetime.datetime.utcnow().date().isoformat()
+
+    def get(self, url):
+        """
+        Get the cached result for a URL.
+
+        :param str url: the URL
+        :returns: a ``(status, reason)`` tuple, or ``None`` if the URL is not
+                  cached or the result has expired
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT status, reason, checked FROM url_status WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        status, reason, checked = row
+        if time.time() - checked > self.recheck_days[status] * 86400:
+            return None
+        return status, reason
+
+    def set(self, url, status, reason=None):
+        """
+        Save the result of a URL check.
+
+        :param str url: the URL
+        :param str status: ``"valid"``, ``"invalid"`` or ``"indeterminate"``
+        :param reason: the reason for the status (converted to :py:class:`str`)
+        """
+        if status not in self.statuses:
+            raise ValueError("Invalid status: {}".format(status))
+        if reason is not None:
+            reason = str(reason)
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO url_status (url, status, reason, checked) VALUES (?, ?, ?, ?)",
+                               (url, status, reason, time.time()))
+
+    def acquire_check(self, domain):
+        """
+        Count a check of a URL on the given domain.
+
+        :param str domain: the domain name (host) of the URL
+        :returns: ``True`` if the check is allowed, ``False`` if the limit of
+                  checks per day has been reached for the domain
+        """
+        today = self._today()
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT count FROM domain_checks WHERE domain = ? AND day = ?", (domain, today)).fetchone()
+            count = row[0] if row is not None else 0
+            if self.max_checks_per_domain and count >= self.max_checks_per_domain:
+                return False
+            self._conn.execute("INSERT OR REPLACE INTO domain_checks (domain, day, count) VALUES (?, ?, ?)",
+                               (domain, today, count + 1))
+        return True
+
+    def expire(self):
+        """
+        Delete the expired results from the database.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            for status, days in self.recheck_days.items():
+                self._conn.execute("DELETE FROM url_status WHERE status = ? AND checked < ?",
+                                   (status, now - days * 86400))
+
+    def close(self):
+        self._conn.close()
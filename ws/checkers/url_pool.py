@@ -0,0 +1,156 @@
+#! /usr/bin/env python3
+
+import collections
+import concurrent.futures
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["CircuitBreaker", "URLCheckPool"]
+
+class CircuitBreaker:
+    """
+    Per-host circuit breaker for dead servers.
+
+    After ``threshold`` consecutive failures (e.g. connection errors or
+    timeouts) for a host, the circuit is *open* and :py:meth:`allow` returns
+    ``False`` for the host until ``reset_timeout`` seconds have passed. Then
+    one more attempt is allowed; if it fails, the circuit is opened again.
+
+    The object can be shared by multiple threads.
+
+    :param int threshold: number of consecutive failures to open the circuit
+    :param float reset_timeout: number of seconds after which an open circuit
+                                allows another attempt
+    """
+    def __init__(self, threshold=5, reset_timeout=600):
+        if threshold <= 0:
+            raise ValueError("threshold must be positive")
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        # mapping of hosts to the number of consecutive failures
+        self._failures = collections.Counter()
+        # mapping of hosts to the time when the circuit was opened
+        self._opened = {}
+
+    def allow(self, host):
+        """
+        Returns ``True`` if a request to the host is allowed.
+        """
+        with self._lock:
+            opened = self._opened.get(host)
+            if opened is None:
+                return True
+            if time.monotonic() - opened >= self.reset_timeout:
+                # half-open: allow one attempt, the next failure opens the circuit again
+                del self._opened[host]
+                self._failures[host] = self.threshold - 1
+                return True
+            return False
+
+    def is_open(self, host):
+        with self._lock:
+            return host in self._opened
+
+    def record_success(self, host):
+        with self._lock:
+            self._failures.pop(host, None)
+            self._opened.pop(host, None)
+
+    def record_failure(self, host):
+        with self._lock:
+            self._failures[host] += 1
+            if self._failures[host] >= self.threshold and host not in self._opened:
+                logger.warning("Too many failed requests to {}, skipping the host for {} seconds.".format(host, self.reset_timeout))
+                self._opened[host] = time.monotonic()
+
+class URLCheckPool:
+    """
+    Checks many URLs concurrently in a pool of worker threads, with a limit on
+    the number of concurrent requests to each host.
+
+    URLs are scheduled so that the workers are never blocked waiting for a busy
+    host: a URL is submitted only when its host has a free slot, otherwise the
+    next host is tried. The throughput is therefore not limited by slow hosts
+    or by the order of the URLs.
+
+    :param check: a callable which takes a URL and returns its status
+    :param host: a callable which returns the host of a URL
+    :param int max_workers: maximum number of concurrent requests
+    :param int max_per_host: maximum number of concurrent requests to one host
+    :param CircuitBreaker breaker:
+        an optional circuit breaker. URLs of the hosts with an open circuit are
+        not checked and their status is ``None``. The breaker must be updated
+        by the ``check`` callable.
+    """
+    def __init__(self, check, host, *, max_workers=20, max_per_host=2, breaker=None):
+        if max_workers <= 0 or max_per_host <= 0:
+            raise ValueError("max_workers and max_per_host must be positive")
+        self.check = check
+        self.host = host
+        self.max_workers = max_workers
+        self.max_per_host = max_per_host
+        self.breaker = breaker
+
+    def run(self, urls):
+        """
+        Check the given URLs.
+
+        :param urls: an iterable of URLs (duplicates are checked only once)
+        :returns: a generator of ``(url, status)`` tuples in the order of
+                  completion
+        """
+        # queues of URLs per host, hosts are served in a round-robin fashion
+        queues = collections.OrderedDict()
+        seen = set()
+        for url in urls:
+            if url not in seen:
+                seen.add(url)
+                queues.setdefault(self.host(url), collections.deque()).append(url)
+        if not queues:
+            return
+
+        active = collections.Counter()
+        futures = {}
+
+        def submit(executor):
+            # fill the free workers with URLs of hosts which have a free slot
+            for host in list(queues):
+                if len(futures) >= self.max_workers:
+                    break
+                queue = queues[host]
+                while queue and active[host] < self.max_per_host and len(futures) < self.max_workers:
+                    url = queue.popleft()
+                    if self.breaker is not None and not self.breaker.allow(host):
+                        skipped.append(url)
+                        continue
+                    active[host] += 1
+                    futures[executor.submit(self.check, url)] = (host, url)
+                if not queue:
+                    del queues[host]
+                else:
+                    # move the host to the end for the round-robin
+                    queues.move_to_end(host)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while queues or futures:
+                skipped = []
+                submit(executor)
+                for url in skipped:
+                    logger.debug("skipped URL {} due to the open circuit for its host".format(url))
+                    yield url, None
+                if not futures:
+                    continue
+                done, _ = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    host, url = futures.pop(future)
+                    active[host] -= 1
+                    try:
+                        status = future.result()
+                    except Exception:
+                        logger.exception("URL {} could not be checked".format(url))
+                        status = None
+                    yield url, status
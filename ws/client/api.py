@@ -61,6 +61,9 @@ class API(Connection):
         .. _`MediaWiki#API:Logout`: https://www.mediawiki.org/wiki/API:Logout
         """
         self.call_api(action="logout")
+        del self.user
+        del self.max_ids_per_query
+        del self._csrftoken
         return True
 
     @LazyProperty
@@ -179,8 +182,15 @@ class API(Connection):
         """
         # lazy import - ws.parser_helpers.title imports mwparserfromhell which is
         # an optional dependency
-        from ..parser_helpers.title import Context, Title
-        return Title(Context.from_api(self), title)
+        from ..parser_helpers.title import Title
+        return Title(self._title_context, title)
+
+    @LazyProperty
+    def _title_context(self):
+        # the context is built from the siteinfo properties, which are never
+        # invalidated in the Site instance, so it can be cached as well
+        from ..parser_helpers.title import Context
+        return Context.from_api(self)
 
 
     def call_api_autoiter_ids(self, params=None, *, expand_result=True, **kwargs):
@@ -245,6 +255,7 @@ class API(Connection):
                 if truncated is True:
                     # truncated result - decrease chunk size and try again
                     chunk_size //= 2
+                    self.emit_event("chunk_shrink", key=iter_key)
                     continue
                 logger.warning(msg)
             elif chunk_size < self.max_ids_per_query // 10:
@@ -301,7 +312,44 @@ class API(Connection):
                 break
             last_continue = result["continue"]
 
-    def generator(self, params=None, **kwargs):
+    def query_continue_stream(self, params=None, *, path, **kwargs):
+        """
+        Streaming variant of :py:meth:`query_continue`, based on
+        :py:meth:`ws.client.connection.Connection.call_api_stream`. Instead of
+        the ``"query"`` parts of the API responses, the items of the container
+        at ``path`` are yielded as soon as they are decoded. The continuation
+        parameters are captured at the end of each response.
+
+        :param params: same as :py:meth:`query_continue`
+        :param str path:
+            dot-separated path of the container in the response whose items
+            should be yielded, e.g. ``"query.pages"``
+        :param kwargs: same as :py:meth:`query_continue`
+        :yields: the items of the container at ``path``
+        """
+        if params is None:
+            params = kwargs
+        elif not isinstance(params, dict):
+            raise ValueError("params must be dict or None")
+        elif kwargs and params:
+            raise ValueError("specifying 'params' and 'kwargs' at the same time is not supported")
+        else:
+            # create copy before adding action=query
+            params = params.copy()
+        params["action"] = "query"
+
+        last_continue = {"continue": ""}
+
+        while True:
+            # clone the original params to clean up old continue params
+            params_copy = params.copy()
+            params_copy.update(last_continue)
+            result = yield from self.call_api_stream(params_copy, path=path)
+            if "continue" not in result:
+                break
+            last_continue = result["continue"]
+
+    def generator(self, params=None, *, stream=False, **kwargs):
         """
         Interface to API:Generators, conveniently implemented as Python
         generator.
@@ -309,6 +357,13 @@ class API(Connection):
         Parameter ``generator`` must be supplied.
 
         :param params: same as :py:meth:`API.query_continue`
+        :param bool stream:
+            If ``True``, the responses are decoded incrementally and the pages
+            are yielded as soon as they arrive (see
+            :py:meth:`API.query_continue_stream`). This keeps the memory usage
+            bounded for queries with big data (e.g. ``rvprop=content``), but
+            the pages from each chunk are not sorted by title. Requires the
+            optional :py:mod:`ijson` module.
         :param kwargs: same as :py:meth:`API.query_continue`
         :yields: from ``"pages"`` part of the API response
 
@@ -330,6 +385,10 @@ class API(Connection):
         if generator_ is None:
             raise ValueError("param 'generator' must be supplied")
 
+        if stream is True:
+            yield from self.query_continue_stream(params, path="query.pages", **kwargs)
+            return
+
         for snippet in self.query_continue(params, **kwargs):
             # API generator returns dict !!!
             # for example:  snippet === {"pages":
@@ -338,13 +397,18 @@ class API(Connection):
             snippet = sorted(snippet["pages"].values(), key=lambda d: d["title"])
             yield from snippet
 
-    def list(self, params=None, **kwargs):
+    def list(self, params=None, *, stream=False, **kwargs):
         """
         Interface to API:Lists, implemented as Python generator.
 
         Parameter ``list`` must be supplied.
 
         :param params: same as :py:meth:`API.query_continue`
+        :param bool stream:
+            If ``True``, the responses are decoded incrementally and the items
+            are yielded as soon as they arrive (see
+            :py:meth:`API.query_continue_stream`). Requires the optional
+            :py:mod:`ijson` module.
         :param kwargs: same as :py:meth:`API.query_continue`
         :yields: from ``"list"`` part of the API response
         """
@@ -352,6 +416,14 @@ class API(Connection):
         if list_ is None:
             raise ValueError("param 'list' must be supplied")
 
+        if stream is True:
+            if list_ == "querypage":
+                path = "query.querypage.results"
+            else:
+                path = "query." + list_
+            yield from self.query_continue_stream(params, path=path, **kwargs)
+            return
+
         for snippet in self.query_continue(params, **kwargs):
             if list_ == "querypage":
                 # list=querypage needs special treatment, the structure is:
@@ -412,6 +484,7 @@ class API(Connection):
                             .format(max_retries - retries, max_retries))
                     # reset the cached csrftoken and try again
                     del self._csrftoken
+                    self.emit_event("badtoken", action=params["action"])
                 else:
                     raise
 
@@ -438,6 +511,11 @@ class API(Connection):
 
         .. _`API:Edit`: https://www.mediawiki.org/wiki/API:Edit
         """
+        return self._edit(title, pageid, text, basetimestamp, summary, **kwargs)
+
+    def _edit(self, title, pageid, text, basetimestamp, summary, **kwargs):
+        # Implementation of :py:meth:`edit` without rate-limiting, it is also
+        # used by :py:class:`ws.client.edit_queue.EditQueue`.
         if not summary:
             raise Exception("edit summary is mandatory")
         if len(summary) > 255:
@@ -490,6 +568,11 @@ class API(Connection):
 
         .. _`API:Edit`: https://www.mediawiki.org/wiki/API:Edit
         """
+        return self._create(title, text, summary, **kwargs)
+
+    def _create(self, title, text, summary, **kwargs):
+        # Implementation of :py:meth:`create` without rate-limiting, it is also
+        # used by :py:class:`ws.client.edit_queue.EditQueue`.
         if not summary:
             raise Exception("edit summary is mandatory")
         if len(summary) > 255:
@@ -544,6 +627,11 @@ class API(Connection):
 
         .. _`API:Move`: https://www.mediawiki.org/wiki/API:Move
         """
+        return self._move(from_title, to_title, reason, movetalk=movetalk, movesubpages=movesubpages, noredirect=noredirect, **kwargs)
+
+    def _move(self, from_title, to_title, reason, *, movetalk=True, movesubpages=True, noredirect=False, **kwargs):
+        # Implementation of :py:meth:`move` without rate-limiting, it is also
+        # used by :py:class:`ws.client.edit_queue.EditQueue`.
         kwargs["action"] = "move"
         kwargs["from"] = from_title
         kwargs["to"] = to_title
@@ -0,0 +1,235 @@
+#! /usr/bin/env python3
+
+"""
+The :py:mod:`ws.client.cassette` module provides a record/replay layer for the
+HTTP requests made by :py:meth:`ws.client.connection.Connection.request`.
+
+In the ``"record"`` mode, the requests are sent to the wiki and the responses
+are saved in a *cassette* file. In the ``"replay"`` mode, the responses are
+served from the cassette without any network access, optionally with a
+synthetic latency. This makes it possible to run scripts and benchmarks
+against a deterministic backend:
+
+.. code-block:: python
+
+    with Cassette("sync.json", mode="record") as cassette:
+        cassette.install(api)
+        db.sync_with_api(api)
+
+    # later, offline
+    with Cassette("sync.json", mode="replay", latency=0.1) as cassette:
+        cassette.install(api)
+        db.sync_with_api(api)
+
+Scripts using :py:func:`ws.config.object_from_argparser` can use the
+``--cassette`` and ``--cassette-mode`` options.
+
+The requests are matched by the HTTP method, URL and parameters (in the query
+string or the form-encoded body), ignoring the volatile parameters listed in
+:py:attr:`Cassette.ignored_params`. When the same request was recorded
+multiple times, the responses are replayed in the recorded order and the last
+one is repeated.
+"""
+
+import base64
+import collections
+import json
+import os
+import time
+import urllib.parse
+import logging
+
+import requests
+import requests.adapters
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["Cassette", "CassetteMiss"]
+
+class CassetteMiss(requests.exceptions.RequestException):
+    """
+    Raised in the ``"replay"`` mode when the cassette does not contain a
+    response for the request.
+    """
+    pass
+
+class Cassette(requests.adapters.BaseAdapter):
+    """
+    A transport adapter for :py:class:`requests.Session` recording and
+    replaying HTTP interactions.
+
+    :param str path: path to the cassette file
+    :param str mode:
+        ``"record"`` to send the requests and save the responses,
+        ``"replay"`` to serve the responses from the cassette, or ``"auto"`` to
+        replay the recorded requests and record the others
+    :param float latency: synthetic latency (in seconds) added to each replayed response
+    :param float bandwidth:
+        synthetic bandwidth (in bytes per second) for the replayed responses,
+        ``None`` means unlimited
+    """
+
+    modes = {"record", "replay", "auto"}
+
+    # parameters which are not used for matching the requests (tokens change
+    # between sessions) and which are not saved in the cassette (passwords)
+    ignored_params = {"token", "lgtoken", "lgpassword", "password", "logintoken"}
+
+    # response headers which are not saved in the cassette
+    ignored_headers = {"set-cookie", "content-encoding", "transfer-encoding", "content-length", "connection"}
+
+    def __init__(self, path, *, mode="replay", latency=0, bandwidth=None):
+        super().__init__()
+        if mode not in self.modes:
+            raise ValueError("invalid mode: {}".format(mode))
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.bandwidth = bandwidth
+
+        self._http = requests.adapters.HTTPAdapter()
+        self._interactions = []
+        # mapping of request keys to deques of recorded responses
+        self._responses = {}
+        self._modified = False
+
+        if os.path.isfile(path):
+            with open(path) as f:
+                data = json.load(f)
+            for interaction in data["interactions"]:
+                self._add(interaction)
+        elif mode == "replay":
+            raise FileNotFoundError("cassette file '{}' does not exist".format(path))
+
+    def install(self, connection):
+        """
+        Mount the cassette on the session of the given connection for its
+        ``api.php`` and ``index.php`` URLs.
+
+        :param connection: a :py:class:`ws.client.connection.Connection` instance
+        :returns: ``self``
+        """
+        connection.session.mount(connection.api_url, self)
+        connection.session.mount(connection.index_url, self)
+        return self
+
+    def _key(self, method, url, body):
+        parts = urllib.parse.urlsplit(url)
+        params = urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+        if body:
+            if isinstance(body, bytes):
+                body = body.decode("utf-8", errors="replace")
+            params += urllib.parse.parse_qsl(body, keep_blank_values=True)
+        params = sorted((k, v) for k, v in params if k not in self.ignored_params)
+        base_url = urllib.parse.urlunsplit((parts.scheme, parts.netloc, parts.path, "", ""))
+        return json.dumps([method.upper(), base_url, params], ensure_ascii=False)
+
+    def _add(self, interaction):
+        self._interactions.append(interaction)
+        key = interaction["request"]["key"]
+        self._responses.setdefault(key, collections.deque()).append(interaction["response"])
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        key = self._key(request.method, request.url, request.body)
+        recorded = self._responses.get(key)
+
+        if recorded and self.mode != "record":
+            # keep the last response for repeated requests
+            data = recorded.popleft() if len(recorded) > 1 else recorded[0]
+            response = self._build_response(request, data)
+            delay = self.latency
+            if self.bandwidth:
+                delay += len(response.content) / self.bandwidth
+            if delay > 0:
+                time.sleep(delay)
+            return response
+
+        if self.mode == "replay":
+            raise CassetteMiss("request not found in the cassette '{}': {}".format(self.path, key), request=request)
+
+        response = self._http.send(request, stream=stream, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+        # read the whole body so it can be saved (the response can be still
+        # iterated with iter_content)
+        content = response.content
+        headers = dict((k, v) for k, v in response.headers.items() if k.lower() not in self.ignored_headers)
+        data = {
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": headers,
+        }
+        try:
+            data["body"] = content.decode("utf-8")
+        except UnicodeDecodeError:
+            data["body_base64"] = base64.b64encode(content).decode("ascii")
+        self._add({"request": {"key": key}, "response": data})
+        self._modified = True
+        return response
+
+    @staticmethod
+    def _build_response(request, data):
+        if "body" in data:
+            content = data["body"].encode("utf-8")
+        else:
+            content = base64.b64decode(data["body_base64"])
+        response = requests.models.Response()
+        response.status_code = data["status"]
+        response.reason = data["reason"]
+        response.headers = CaseInsensitiveDict(data["headers"])
+        response.headers["Content-Length"] = str(len(content))
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.raw = _BytesBody(content)
+        return response
+
+    def save(self):
+        """
+        Save the recorded interactions into the cassette file.
+        """
+        if not self._modified:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"version": 1, "interactions": self._interactions}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self._modified = False
+        logger.info("Saved {} HTTP interactions to the cassette '{}'".format(len(self._interactions), self.path))
+
+    def close(self):
+        self._http.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.save()
+
+class _BytesBody:
+    """
+    A minimal stand-in for :py:class:`urllib3.response.HTTPResponse`, used as
+    the ``raw`` attribute of the replayed responses.
+    """
+    def __init__(self, content):
+        self._content = content
+        self._offset = 0
+
+    def read(self, amt=None, **kwargs):
+        if amt is None:
+            amt = len(self._content) - self._offset
+        chunk = self._content[self._offset:self._offset + amt]
+        self._offset += len(chunk)
+        return chunk
+
+    def stream(self, amt=2**16, decode_content=None):
+        while True:
+            chunk = self.read(amt)
+            if not chunk:
+                break
+            yield chunk
+
+    def release_conn(self):
+        pass
+
+    def close(self):
+        pass
@@ -13,10 +13,10 @@ and making requests.
 import requests
 import http.cookiejar as cookielib
 import logging
-import copy
+import time
 
 from ws import __version__, __url__
-from ..utils import RateLimited, parse_timestamps_in_struct, serialize_timestamps_in_struct
+from ..utils import RateLimited, timestamps_object_hook, serialize_timestamps_in_params, iter_json_items
 
 logger = logging.getLogger(__name__)
 
@@ -90,13 +90,26 @@ class Connection:
     :param str index_url: URL path to the wiki's ``index.php`` entry point
     :param requests.Session session: session created by :py:meth:`make_session`
     :param int timeout: connection timeout in seconds
+    :param str cache_dir:
+        directory for persistent caches (e.g. of the siteinfo properties), the
+        persistent caches are disabled if ``None``
+
+    .. py:attribute:: hooks
+
+        List of objects called before and after each request, see
+        :py:class:`ws.client.instrumentation.RequestHook`.
     """
 
-    def __init__(self, api_url, index_url, session, timeout=60):
+    # size of the chunks read from the network by :py:meth:`call_api_stream`
+    stream_chunk_size = 64 * 1024
+
+    def __init__(self, api_url, index_url, session, timeout=60, cache_dir=None):
         self.api_url = api_url
         self.index_url = index_url
         self.session = session
         self.timeout = timeout
+        self.cache_dir = cache_dir
+        self.hooks = []
 
     @staticmethod
     def make_session(user_agent=DEFAULT_UA, ssl_verify=None, max_retries=0,
@@ -169,6 +182,18 @@ class Connection:
                 help="connection timeout in seconds (default: %(default)s)")
         group.add_argument("--cookie-file", type=ws.config.argtype_dirname_must_exist, metavar="PATH",
                 help="path to cookie file (default: $cache_dir/$site.cookie)")
+        group.add_argument("--metrics-file", type=ws.config.argtype_dirname_must_exist, metavar="PATH",
+                help="save metrics of the API requests into this file when the script exits; "
+                     "the Prometheus text format is used if the file name ends with '.prom', "
+                     "otherwise JSON (default: %(default)s)")
+        group.add_argument("--cassette", type=ws.config.argtype_dirname_must_exist, metavar="PATH",
+                help="path to a cassette file for recording or replaying the HTTP requests (default: %(default)s)")
+        group.add_argument("--cassette-mode", choices=["record", "replay", "auto"], default="replay",
+                help="'record' sends the requests and saves the responses in the cassette, 'replay' serves the "
+                     "responses from the cassette, 'auto' records only the requests missing in the cassette "
+                     "(default: %(default)s)")
+        group.add_argument("--cassette-latency", type=float, default=0, metavar="SECONDS",
+                help="synthetic latency added to each replayed response (default: %(default)s)")
         # TODO: expose also user_agent, http_user, http_password?
 
     @classmethod
@@ -196,7 +221,22 @@ class Connection:
         session = Connection.make_session(ssl_verify=args.ssl_verify,
                                           max_retries=args.connection_max_retries,
                                           cookie_file=cookie_file)
-        return klass(args.api_url, args.index_url, session=session, timeout=args.connection_timeout)
+        connection = klass(args.api_url, args.index_url, session=session, timeout=args.connection_timeout, cache_dir=args.cache_dir)
+
+        if args.metrics_file is not None:
+            from .instrumentation import MetricsCollector
+            collector = MetricsCollector()
+            collector.install(connection)
+            collector.dump_at_exit(args.metrics_file)
+
+        if args.cassette is not None:
+            import atexit
+            from .cassette import Cassette
+            cassette = Cassette(args.cassette, mode=args.cassette_mode, latency=args.cassette_latency)
+            cassette.install(connection)
+            atexit.register(cassette.save)
+
+        return connection
 
     @RateLimited(10, 3)
     def request(self, method, url, **kwargs):
@@ -216,6 +256,44 @@ class Connection:
 
         .. _`Requests documentation`: http://docs.python-requests.org/en/latest/api/
         """
+        if not self.hooks:
+            return self._request(method, url, **kwargs)
+
+        info = {
+            "method": method,
+            "url": url,
+            "entry": "api" if url == self.api_url else "index",
+            "params": kwargs.get("params") or kwargs.get("data") or {},
+            "start": time.time(),
+        }
+        for hook in self.hooks:
+            hook.before_request(info)
+
+        response = None
+        error = None
+        try:
+            response = self._request(method, url, **kwargs)
+            return response
+        except requests.exceptions.RequestException as e:
+            error = e
+            response = e.response
+            raise
+        finally:
+            info["duration"] = time.time() - info["start"]
+            info["status"] = response.status_code if response is not None else None
+            info["bytes"] = None
+            info["error"] = error
+            if response is not None:
+                if kwargs.get("stream") is True:
+                    length = response.headers.get("Content-Length")
+                    if length is not None:
+                        info["bytes"] = int(length)
+                else:
+                    info["bytes"] = len(response.content)
+            for hook in self.hooks:
+                hook.after_request(info)
+
+    def _request(self, method, url, **kwargs):
         response = self.session.request(method, url, timeout=self.timeout, **kwargs)
 
         # raise HTTPError for bad requests (4XX client errors and 5XX server errors)
@@ -226,6 +304,14 @@ class Connection:
 
         return response
 
+    def emit_event(self, name, **labels):
+        """
+        Notify the :py:attr:`hooks` about an event other than a request, e.g.
+        a retry. See :py:meth:`ws.client.instrumentation.RequestHook.on_event`.
+        """
+        for hook in self.hooks:
+            hook.on_event(name, labels)
+
     def call_api(self, params=None, *, expand_result=True, check_warnings=True, **kwargs):
         """
         Convenient method to call the ``api.php`` entry point.
@@ -257,6 +343,87 @@ class Connection:
             # utils.dmerge. Too complicated, not supported.
             raise ValueError("specifying 'params' and 'kwargs' at the same time is not supported")
 
+        params, response = self._send_api_request(params)
+
+        try:
+            # timestamps are parsed while decoding
+            result = response.json(object_hook=timestamps_object_hook)
+        except ValueError:
+            raise APIJsonError("Failed to decode server response. Please make sure " +
+                               "that the API is enabled on the wiki and that the " +
+                               "API URL is correct.")
+
+        self._check_api_result(params, result, check_warnings)
+
+        if expand_result is True:
+            action = params["action"]
+            if action in result:
+                return result[action]
+            else:
+                raise APIExpandResultFailed
+        return result
+
+    def call_api_stream(self, params=None, *, path, check_warnings=True, **kwargs):
+        """
+        Streaming variant of :py:meth:`call_api`. The response is decoded
+        incrementally while it is being downloaded and the items of the array
+        or object located at ``path`` are yielded as soon as they are complete,
+        so the whole response is never kept in memory.
+
+        Requires the optional :py:mod:`ijson` module.
+
+        The parameters are the same as for :py:meth:`call_api`, except for:
+
+        :param str path:
+            dot-separated path of the container in the response whose items
+            should be yielded, e.g. ``"query.pages"`` or ``"query.allrevisions"``
+        :yields: the items of the container at ``path``
+        :returns:
+            the rest of the response (e.g. the ``continue`` block), with an
+            empty container at ``path``. It is the value of the
+            :py:exc:`StopIteration` exception, so it can be obtained with
+            ``rest = yield from api.call_api_stream(...)``.
+
+        Note that API errors are raised and warnings are logged only after all
+        items have been yielded, because they may be located anywhere in the
+        response.
+        """
+        # lazy import - ijson is an optional dependency
+        import ijson
+
+        if params is None:
+            params = kwargs
+        elif not isinstance(params, dict):
+            raise ValueError("params must be dict or None")
+        elif kwargs and params:
+            raise ValueError("specifying 'params' and 'kwargs' at the same time is not supported")
+
+        params, response = self._send_api_request(params, stream=True)
+
+        try:
+            chunks = response.iter_content(chunk_size=self.stream_chunk_size)
+            result = yield from iter_json_items(chunks, path, object_hook=timestamps_object_hook)
+        except ijson.JSONError:
+            raise APIJsonError("Failed to decode server response. Please make sure " +
+                               "that the API is enabled on the wiki and that the " +
+                               "API URL is correct.")
+        finally:
+            response.close()
+
+        self._check_api_result(params, result, check_warnings)
+        return result
+
+    def _send_api_request(self, params, **kwargs):
+        """
+        Auxiliary method for :py:meth:`call_api` and :py:meth:`call_api_stream`.
+        Checks the ``action`` parameter, serializes timestamps and selects the
+        correct HTTP request method.
+
+        :param params: dictionary of API parameters
+        :param kwargs: passed to :py:meth:`request`
+        :returns: a ``(params, response)`` tuple, where ``params`` is the
+                  serialized copy of the parameters
+        """
         # check if action is valid
         action = params.setdefault("action", "help")
         if action not in API_ACTIONS:
@@ -266,9 +433,9 @@ class Connection:
         if action == "help":
             params["wrap"] = "1"
 
-        # serialize timestamps
-        params = copy.deepcopy(params)
-        serialize_timestamps_in_struct(params)
+        # serialize timestamps (this also creates a copy of params, so the
+        # caller's data is not modified below)
+        params = serialize_timestamps_in_params(params)
 
         # select HTTP method and call the API
         if action in MULTIPART_FORM_DATA:
@@ -276,25 +443,22 @@ class Connection:
             files = dict((k, v) for k, v in params.items() if k in MULTIPART_FORM_DATA[action])
             for k in files:
                 del params[k]
-            result = self.request("POST", self.api_url, data=params, files=files)
+            response = self.request("POST", self.api_url, data=params, files=files, **kwargs)
         # we also form-encode queries with titles, revids and pageids because the
         # URL might be too long for GET, especially in case of titles
         elif action in POST_ACTIONS or (action == "query" and {"titles", "revids", "pageids"} & set(params.keys())):
             # passing `params` to `data` will cause form-encoding to take place,
             # which is necessary when editing pages longer than 8000 characters
-            result = self.request("POST", self.api_url, data=params)
+            response = self.request("POST", self.api_url, data=params, **kwargs)
         else:
-            result = self.request("GET", self.api_url, params=params)
+            response = self.request("GET", self.api_url, params=params, **kwargs)
 
-        try:
-            result = result.json()
-        except ValueError:
-            raise APIJsonError("Failed to decode server response. Please make sure " +
-                               "that the API is enabled on the wiki and that the " +
-                               "API URL is correct.")
+        return params, response
 
+    def _check_api_result(self, params, result, check_warnings):
         # see if there are errors/warnings
         if "error" in result:
+            self.emit_event("api_error", action=params["action"], code=result["error"].get("code", ""))
             raise APIError(params, result["error"])
         if check_warnings is True and "warnings" in result:
             msg = "API warning(s) for query {}:".format(params)
@@ -302,16 +466,6 @@ class Connection:
                 msg += "\n* {}".format(warning["*"])
             logger.warning(msg)
 
-        # parse timestamps
-        parse_timestamps_in_struct(result)
-
-        if expand_result is True:
-            if action in result:
-                return result[action]
-            else:
-                raise APIExpandResultFailed
-        return result
-
     def call_index(self, method="GET", **kwargs):
         """
         Convenient method to call the ``index.php`` entry point.
@@ -0,0 +1,233 @@
+#! /usr/bin/env python3
+
+"""
+The :py:mod:`ws.client.edit_queue` module provides a queue for submitting
+edits from the main loop of a script while they are applied in the background.
+
+Scripts usually iterate over many pages and edit only some of them. With the
+plain :py:meth:`API.edit <ws.client.api.API.edit>` method, the rate-limiting
+sleeps are spent in the critical path of the page loop. With
+:py:class:`EditQueue`, the script only submits the edits and continues
+scanning, while a worker thread applies them at the highest rate allowed for
+the current user.
+
+Usage:
+
+.. code-block:: python
+
+    with EditQueue(api) as queue:
+        for page in pages:
+            ...
+            queue.edit(title, pageid, text_new, timestamp, summary, rebase=update_text)
+    for result in queue.report:
+        print(result)
+"""
+
+import queue as queue_module
+import threading
+import logging
+
+from ..utils import RateLimited
+from .connection import APIError
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["EditQueue", "EditResult"]
+
+class EditResult:
+    """
+    The result of an operation processed by :py:class:`EditQueue`.
+
+    :ivar str action: the type of the operation (``"edit"``, ``"create"`` or ``"move"``)
+    :ivar str title: the title of the page
+    :ivar str status:
+        ``"success"`` if the operation succeeded, ``"nochange"`` if the rebase
+        callback produced the same text as the current revision after an edit
+        conflict, or ``"failed"``
+    :ivar result: the API response (``None`` if the operation failed)
+    :ivar error: the exception raised by the operation (``None`` if it succeeded)
+    :ivar int conflicts: number of edit conflicts encountered
+    """
+
+    def __init__(self, action, title):
+        self.action = action
+        self.title = title
+        self.status = None
+        self.result = None
+        self.error = None
+        self.conflicts = 0
+
+    def __repr__(self):
+        return "<EditResult action={} title={!r} status={} conflicts={}>".format(self.action, self.title, self.status, self.conflicts)
+
+class EditQueue:
+    """
+    A queue of edits applied by a background worker thread.
+
+    The rate of the worker is determined from the ``noratelimit`` right and
+    the ``ratelimits`` property of the current user (see
+    :py:meth:`get_rate`). The CSRF token is cached and renewed by
+    :py:meth:`API.call_with_csrftoken <ws.client.api.API.call_with_csrftoken>`,
+    so it is shared by all edits in the queue.
+
+    Edit conflicts are resolved by fetching the latest revision of the page and
+    calling the ``rebase`` callback passed to :py:meth:`edit`, which should
+    compute the new text from the current text of the page.
+
+    :param api: an :py:class:`ws.client.api.API` instance
+    :param int maxsize:
+        maximum number of pending operations; :py:meth:`edit`, :py:meth:`create`
+        and :py:meth:`move` block when the queue is full (default is 0, which
+        means unlimited)
+    :param int max_conflict_retries:
+        maximum number of rebase attempts for each edit
+    """
+
+    # (rate, per) used when the wiki does not report any limits for the user
+    default_rate = (1, 3)
+    # (rate, per) used for users with the "noratelimit" right
+    noratelimit_rate = (10, 3)
+
+    def __init__(self, api, *, maxsize=0, max_conflict_retries=3):
+        self.api = api
+        self.max_conflict_retries = max_conflict_retries
+
+        self.report = []
+        self._queue = queue_module.Queue(maxsize=maxsize)
+        self._closed = False
+
+        # the rate limits have to be determined in the main thread, before the
+        # worker starts using the session
+        self._limited = {}
+        for action in ["edit", "move"]:
+            rate, per = self.get_rate(action)
+            logger.debug("EditQueue: using rate limit {} per {} seconds for action '{}'".format(rate, per, action))
+            self._limited[action] = RateLimited(rate, per)(self._call)
+
+        self._worker = threading.Thread(target=self._work, name="EditQueue", daemon=True)
+        self._worker.start()
+
+    def get_rate(self, action):
+        """
+        Determine the highest rate allowed for the current user.
+
+        :param str action: the action name used in ``$wgRateLimits`` (e.g. ``"edit"`` or ``"move"``)
+        :returns: a ``(rate, per)`` tuple for the :py:func:`ws.utils.rate.RateLimited` decorator
+        """
+        if "noratelimit" in self.api.user.rights:
+            return self.noratelimit_rate
+        # the reported limits are e.g. {"edit": {"user": {"hits": 90, "seconds": 60}}}
+        limits = self.api.user.ratelimits or {}
+        limits = list(limits.get(action, {}).values())
+        if not limits:
+            return self.default_rate
+        # the most restrictive limit applies
+        limit = min(limits, key=lambda l: l["hits"] / l["seconds"])
+        return limit["hits"], limit["seconds"]
+
+    def edit(self, title, pageid, text, basetimestamp, summary, *, rebase=None, **kwargs):
+        """
+        Submit an edit. The parameters are the same as for
+        :py:meth:`API.edit <ws.client.api.API.edit>`.
+
+        :param rebase:
+            A callback used to resolve edit conflicts. It is called as
+            ``rebase(title, text)`` with the text of the latest revision and
+            must return the new text of the page. If ``None``, edit conflicts
+            are not resolved and the edit fails.
+        :returns: an :py:class:`EditResult` instance, which is filled when the
+            edit is processed
+        """
+        args = (title, pageid, text, basetimestamp, summary)
+        return self._put("edit", title, args, kwargs, rebase)
+
+    def create(self, title, text, summary, **kwargs):
+        """
+        Submit a page creation. The parameters are the same as for
+        :py:meth:`API.create <ws.client.api.API.create>`.
+
+        :returns: an :py:class:`EditResult` instance
+        """
+        return self._put("create", title, (title, text, summary), kwargs)
+
+    def move(self, from_title, to_title, reason, **kwargs):
+        """
+        Submit a page move. The parameters are the same as for
+        :py:meth:`API.move <ws.client.api.API.move>`.
+
+        :returns: an :py:class:`EditResult` instance
+        """
+        return self._put("move", from_title, (from_title, to_title, reason), kwargs)
+
+    def _put(self, action, title, args, kwargs, rebase=None):
+        if self._closed is True:
+            raise ValueError("cannot submit operations to a closed EditQueue")
+        result = EditResult(action, title)
+        self.report.append(result)
+        self._queue.put((result, args, kwargs, rebase))
+        return result
+
+    def join(self):
+        """
+        Wait until all submitted operations are processed and stop the worker.
+        No operations can be submitted afterwards.
+
+        :returns: the list of :py:class:`EditResult` objects in the order of submission
+        """
+        if self._closed is False:
+            self._closed = True
+            self._queue.put(None)
+            self._worker.join()
+        return self.report
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.join()
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            result, args, kwargs, rebase = item
+            try:
+                self._process(result, args, kwargs, rebase)
+            except Exception as e:
+                # errors are already logged by the API methods
+                result.status = "failed"
+                result.error = e
+
+    def _call(self, action, args, kwargs):
+        method = getattr(self.api, "_" + action)
+        # the API methods modify kwargs
+        return method(*args, **dict(kwargs))
+
+    def _process(self, result, args, kwargs, rebase):
+        limited = self._limited["move" if result.action == "move" else "edit"]
+        while True:
+            try:
+                result.result = limited(result.action, args, kwargs)
+                result.status = "success"
+                return
+            except APIError as e:
+                if (result.action != "edit" or rebase is None or
+                        e.server_response.get("code") != "editconflict" or
+                        result.conflicts >= self.max_conflict_retries):
+                    raise
+                result.conflicts += 1
+                title, pageid, _, _, summary = args
+                logger.info("Edit conflict on page [[{}]], rebasing [{}/{}]".format(title, result.conflicts, self.max_conflict_retries))
+                text_current, timestamp = self._fetch_latest(pageid)
+                text_new = str(rebase(title, text_current))
+                if text_new == text_current:
+                    result.status = "nochange"
+                    return
+                args = (title, pageid, text_new, timestamp, summary)
+
+    def _fetch_latest(self, pageid):
+        result = self.api.call_api(action="query", pageids=pageid, prop="revisions", rvprop="content|timestamp", rvslots="main")
+        page = result["pages"][str(pageid)]
+        revision = page["revisions"][0]
+        return revision["slots"]["main"]["*"], revision["timestamp"]
@@ -0,0 +1,274 @@
+#! /usr/bin/env python3
+
+"""
+The :py:mod:`ws.client.instrumentation` module provides hooks for observing
+the requests made by :py:class:`ws.client.connection.Connection` and a
+collector of metrics built on top of them.
+
+Hooks are objects implementing (a subset of) the methods of the
+:py:class:`RequestHook` class. They are registered by appending them to the
+:py:attr:`Connection.hooks <ws.client.connection.Connection.hooks>` list.
+
+The :py:class:`MetricsCollector` gathers latency histograms, numbers of
+requests and errors and response sizes for each API module, as well as the
+time spent sleeping in :py:func:`ws.utils.rate.RateLimited` and other events
+such as retries. The metrics can be saved in JSON or in the `Prometheus text
+format`_:
+
+.. code-block:: python
+
+    collector = MetricsCollector()
+    collector.install(api)
+    ...
+    collector.dump("metrics.prom")
+
+Scripts using :py:func:`ws.config.object_from_argparser` can simply pass the
+``--metrics-file`` option, the metrics are then saved when the script exits.
+
+.. _`Prometheus text format`: https://prometheus.io/docs/instrumenting/exposition_formats/
+"""
+
+import atexit
+import bisect
+import json
+import threading
+import logging
+
+import ws.utils.rate
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["RequestHook", "MetricsCollector"]
+
+class RequestHook:
+    """
+    Interface of the hooks called by :py:class:`ws.client.connection.Connection`.
+    All methods are optional.
+
+    The ``info`` dictionary passed to the request hooks has the following keys:
+
+    - ``method``: the HTTP method
+    - ``url``: the requested URL
+    - ``entry``: ``"api"`` or ``"index"``, depending on the entry point
+    - ``params``: the parameters of the request (query string or form data)
+    - ``start``: the UNIX timestamp of the start of the request
+
+    The :py:meth:`after_request` hook receives the same dictionary with these
+    additional keys:
+
+    - ``duration``: the duration of the request in seconds
+    - ``status``: the HTTP status code, or ``None`` if there is no response
+    - ``bytes``: the size of the response body, or ``None`` if it is not known
+      (e.g. for streamed responses without the ``Content-Length`` header)
+    - ``error``: the exception raised by the request, or ``None``
+    """
+
+    def before_request(self, info):
+        pass
+
+    def after_request(self, info):
+        pass
+
+    def on_event(self, name, labels):
+        """
+        Called for other notable events, such as retries of the
+        ``call_api_autoiter_ids`` chunks due to truncated results
+        (``"chunk_shrink"``) or renewed CSRF tokens (``"badtoken"``).
+
+        :param str name: name of the event
+        :param dict labels: additional information about the event
+        """
+        pass
+
+def _module_label(params):
+    """
+    Returns a string identifying the API modules used in a query, e.g.
+    ``"generator=allpages|prop=revisions"``.
+    """
+    parts = []
+    for key in ["list", "prop", "generator", "meta"]:
+        value = params.get(key)
+        if value:
+            if not isinstance(value, str):
+                value = "|".join(sorted(str(v) for v in value))
+            parts.append("{}={}".format(key, value))
+    return "|".join(parts)
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # the last item is for the +Inf bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        result = []
+        total = 0
+        for bound, count in zip(list(self.buckets) + ["+Inf"], self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+class MetricsCollector(RequestHook):
+    """
+    A hook collecting metrics about the requests. The collector is
+    thread-safe, so it can be used with
+    :py:class:`ws.client.edit_queue.EditQueue`.
+    """
+
+    # upper bounds of the latency histogram buckets (in seconds)
+    buckets = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # all mappings are keyed by (entry, action, module) tuples
+        self.requests = {}
+        self.errors = {}
+        self.response_bytes = {}
+        self.latency = {}
+        # keyed by the qualified name of the rate-limited function
+        self.rate_limit_sleeps = {}
+        self.rate_limit_seconds = {}
+        # keyed by (name, sorted labels) tuples
+        self.events = {}
+
+    def install(self, connection):
+        """
+        Register the collector as a hook of the given connection and as a
+        callback of :py:func:`ws.utils.rate.RateLimited`.
+
+        :param connection: a :py:class:`ws.client.connection.Connection` instance
+        """
+        connection.hooks.append(self)
+        ws.utils.rate.sleep_callbacks.append(self.on_rate_limit_sleep)
+
+    def uninstall(self, connection):
+        """
+        Unregister the collector from the given connection.
+        """
+        connection.hooks.remove(self)
+        ws.utils.rate.sleep_callbacks.remove(self.on_rate_limit_sleep)
+
+    def dump_at_exit(self, path):
+        """
+        Save the metrics into ``path`` when the Python interpreter exits.
+        """
+        atexit.register(self.dump, path)
+
+    @staticmethod
+    def _key(info):
+        if info["entry"] == "api":
+            return "api", info["params"].get("action", "help"), _module_label(info["params"])
+        return "index", info["params"].get("action", "view"), ""
+
+    def after_request(self, info):
+        key = self._key(info)
+        with self._lock:
+            self.requests[key] = self.requests.get(key, 0) + 1
+            if info["error"] is not None:
+                self.errors[key] = self.errors.get(key, 0) + 1
+            if info["bytes"] is not None:
+                self.response_bytes[key] = self.response_bytes.get(key, 0) + info["bytes"]
+            self.latency.setdefault(key, _Histogram(self.buckets)).observe(info["duration"])
+
+    def on_event(self, name, labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.events[key] = self.events.get(key, 0) + 1
+
+    def on_rate_limit_sleep(self, function, seconds):
+        with self._lock:
+            self.rate_limit_sleeps[function] = self.rate_limit_sleeps.get(function, 0) + 1
+            self.rate_limit_seconds[function] = self.rate_limit_seconds.get(function, 0) + seconds
+
+    def to_dict(self):
+        """
+        Returns the collected metrics as a JSON-serializable dictionary.
+        """
+        with self._lock:
+            modules = []
+            for key in sorted(self.requests):
+                entry, action, module = key
+                histogram = self.latency[key]
+                modules.append({
+                    "entry": entry,
+                    "action": action,
+                    "module": module,
+                    "requests": self.requests[key],
+                    "errors": self.errors.get(key, 0),
+                    "response_bytes": self.response_bytes.get(key, 0),
+                    "latency_seconds_sum": histogram.sum,
+                    "latency_seconds_buckets": [[str(bound), count] for bound, count in histogram.cumulative()],
+                })
+            rate_limits = []
+            for function in sorted(self.rate_limit_sleeps):
+                rate_limits.append({
+                    "function": function,
+                    "sleeps": self.rate_limit_sleeps[function],
+                    "seconds": self.rate_limit_seconds[function],
+                })
+            events = []
+            for (name, labels), count in sorted(self.events.items()):
+                events.append({"event": name, "labels": dict(labels), "count": count})
+        return {"modules": modules, "rate_limits": rate_limits, "events": events}
+
+    def to_prometheus(self):
+        """
+        Returns the collected metrics in the Prometheus text format.
+        """
+        def fmt_labels(**labels):
+            items = ('{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in labels.items())
+            return "{" + ",".join(items) + "}"
+
+        data = self.to_dict()
+        lines = []
+
+        lines.append("# TYPE ws_api_requests_total counter")
+        for m in data["modules"]:
+            lines.append("ws_api_requests_total{} {}".format(fmt_labels(entry=m["entry"], action=m["action"], module=m["module"]), m["requests"]))
+        lines.append("# TYPE ws_api_request_errors_total counter")
+        for m in data["modules"]:
+            lines.append("ws_api_request_errors_total{} {}".format(fmt_labels(entry=m["entry"], action=m["action"], module=m["module"]), m["errors"]))
+        lines.append("# TYPE ws_api_response_bytes_total counter")
+        for m in data["modules"]:
+            lines.append("ws_api_response_bytes_total{} {}".format(fmt_labels(entry=m["entry"], action=m["action"], module=m["module"]), m["response_bytes"]))
+        lines.append("# TYPE ws_api_request_duration_seconds histogram")
+        for m in data["modules"]:
+            for bound, count in m["latency_seconds_buckets"]:
+                labels = fmt_labels(entry=m["entry"], action=m["action"], module=m["module"], le=bound)
+                lines.append("ws_api_request_duration_seconds_bucket{} {}".format(labels, count))
+            labels = fmt_labels(entry=m["entry"], action=m["action"], module=m["module"])
+            lines.append("ws_api_request_duration_seconds_sum{} {}".format(labels, m["latency_seconds_sum"]))
+            lines.append("ws_api_request_duration_seconds_count{} {}".format(labels, m["requests"]))
+        lines.append("# TYPE ws_rate_limit_sleeps_total counter")
+        for r in data["rate_limits"]:
+            lines.append("ws_rate_limit_sleeps_total{} {}".format(fmt_labels(function=r["function"]), r["sleeps"]))
+        lines.append("# TYPE ws_rate_limit_sleep_seconds_total counter")
+        for r in data["rate_limits"]:
+            lines.append("ws_rate_limit_sleep_seconds_total{} {}".format(fmt_labels(function=r["function"]), r["seconds"]))
+        lines.append("# TYPE ws_api_events_total counter")
+        for e in data["events"]:
+            lines.append("ws_api_events_total{} {}".format(fmt_labels(event=e["event"], **e["labels"]), e["count"]))
+
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path):
+        """
+        Save the collected metrics into a file. The Prometheus text format is
+        used if the file name ends with ``.prom``, otherwise JSON is used.
+
+        :param str path: path to the output file
+        """
+        if path.endswith(".prom"):
+            text = self.to_prometheus()
+        else:
+            text = json.dumps(self.to_dict(), indent=4, sort_keys=True)
+        with open(path, "w") as f:
+            f.write(text)
+        logger.info("Saved API metrics to '{}'".format(path))
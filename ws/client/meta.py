@@ -1,6 +1,14 @@
 #! /usr/bin/env python3
 
+import os
 import datetime
+import hashlib
+import json
+import logging
+
+from ..utils import DatetimeEncoder, datetime_parser
+
+logger = logging.getLogger(__name__)
 
 class Meta:
     """
@@ -8,6 +16,11 @@ class Meta:
 
     Subclasses must configure the :py:attr:`module` and :py:attr:`properties`
     attributes.
+
+    If :py:attr:`persistent_timeout` is non-zero and the API object has a
+    ``cache_dir`` attribute, the fetched values are also saved in a file in
+    the cache directory (keyed by the API URL) and re-used by other instances
+    for :py:attr:`persistent_timeout` seconds.
     """
 
     module = ""
@@ -15,11 +28,74 @@ class Meta:
     volatile_properties = set()
     timeout = 0
     volatile_timeout = 0
+    # properties which are fetched in one query when any of them is accessed
+    prefetch_properties = set()
+    # timeout for the values loaded from the persistent cache (0 disables the cache)
+    persistent_timeout = 0
 
     def __init__(self, api):
         self._api = api
         self._values = {}
         self._timestamps = {}
+        self._load_cache()
+
+    def _cache_path(self):
+        cache_dir = getattr(self._api, "cache_dir", None)
+        if not cache_dir or not self.persistent_timeout:
+            return None
+        hostname = self._api.get_hostname()
+        digest = hashlib.sha1(self._api.api_url.encode("utf-8")).hexdigest()[:8]
+        return os.path.join(cache_dir, "{}-{}.{}.json".format(hostname, digest, self.module))
+
+    def _load_cache(self):
+        path = self._cache_path()
+        if path is None:
+            return
+        try:
+            with open(path, "r") as f:
+                data = json.load(f, object_hook=datetime_parser)
+        except (OSError, ValueError):
+            return
+        if data.get("api_url") != self._api.api_url:
+            return
+
+        utcnow = datetime.datetime.utcnow()
+        delta = datetime.timedelta(seconds=self.persistent_timeout)
+        for prop, timestamp in data["timestamps"].items():
+            if timestamp >= utcnow - delta and prop in data["values"]:
+                self._values[prop] = data["values"][prop]
+                self._timestamps[prop] = timestamp
+        logger.debug("Loaded {} properties of the {} module from {}".format(len(self._values), self.module, path))
+
+    def _save_cache(self):
+        path = self._cache_path()
+        if path is None:
+            return
+        data = {
+            "api_url": self._api.api_url,
+            "values": self._values,
+            "timestamps": self._timestamps,
+        }
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # write into a temporary file and rename it to avoid corrupted
+            # cache when multiple scripts run at the same time
+            tmp_path = "{}.{}.tmp".format(path, os.getpid())
+            with open(tmp_path, "w") as f:
+                json.dump(data, f, cls=DatetimeEncoder)
+            os.replace(tmp_path, path)
+        except OSError:
+            logger.exception("Failed to save the {} cache to {}".format(self.module, path))
+
+    def invalidate(self):
+        """
+        Invalidate all cached values, including the persistent cache.
+        """
+        self._values.clear()
+        self._timestamps.clear()
+        path = self._cache_path()
+        if path is not None and os.path.isfile(path):
+            os.remove(path)
 
     # TODO: expand, move somewhere more suitable
     @classmethod
@@ -56,6 +132,7 @@ class Meta:
         self._values.update(result)
         for p in result:
             self._timestamps[p] = utcnow
+        self._save_cache()
 
         if isinstance(prop, str):
             # use .get(), some props may never be returned by the API (e.g. uiprop=blockinfo)
@@ -74,6 +151,11 @@ class Meta:
 
         # don't fetch if delta is 0
         if attr not in self._values or (delta and self._timestamps.get(attr, utcnow) < utcnow - delta):
-            self.fetch(attr)
+            if attr in self.prefetch_properties:
+                # fetch all missing properties from the group in one query
+                prefetch = sorted(prop for prop in self.prefetch_properties if prop not in self._values)
+                self.fetch(sorted(set(prefetch) | {attr}))
+            else:
+                self.fetch(attr)
         # use .get(), some props may never be returned by the API (e.g. uiprop=blockinfo)
         return self._values.get(attr)
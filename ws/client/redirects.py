@@ -1,8 +1,10 @@
 #! /usr/bin/env python3
 
+import json
 import logging
+import os.path
 
-from ..utils import LazyProperty
+from ..utils import list_chunks, parse_date, format_date
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +34,12 @@ class Redirects:
 
     - Interwiki redirects are not included in the mapping.
 
+    The final targets of all redirects are precomputed at once (see
+    :py:attr:`resolved`), so resolving a redirect is a simple lookup. The
+    mapping can be saved in a cache file and updated incrementally from the
+    recent changes (see :py:meth:`load_cache`), or built from the local
+    database (see :py:meth:`fetch`).
+
     .. _`first way`: https://www.mediawiki.org/wiki/API:Query#Resolving_redirects
     .. _`prop=redirects`: https://www.mediawiki.org/wiki/API:Redirects
     .. _`generator=allpages`: https://www.mediawiki.org/wiki/API:Allpages
@@ -40,8 +48,11 @@ class Redirects:
 
     def __init__(self, api):
         self._api = api
+        self._map = None
+        self._resolved = None
+        self._loops = None
 
-    def fetch(self, source_namespaces="all", target_namespaces="all"):
+    def fetch(self, source_namespaces="all", target_namespaces="all", *, db=None):
         """
         Build a mapping of redirects in given namespaces.
 
@@ -61,6 +72,9 @@ class Redirects:
             the namespace ID of the target title must be in this list in order
             to be included in the mapping (default is ``"all"``, which will
             select all available namespaces)
+        :param ws.db.database.Database db:
+            if given, the redirects are read from the local database (which
+            should be synchronized first) instead of the API
         :returns:
             a dictionary where the keys are source titles and values are the
             redirect targets, including the link fragments (e.g.
@@ -73,35 +87,118 @@ class Redirects:
 
         redirects = {}
         for ns in target_namespaces:
+            if db is not None:
+                allpages = db.query(generator="allpages", gapnamespace=int(ns), gaplimit="max", prop="redirects", rdprop={"title", "fragment"})
+                self._add_redirects(redirects, allpages)
+                continue
             # FIXME: adding the rdnamespace parameter causes an internal API error,
             # see https://wiki.archlinux.org/index.php/User:Lahwaacz/Notes#API:_resolving_redirects
             # removing it for now, all namespaces are included by default anyway...
 #            allpages = self._api.generator(generator="allpages", gapnamespace=ns, gaplimit="max", prop="redirects", rdprop="title|fragment", rdnamespace="|".join(source_namespaces), rdlimit="max")
             allpages = self._api.generator(generator="allpages", gapnamespace=ns, gaplimit="max", prop="redirects", rdprop="title|fragment", rdlimit="max")
-            for page in allpages:
-                # construct the mapping, the query result is somewhat reversed...
-                target_title = page["title"]
-                for redirect in page.get("redirects", []):
-                    source_title = redirect["title"]
-                    target_fragment = redirect.get("fragment")
-                    if target_fragment:
-                        redirects[source_title] = "{}#{}".format(target_title, target_fragment)
-                    else:
-                        redirects[source_title] = target_title
+            self._add_redirects(redirects, allpages)
         return redirects
 
-    @LazyProperty
+    @staticmethod
+    def _add_redirects(redirects, allpages):
+        for page in allpages:
+            # construct the mapping, the query result is somewhat reversed...
+            target_title = page["title"]
+            for redirect in page.get("redirects", []):
+                source_title = redirect["title"]
+                target_fragment = redirect.get("fragment")
+                if target_fragment:
+                    redirects[source_title] = "{}#{}".format(target_title, target_fragment)
+                else:
+                    redirects[source_title] = target_title
+
+    @property
     def map(self):
         """
-        A lazily evaluated mapping for all namespaces on the wiki.
+        A lazily evaluated mapping for all namespaces on the wiki. It can be
+        replaced by assigning a different mapping, e.g. the result of
+        :py:meth:`fetch` with the ``db`` parameter, or reset with the ``del``
+        operator.
+        """
+        if self._map is None:
+            self._map = self.fetch()
+        return self._map
+
+    @map.setter
+    def map(self, mapping):
+        self._map = mapping
+        self._resolved = None
+        self._loops = None
+
+    @map.deleter
+    def map(self):
+        self.map = None
+
+    @property
+    def resolved(self):
         """
-        return self.fetch()
+        A mapping of all redirects in :py:attr:`map` to their last
+        non-redirect targets, including the link fragments. Redirects which
+        end in an infinite loop are not included.
+
+        The mapping is computed once for all redirects, each chain of
+        redirects is followed only once and the targets are assigned to all
+        redirects on the chain.
+        """
+        if self._resolved is None:
+            self._resolved, self._loops = self.resolve_all(self.map)
+        return self._resolved
+
+    @staticmethod
+    def resolve_all(mapping):
+        """
+        Resolve all redirects in a mapping like :py:attr:`map`.
+
+        :returns:
+            a ``(resolved, loops)`` tuple, where ``resolved`` is a mapping of
+            the source titles to their last non-redirect targets and ``loops``
+            is the set of the source titles which end in an infinite loop
+        """
+        # mapping of the source titles to (title, fragment) tuples of the last target
+        final = {}
+        loops = set()
+        for start in mapping:
+            path = []
+            on_path = set()
+            source = start
+            while source in mapping and source not in final and source not in loops:
+                if source in on_path:
+                    break
+                path.append(source)
+                on_path.add(source)
+                source = mapping[source].split("#", maxsplit=1)[0]
+
+            if source in on_path or source in loops:
+                loops.update(path)
+                continue
+            if source in final:
+                target, anchor = final[source]
+            else:
+                target, anchor = source, None
+            # the fragment of the last redirect on the chain which has one wins
+            for source in reversed(path):
+                if not anchor:
+                    _, _, anchor = mapping[source].partition("#")
+                final[source] = target, anchor
+
+        resolved = {}
+        for source, (target, anchor) in final.items():
+            if anchor:
+                resolved[source] = "{}#{}".format(target, anchor)
+            else:
+                resolved[source] = target
+        return resolved, loops
 
     def resolve(self, source):
         """
-        Looks into the :py:attr:`map` property and checks if given title is a
-        redirect page. Double redirects are resolved repeatedly, if an infinite
-        loop is detected, an error is logged and the page is treated as if it
+        Looks into the :py:attr:`resolved` property and checks if given title
+        is a redirect page. If an infinite loop is detected when resolving the
+        double redirects, an error is logged and the page is treated as if it
         was not a redirect.
 
         :param str source: the title to be resolved
@@ -109,26 +206,83 @@ class Redirects:
             A string of the last non-redirect target page if ``source`` is a
             redirect page, otherwise ``None``.
         """
-        def _get(source, anchor):
-            target = self.map.get(source)
-            if not target:
-                return None, None
-            try:
-                target, anchor = target.split("#", maxsplit=1)
-            except ValueError:
-                pass
-            return target, anchor
-
-        intermediates = set()
-        target, anchor = _get(source, None)
-        source = target
-        while source in self.map and target not in intermediates:
-            target, anchor = _get(source, anchor)
-            intermediates.add(target)
-            source = target
-        if target in self.map:
+        target = self.resolved.get(source)
+        if target is None and source in self._loops:
             logger.error("Failed to resolve last redirect target of '{}': detected infinite loop.".format(source))
-            return None
-        if anchor:
-            target += "#" + anchor
         return target
+
+    def update(self, since):
+        """
+        Update :py:attr:`map` with the redirects which were created, changed
+        or removed since the given timestamp, based on the recent changes.
+
+        The caller is responsible for checking that the timestamp is not
+        older than :py:attr:`ws.client.api.API.oldest_rc_timestamp`.
+
+        :param datetime.datetime since: the timestamp of the oldest change
+        :returns: the timestamp of the newest change (or ``since`` if there
+                  are no changes)
+        """
+        titles = set()
+        timestamp = since
+        for change in self._api.list(list="recentchanges", rcstart=since, rcdir="newer", rclimit="max",
+                                     rctype="edit|new|log", rcprop="title|timestamp|loginfo"):
+            timestamp = max(timestamp, change["timestamp"])
+            if change["type"] == "log" and change.get("logtype") not in {"move", "delete"}:
+                continue
+            if "title" in change:
+                titles.add(change["title"])
+            # both the source and the target of a move are affected
+            target = change.get("logparams", {}).get("target_title")
+            if target is not None:
+                titles.add(target)
+
+        if not titles:
+            return timestamp
+        logger.info("Updating redirects of {} changed pages...".format(len(titles)))
+
+        mapping = self.map
+        for chunk in list_chunks(sorted(titles), self._api.max_ids_per_query):
+            result = self._api.call_api(action="query", titles="|".join(chunk), redirects="")
+            for title in chunk:
+                mapping.pop(title, None)
+            # MediaWiki follows the double redirects, so there may be more
+            # redirects than titles, but each of them is a single step
+            for redirect in result.get("redirects", []):
+                if "tointerwiki" in redirect:
+                    continue
+                if redirect.get("tofragment"):
+                    mapping[redirect["from"]] = "{}#{}".format(redirect["to"], redirect["tofragment"])
+                else:
+                    mapping[redirect["from"]] = redirect["to"]
+        self.map = mapping
+        return timestamp
+
+    def load_cache(self, path):
+        """
+        Load :py:attr:`map` from a cache file, update it from the recent
+        changes since it was saved and save it again. If the file does not
+        exist or if it is older than the oldest recent change, all redirects
+        are fetched again.
+
+        :param str path: path to the cache file (JSON)
+        """
+        if os.path.isfile(path):
+            with open(path) as f:
+                data = json.load(f)
+            timestamp = parse_date(data["timestamp"])
+            if timestamp >= self._api.oldest_rc_timestamp:
+                self.map = data["map"]
+                timestamp = self.update(timestamp)
+                self._save_cache(path, timestamp)
+                return
+            logger.info("The redirects cache is older than the recent changes, fetching all redirects again.")
+
+        timestamp = self._api.newest_rc_timestamp
+        self.map = self.fetch()
+        self._save_cache(path, timestamp)
+
+    def _save_cache(self, path, timestamp):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"timestamp": format_date(timestamp), "map": self.map}, f)
@@ -14,6 +14,9 @@ class Site(Meta):
 
     All :py:attr:`properties` are evaluated lazily and cached. The cache is
     never automatically invalidated, you should create a new instance for this.
+    If the API object was created with the ``cache_dir`` parameter, the
+    properties are also saved in the cache directory and re-used by new
+    instances for :py:attr:`persistent_timeout` seconds.
 
     .. _`MediaWiki API`: https://www.mediawiki.org/wiki/API:Siteinfo
     """
@@ -24,6 +27,9 @@ class Site(Meta):
             "libraries", "extensions", "fileextensions", "rightsinfo", "restrictions",
             "languages", "languagevariants", "skins", "extensiontags", "functionhooks",
             "showhooks", "variables", "protocols", "defaultoptions", "uploaddialog"}
+    # properties needed by almost every script (e.g. for parsing titles)
+    prefetch_properties = {"general", "namespaces", "namespacealiases", "interwikimap"}
+    persistent_timeout = 24 * 3600
 
     def __init__(self, api):
         super().__init__(api)
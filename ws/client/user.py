@@ -27,6 +27,8 @@ class User(Meta):
     volatile_properties = {"hasmsg", "editcount", "unreadcount"}
     timeout = 3600
     volatile_timeout = 300
+    # properties checked by the API class before editing
+    prefetch_properties = {"rights", "groups", "ratelimits"}
 
     def __init__(self, api):
         super().__init__(api)
@@ -40,7 +42,8 @@ class User(Meta):
         The property is evaluated lazily and cached with the
         :py:class:`@LazyProperty <ws.utils.lazy.LazyProperty>` decorator.
         """
-        return "anon" not in self.fetch()
+        # fetch also the commonly used properties to save queries later
+        return "anon" not in self.fetch(sorted(self.prefetch_properties))
 
     def set_option(self, option, value):
         """
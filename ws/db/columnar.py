@@ -0,0 +1,221 @@
+#! /usr/bin/env python3
+
+"""
+Bulk loading of the revision metadata into columnar `NumPy`_ arrays for
+analytics.
+
+The metadata of all revisions (and optionally deleted revisions) are fetched
+with a single ``COPY ... TO STDOUT`` query in the binary format of PostgreSQL.
+All columns have a fixed width, so the rows are decoded at once with
+:py:func:`numpy.frombuffer` without creating any Python objects per row. This
+takes about 30 bytes of memory per revision, compared to about 1 KB for the
+dicts returned by :py:meth:`ws.db.database.Database.query`.
+
+The arrays can be converted into `Apache Arrow`_ tables and saved as `Parquet`_
+files for offline analysis (requires the optional :py:mod:`pyarrow` module).
+
+.. _NumPy: http://www.numpy.org/
+.. _Apache Arrow: https://arrow.apache.org/
+.. _Parquet: https://parquet.apache.org/
+"""
+
+import io
+import logging
+
+import sqlalchemy as sa
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["REVISION_FIELDS", "revision_dtype", "decode_copy_binary", "load_revisions",
+           "to_arrow", "write_parquet", "read_parquet"]
+
+# names and big-endian types of the fields in the PostgreSQL binary format
+REVISION_FIELDS = [
+    ("revid", ">i4"),
+    ("pageid", ">i4"),
+    ("namespace", ">i4"),
+    ("userid", ">i4"),
+    # microseconds since 2000-01-01
+    ("timestamp", ">i8"),
+    ("size", ">i4"),
+    ("minor", "u1"),
+    ("deleted", "u1"),
+]
+
+# PostgreSQL epoch (2000-01-01) in microseconds since the Unix epoch
+_PG_EPOCH_US = 946684800 * 10**6
+
+_COPY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+
+def revision_dtype():
+    """
+    Returns the :py:class:`numpy.dtype` of the structured arrays returned by
+    :py:func:`load_revisions`. The fields are:
+
+    - ``revid``, ``pageid``, ``namespace``, ``userid``: ``int32`` (the page ID
+      of deleted revisions is 0 and the user ID of anonymous users is 0)
+    - ``timestamp``: ``datetime64[us]``
+    - ``size``: ``int32`` (-1 if unknown)
+    - ``minor``, ``deleted``: ``bool``
+    """
+    import numpy as np
+    return np.dtype([
+        ("revid", np.int32),
+        ("pageid", np.int32),
+        ("namespace", np.int32),
+        ("userid", np.int32),
+        ("timestamp", "datetime64[us]"),
+        ("size", np.int32),
+        ("minor", np.bool_),
+        ("deleted", np.bool_),
+    ])
+
+def _select(db, *, namespaces=None, deleted=True, until=None):
+    """
+    Returns a select with the :py:data:`REVISION_FIELDS` columns, without
+    NULL values.
+    """
+    rev = db.revision
+    page = db.page
+    ar = db.archive
+
+    s = sa.select([
+            rev.c.rev_id.label("revid"),
+            rev.c.rev_page.label("pageid"),
+            page.c.page_namespace.label("namespace"),
+            rev.c.rev_user.label("userid"),
+            rev.c.rev_timestamp.label("timestamp"),
+            sa.func.coalesce(rev.c.rev_len, -1).label("size"),
+            rev.c.rev_minor_edit.label("minor"),
+            sa.false().label("deleted"),
+        ]).select_from(rev.join(page, rev.c.rev_page == page.c.page_id))
+    if namespaces is not None:
+        s = s.where(page.c.page_namespace.in_(namespaces))
+    if until is not None:
+        s = s.where(rev.c.rev_timestamp <= until)
+    if deleted is False:
+        return s.order_by(rev.c.rev_timestamp, rev.c.rev_id)
+
+    s2 = sa.select([
+            ar.c.ar_rev_id.label("revid"),
+            sa.func.coalesce(ar.c.ar_page_id, 0).label("pageid"),
+            ar.c.ar_namespace.label("namespace"),
+            ar.c.ar_user.label("userid"),
+            ar.c.ar_timestamp.label("timestamp"),
+            sa.func.coalesce(ar.c.ar_len, -1).label("size"),
+            ar.c.ar_minor_edit.label("minor"),
+            sa.true().label("deleted"),
+        ])
+    if namespaces is not None:
+        s2 = s2.where(ar.c.ar_namespace.in_(namespaces))
+    if until is not None:
+        s2 = s2.where(ar.c.ar_timestamp <= until)
+
+    union = sa.union_all(s, s2).alias("revisions")
+    return sa.select([union.c[name] for name, _ in REVISION_FIELDS]) \
+             .order_by(union.c.timestamp, union.c.revid)
+
+def decode_copy_binary(data):
+    """
+    Decode the output of ``COPY ... TO STDOUT WITH (FORMAT binary)`` for the
+    columns described by :py:data:`REVISION_FIELDS`.
+
+    :param bytes data: the raw output of the ``COPY`` command
+    :returns: a structured array with the :py:func:`revision_dtype`
+    """
+    import numpy as np
+
+    if not data.startswith(_COPY_SIGNATURE):
+        raise ValueError("Invalid signature of the binary COPY output.")
+    offset = len(_COPY_SIGNATURE) + 4
+    ext_length = int.from_bytes(data[offset:offset + 4], "big")
+    offset += 4 + ext_length
+    if data[-2:] != b"\xff\xff":
+        raise ValueError("Invalid trailer of the binary COPY output.")
+    body = memoryview(data)[offset:-2]
+
+    # each row is the number of fields followed by (length, value) pairs
+    raw_fields = [("_count", ">i2")]
+    for name, type_ in REVISION_FIELDS:
+        raw_fields.append(("_" + name + "_length", ">i4"))
+        raw_fields.append((name, type_))
+    raw_dtype = np.dtype(raw_fields)
+
+    if len(body) % raw_dtype.itemsize != 0:
+        raise ValueError("Unexpected size of the binary COPY output.")
+    raw = np.frombuffer(body, dtype=raw_dtype)
+
+    # the values must not be NULL, otherwise the rows would not have a fixed width
+    if not np.all(raw["_count"] == len(REVISION_FIELDS)):
+        raise ValueError("Unexpected number of fields in the binary COPY output.")
+    for name, type_ in REVISION_FIELDS:
+        if not np.all(raw["_" + name + "_length"] == np.dtype(type_).itemsize):
+            raise ValueError("Unexpected length of the field '{}' in the binary COPY output.".format(name))
+
+    result = np.empty(len(raw), dtype=revision_dtype())
+    for name, _ in REVISION_FIELDS:
+        if name == "timestamp":
+            result[name] = (raw[name] + _PG_EPOCH_US).astype("datetime64[us]")
+        else:
+            result[name] = raw[name]
+    return result
+
+def load_revisions(db, *, namespaces=None, deleted=True, until=None):
+    """
+    Load the metadata of revisions from the database into a structured array
+    sorted by the timestamp. See :py:func:`revision_dtype` for the fields.
+
+    :param ws.db.database.Database db: the database
+    :param namespaces: an iterable of namespace numbers (default: all)
+    :param bool deleted: whether to include the deleted revisions (from the
+                         ``archive`` table)
+    :param datetime.datetime until: the timestamp of the newest revisions to
+                                    include (default: all revisions)
+    :returns: a :py:class:`numpy.ndarray`
+    """
+    import numpy as np
+
+    select = _select(db, namespaces=namespaces, deleted=deleted, until=until)
+
+    with db.engine.connect() as conn:
+        if db.engine.driver == "psycopg2":
+            compiled = select.compile(dialect=db.engine.dialect)
+            dbapi_conn = conn.connection
+            with dbapi_conn.cursor() as cursor:
+                query = cursor.mogrify(str(compiled), compiled.params).decode("utf-8")
+                buffer = io.BytesIO()
+                cursor.copy_expert("COPY ({}) TO STDOUT WITH (FORMAT binary)".format(query), buffer)
+            return decode_copy_binary(buffer.getvalue())
+
+        # fallback for other drivers, which do not support COPY
+        logger.warning("The {} driver does not support COPY, loading revisions row by row.".format(db.engine.driver))
+        rows = conn.execute(select).fetchall()
+        return np.array([tuple(row) for row in rows], dtype=revision_dtype())
+
+def to_arrow(array):
+    """
+    Convert a structured array from :py:func:`load_revisions` into a
+    :py:class:`pyarrow.Table`.
+    """
+    import pyarrow
+    return pyarrow.table({name: array[name] for name in array.dtype.names})
+
+def write_parquet(array, path):
+    """
+    Save a structured array from :py:func:`load_revisions` as a Parquet file.
+    """
+    import pyarrow.parquet
+    pyarrow.parquet.write_table(to_arrow(array), path)
+
+def read_parquet(path):
+    """
+    Load a structured array saved by :py:func:`write_parquet`.
+    """
+    import numpy as np
+    import pyarrow.parquet
+
+    table = pyarrow.parquet.read_table(path)
+    result = np.empty(table.num_rows, dtype=revision_dtype())
+    for name in result.dtype.names:
+        result[name] = table.column(name).to_numpy()
+    return result
@@ -17,7 +17,7 @@ import logging
 import sqlalchemy as sa
 import alembic.config
 
-from . import schema, selects, grabbers, parser_cache
+from . import schema, selects, grabbers, parser_cache, xml_dump, columnar
 from ..parser_helpers.title import Context, Title
 
 logger = logging.getLogger(__name__)
@@ -140,8 +140,38 @@ class Database:
 
         :param ws.client.api.API api: interface to the remote MediaWiki instance
         :param bool with_content: whether to synchronize the content of all revisions
+        :returns: a dictionary mapping the names of the grabbers to the duration
+                  of their updates (in seconds)
         """
-        grabbers.synchronize(self, api, with_content=with_content)
+        return grabbers.synchronize(self, api, with_content=with_content)
+
+    def import_xml_dump(self, api, source, *, timestamp=None):
+        """
+        Populate the database from a MediaWiki XML dump. The grabbers used by
+        :py:meth:`.sync_with_api` continue incrementally from the time of the
+        dump. See :py:mod:`ws.db.xml_dump` for details.
+
+        :param ws.client.api.API api: interface to the wiki from which the dump was created
+        :param source: path to the dump (optionally compressed) or a file-like object
+        :param datetime.datetime timestamp:
+            the timestamp from which the grabbers should continue (by default
+            the most recent timestamp found in the dump)
+        :returns: the used sync timestamp
+        """
+        return xml_dump.XMLDumpImporter(api, self).import_dump(source, timestamp=timestamp)
+
+    def export_xml_dump(self, dest, *, history="current", namespaces=None, logs=False):
+        """
+        Export the pages (and optionally the log events) into a MediaWiki XML
+        dump. See :py:class:`ws.db.xml_dump.XMLDumpExporter` for details.
+
+        :param dest: path to the output file (compressed if it ends with
+                     ``.gz``, ``.bz2`` or ``.xz``) or a file-like object
+        :param str history: ``"current"`` or ``"full"``
+        :param namespaces: namespace numbers to export (default: all)
+        :param bool logs: whether to export the log events
+        """
+        xml_dump.XMLDumpExporter(self).export_dump(dest, history=history, namespaces=namespaces, logs=logs)
 
     def sync_revisions_content(self, api, *, mode="latest"):
         """
@@ -166,12 +196,29 @@ class Database:
         """
         return selects.query(self, *args, **kwargs)
 
-    def Title(self, title):
+    def load_revisions_metadata(self, *, namespaces=None, deleted=True, until=None):
         """
-        Parse a MediaWiki title.
+        Load the metadata of revisions into a NumPy structured array with one
+        row per revision. This is much faster and uses much less memory than
+        :py:meth:`.query` with ``list=allrevisions``. See
+        :py:mod:`ws.db.columnar` for details and for the conversion into
+        Arrow tables and Parquet files.
+
+        :param namespaces: an iterable of namespace numbers (default: all)
+        :param bool deleted: whether to include the deleted revisions
+        :param datetime.datetime until: the timestamp of the newest revisions
+                                        to include (default: all revisions)
+        :returns: a :py:class:`numpy.ndarray` with the fields described by
+                  :py:func:`ws.db.columnar.revision_dtype`
+        """
+        return columnar.load_revisions(self, namespaces=namespaces, deleted=deleted, until=until)
 
-        :param str title: page title to be parsed
-        :returns: a :py:class:`ws.parser_helpers.title.Title` object
+    def title_context(self):
+        """
+        Create a title parsing context from the namespaces and interwiki map
+        stored in the database.
+
+        :returns: a :py:class:`ws.parser_helpers.title.Context` object
         """
         iwmap = selects.get_interwikimap(self)
         namespacenames = selects.get_namespacenames(self)
@@ -179,8 +226,19 @@ class Database:
         # legaltitlechars are not stored in the database, it will hardly ever
         # change so let's just hardcode it
         legaltitlechars = " %!\"$&'()*,\\-.\\/0-9:;=?@A-Z\\\\^_`a-z~\\x80-\\xFF+"
-        context = Context(iwmap, namespacenames, namespaces, legaltitlechars)
-        return Title(context, title)
+        return Context(iwmap, namespacenames, namespaces, legaltitlechars)
+
+    def Title(self, title):
+        """
+        Parse a MediaWiki title.
+
+        Note that the parsing context is loaded from the database on each call,
+        use :py:meth:`.title_context` to parse many titles at once.
+
+        :param str title: page title to be parsed
+        :returns: a :py:class:`ws.parser_helpers.title.Title` object
+        """
+        return Title(self.title_context(), title)
 
     def update_parser_cache(self):
         """
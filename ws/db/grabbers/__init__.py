@@ -17,24 +17,39 @@ from ws.db.grabbers.logging_ import GrabberLogging
 logger = logging.getLogger(__name__)
 
 def synchronize(db, api, *, with_content=False):
+    """
+    Synchronize the database with the wiki.
+
+    :returns: a dictionary mapping the names of the grabbers to the duration
+              of their updates (in seconds), empty if there were no changes
+    """
     time1 = time.time()
+    timings = {}
 
     # if no recent change has been added, it's safe to assume that the other tables are up to date as well
     g = GrabberRecentChanges(api, db)
     if g.needs_update() is False:
         logger.info("No new changes since the last database synchronization.")
-        return
-
-    GrabberNamespaces(api, db).update()
-    GrabberTags(api, db).update()
-    GrabberRecentChanges(api, db).update()
-    GrabberUsers(api, db).update()
-    GrabberLogging(api, db).update()
-    GrabberInterwiki(api, db).update()
-    GrabberIPBlocks(api, db).update()
-    GrabberPages(api, db).update()
-    GrabberProtectedTitles(api, db).update()
-    GrabberRevisions(api, db, with_content=with_content).update()
+        return timings
+
+    grabbers = [
+        (GrabberNamespaces, {}),
+        (GrabberTags, {}),
+        (GrabberRecentChanges, {}),
+        (GrabberUsers, {}),
+        (GrabberLogging, {}),
+        (GrabberInterwiki, {}),
+        (GrabberIPBlocks, {}),
+        (GrabberPages, {}),
+        (GrabberProtectedTitles, {}),
+        (GrabberRevisions, {"with_content": with_content}),
+    ]
+    for klass, kwargs in grabbers:
+        start = time.time()
+        klass(api, db, **kwargs).update()
+        timings[klass.__name__] = time.time() - start
+        logger.debug("{} took {:.2f} seconds.".format(klass.__name__, timings[klass.__name__]))
 
     time2 = time.time()
     logger.info("Synchronization of the database took {:.2f} seconds.".format(time2 - time1))
+    return timings
@@ -1,11 +1,13 @@
 #!/usr/bin/env python3
 
+import importlib.util
 import logging
 import time
 
 import sqlalchemy as sa
 
 from ws.utils import value_or_none
+import ws.db.user_activity as user_activity
 
 from .GrabberBase import *
 
@@ -17,6 +19,9 @@ class GrabberRevisions(GrabberBase):
     def __init__(self, api, db, *, with_content=False):
         super().__init__(api, db)
         self.with_content = with_content
+        # stream the responses with content to keep the memory usage bounded
+        # (requires the optional ijson module)
+        self.stream = with_content is True and importlib.util.find_spec("ijson") is not None
 
         ins_text = sa.dialects.postgresql.insert(db.text)
         ins_revision = sa.dialects.postgresql.insert(db.revision)
@@ -284,11 +289,28 @@ class GrabberRevisions(GrabberBase):
         # we need one instance per transaction
         self.text_id_gen = self._get_text_id_gen()
 
-        for page in self.api.list(self.arv_params):
+        for page in self.api.list(self.arv_params, stream=self.stream):
             yield from self.gen_revisions(page)
-        for page in self.api.list(self.adr_params):
+        for page in self.api.list(self.adr_params, stream=self.stream):
             yield from self.gen_deletedrevisions(page)
 
+        # rebuild the rollup after all revisions are inserted
+        yield from user_activity.gen_rebuild(self.db)
+
+    def _activity_keys(self, pages):
+        """
+        Returns a set of ``(user, day)`` keys for the ``ws_user_activity``
+        table which correspond to the revisions of the given pages.
+        """
+        rev = self.db.revision
+        if not pages:
+            return set()
+        day = sa.cast(sa.func.date_trunc("day", rev.c.rev_timestamp), sa.Date)
+        query = sa.select([rev.c.rev_user_text, day]) \
+                  .where(rev.c.rev_page.in_(pages)) \
+                  .distinct()
+        return set(tuple(row) for row in self.db.engine.execute(query))
+
     def gen_update(self, since):
         # we need one instance per transaction
         self.text_id_gen = self._get_text_id_gen()
@@ -296,14 +318,17 @@ class GrabberRevisions(GrabberBase):
         # save new revids for the tag updates
         new_revids = set()
         new_deleted_revids = set()
+        # (user, day) keys of the rows in the ws_user_activity table to be recomputed
+        activity_keys = set()
 
         arv_params = self.arv_params.copy()
         arv_params["arvdir"] = "newer"
         arv_params["arvstart"] = since
-        for page in self.api.list(arv_params):
+        for page in self.api.list(arv_params, stream=self.stream):
             yield from self.gen_revisions(page)
             for rev in page["revisions"]:
                 new_revids.add(rev["revid"])
+                activity_keys.add((rev["user"], rev["timestamp"].date()))
 
         deleted_pages = set()
         undeleted_pages = {}
@@ -415,6 +440,7 @@ class GrabberRevisions(GrabberBase):
                     yield from self.gen_deletedrevisions(page)
                     for rev in page["revisions"]:
                         new_revids.add(rev["revid"])
+                        activity_keys.add((rev["user"], rev["timestamp"].date()))
 
         # sync all revisions of imported pages
         params = {
@@ -439,12 +465,17 @@ class GrabberRevisions(GrabberBase):
                     yield from self.gen_revisions(page)
                     for rev in page["revisions"]:
                         new_revids.add(rev["revid"])
+                        activity_keys.add((rev["user"], rev["timestamp"].date()))
                 if "deletedrevisions" in page:
                     # update the dict for gen_deletedrevisions to understand
                     page["revisions"] = page.pop("deletedrevisions")
                     yield from self.gen_deletedrevisions(page)
                     for rev in page["revisions"]:
                         new_revids.add(rev["revid"])
+                        activity_keys.add((rev["user"], rev["timestamp"].date()))
+
+        # the revisions of moved and merged pages may be counted in a different namespace
+        activity_keys |= self._activity_keys(moved_pages | set(merged_pages))
 
         # handle merge
         # MW defect: the target page ID is not present in the logevent, so we need to look up
@@ -506,6 +537,9 @@ class GrabberRevisions(GrabberBase):
                 yield self.sql["delete", "tagged_archived_revision"], db_entry
                 yield self.sql["delete", "tagged_recentchange"], db_entry
 
+        # recompute the affected rows of the rollup after all revisions are updated
+        yield from user_activity.gen_refresh(self.db, activity_keys)
+
 
     def sync_revisions_content(self, *, mode="latest"):
         assert mode in {"latest", "all"}
@@ -15,7 +15,7 @@ from ..parser_helpers.title import TitleError
 from ..parser_helpers.encodings import urldecode
 
 # TODO: generalize or make the language tags configurable
-from ws.ArchWiki.lang import get_language_tags
+from ws.ArchWiki.lang import is_language_tag
 
 logger = logging.getLogger(__name__)
 
@@ -405,7 +405,7 @@ class ParserCache:
                 elif page_is_redirect and i == 0:
                     iwlinks.append(target)
                 # language links are special only in article namespaces, not in talk namespaces
-                elif target.iwprefix in get_language_tags() and title.namespace == title.articlespace:
+                elif is_language_tag(target.iwprefix) and title.namespace == title.articlespace:
                     langlinks.append(target)
                 else:
                     iwlinks.append(target)
@@ -51,7 +51,7 @@ from sqlalchemy import \
         Table, Column, ForeignKey, Index, PrimaryKeyConstraint, ForeignKeyConstraint, CheckConstraint
 from sqlalchemy.types import \
         Boolean, SmallInteger, Integer, Float, \
-        UnicodeText, Enum, DateTime, ARRAY
+        UnicodeText, Enum, Date, DateTime, ARRAY
 
 from .sql_types import \
         MWTimestamp, SHA1, JSONEncodedDict
@@ -106,6 +106,19 @@ def create_custom_tables(metadata):
         Column("wss_timestamp", DateTime, nullable=False)
     )
 
+    # rollup of the revision and archive tables with the number of edits and
+    # changed bytes per user, UTC day and namespace (see ws.db.user_activity)
+    ws_user_activity = Table("ws_user_activity", metadata,
+        Column("wsua_user_text", UnicodeText, nullable=False),
+        Column("wsua_day", Date, nullable=False),
+        Column("wsua_namespace", Integer, ForeignKey("namespace.ns_id"), nullable=False),
+        Column("wsua_edits", Integer, nullable=False),
+        # sum of the differences between the sizes of the revisions and their parents
+        Column("wsua_bytes", Integer, nullable=False),
+        PrimaryKeyConstraint("wsua_user_text", "wsua_day", "wsua_namespace")
+    )
+    Index("wsua_day", ws_user_activity.c.wsua_day)
+
 
 def create_site_tables(metadata):
     # MW incompatibility: dropped the iw_wikiid column
@@ -2,6 +2,8 @@
 
 from collections import OrderedDict
 
+from ws.parser_helpers.title import Title
+
 from .namespaces import *
 from .interwiki import *
 
@@ -133,7 +135,9 @@ def query_pageset(db, params):
         if isinstance(titles, str):
             titles = {titles}
         assert isinstance(titles, set)
-        titles = [db.Title(t) for t in titles]
+        # parse all titles with the same context
+        context = db.title_context()
+        titles = [Title(context, t) for t in titles]
         tail, pageset, ex = get_pageset(db, titles=titles)
     elif "pageids" in params:
         pageids = params_copy.pop("pageids")
@@ -0,0 +1,164 @@
+#! /usr/bin/env python3
+
+"""
+The ``ws_user_activity`` table is a rollup of the ``revision`` and ``archive``
+tables holding the number of edits and changed bytes for each user, UTC day
+and namespace. It is used by the statistics scripts instead of aggregating
+the revisions over the whole history of the wiki.
+
+The table is updated incrementally by
+:py:class:`ws.db.grabbers.revision.GrabberRevisions`: the rows for each
+``(user, day)`` pair touched by the new revisions are recomputed from the
+``revision`` and ``archive`` tables. Since both tables are included, deleting
+or undeleting pages does not affect the rollup.
+
+Notes:
+
+- Revisions are counted in the current namespace of their page. When pages
+  are moved or revisions are merged, the rows of all ``(user, day)`` pairs
+  with revisions of the affected pages are recomputed.
+- The number of changed bytes of a revision is the difference between its size
+  and the size of its parent revision, if it is known.
+
+The table can be rebuilt from scratch by running this module::
+
+    python -m ws.db.user_activity --db-name ...
+"""
+
+import datetime
+import logging
+
+import sqlalchemy as sa
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["select_activity", "gen_rebuild", "rebuild", "gen_refresh"]
+
+def select_activity(db, *, user_day=False):
+    """
+    Returns a select computing the rows of the ``ws_user_activity`` table from
+    the ``revision`` and ``archive`` tables.
+
+    :param ws.db.database.Database db: the database
+    :param bool user_day:
+        if ``True``, the select is restricted to the revisions of the user
+        given by the ``b_user_text`` bind parameter made between the
+        ``b_start`` (inclusive) and ``b_end`` (exclusive) timestamps
+    """
+    rev = db.revision
+    ar = db.archive
+    page = db.page
+
+    def parent_len(suffix):
+        parent_rev = rev.alias("parent_rev_" + suffix)
+        parent_ar = ar.alias("parent_ar_" + suffix)
+        column = sa.func.coalesce(parent_rev.c.rev_len, parent_ar.c.ar_len, 0)
+        return parent_rev, parent_ar, column
+
+    parent_rev, parent_ar, rev_parent_len = parent_len("rev")
+    s1 = sa.select([rev.c.rev_user_text.label("user_text"),
+                    rev.c.rev_timestamp.label("timestamp"),
+                    page.c.page_namespace.label("namespace"),
+                    (sa.func.coalesce(rev.c.rev_len, 0) - rev_parent_len).label("bytes")]) \
+           .select_from(
+                rev.join(page, rev.c.rev_page == page.c.page_id)
+                   .outerjoin(parent_rev, parent_rev.c.rev_id == rev.c.rev_parent_id)
+                   .outerjoin(parent_ar, parent_ar.c.ar_rev_id == rev.c.rev_parent_id))
+
+    parent_rev, parent_ar, ar_parent_len = parent_len("ar")
+    s2 = sa.select([ar.c.ar_user_text.label("user_text"),
+                    ar.c.ar_timestamp.label("timestamp"),
+                    ar.c.ar_namespace.label("namespace"),
+                    (sa.func.coalesce(ar.c.ar_len, 0) - ar_parent_len).label("bytes")]) \
+           .select_from(
+                ar.outerjoin(parent_rev, parent_rev.c.rev_id == ar.c.ar_parent_id)
+                  .outerjoin(parent_ar, parent_ar.c.ar_rev_id == ar.c.ar_parent_id))
+
+    if user_day is True:
+        # these conditions use the rev_usertext_timestamp and ar_usertext_timestamp indexes
+        s1 = s1.where(sa.and_(rev.c.rev_user_text == sa.bindparam("b_user_text"),
+                              rev.c.rev_timestamp >= sa.bindparam("b_start"),
+                              rev.c.rev_timestamp < sa.bindparam("b_end")))
+        s2 = s2.where(sa.and_(ar.c.ar_user_text == sa.bindparam("b_user_text"),
+                              ar.c.ar_timestamp >= sa.bindparam("b_start"),
+                              ar.c.ar_timestamp < sa.bindparam("b_end")))
+
+    edits = sa.union_all(s1, s2).alias("edits")
+    day = sa.cast(sa.func.date_trunc("day", edits.c.timestamp), sa.Date)
+    return sa.select([edits.c.user_text,
+                      day.label("day"),
+                      edits.c.namespace,
+                      sa.func.count().label("edits"),
+                      sa.func.sum(edits.c.bytes).label("bytes")]) \
+             .group_by(edits.c.user_text, day, edits.c.namespace)
+
+def _insert(db, select):
+    t = db.ws_user_activity
+    return t.insert().from_select([t.c.wsua_user_text, t.c.wsua_day, t.c.wsua_namespace,
+                                   t.c.wsua_edits, t.c.wsua_bytes],
+                                  select)
+
+def gen_rebuild(db):
+    """
+    Generate queries rebuilding the ``ws_user_activity`` table from scratch,
+    suitable for :py:class:`ws.db.execution.DeferrableExecutionQueue`.
+
+    :param ws.db.database.Database db: the database
+    """
+    yield db.ws_user_activity.delete()
+    yield _insert(db, select_activity(db))
+
+def rebuild(db, conn=None):
+    """
+    Rebuild the ``ws_user_activity`` table from scratch.
+
+    :param ws.db.database.Database db: the database
+    :param conn: an existing connection or transaction to be used for the
+                 queries, by default a new transaction is used
+    """
+    if conn is None:
+        with db.engine.begin() as conn:
+            return rebuild(db, conn)
+    for stmt in gen_rebuild(db):
+        conn.execute(stmt)
+
+def gen_refresh(db, keys):
+    """
+    Generate queries recomputing the rows for the given ``(user, day)`` pairs,
+    suitable for :py:class:`ws.db.execution.DeferrableExecutionQueue`.
+
+    :param ws.db.database.Database db: the database
+    :param keys: an iterable of ``(user_text, date)`` tuples, where ``date``
+                 is a :py:class:`datetime.date` object
+    """
+    t = db.ws_user_activity
+    delete = t.delete().where(sa.and_(t.c.wsua_user_text == sa.bindparam("b_user_text"),
+                                      t.c.wsua_day == sa.bindparam("b_day")))
+    insert = _insert(db, select_activity(db, user_day=True))
+
+    for user_text, day in sorted(keys):
+        start = datetime.datetime(day.year, day.month, day.day)
+        params = {
+            "b_user_text": user_text,
+            "b_day": day,
+            "b_start": start,
+            "b_end": start + datetime.timedelta(days=1),
+        }
+        yield delete, params
+        yield insert, params
+
+if __name__ == "__main__":
+    import ws.config
+    import ws.logging
+    from ws.db.database import Database
+
+    argparser = ws.config.getArgParser(description="Rebuild the ws_user_activity table")
+    Database.set_argparser(argparser)
+    args = argparser.parse_args()
+
+    # set up logging
+    ws.logging.init(args)
+
+    db = Database.from_argparser(args)
+    rebuild(db)
+    logger.info("The ws_user_activity table has been rebuilt.")
@@ -0,0 +1,754 @@
+#! /usr/bin/env python3
+
+"""
+Import and export of `MediaWiki XML dumps`_ into/from the wiki-scripts
+database.
+
+The initial synchronization with :py:meth:`ws.db.database.Database.sync_with_api`
+has to crawl the whole history of the wiki through the API. For big wikis it
+is much faster to import a dump (e.g. created with ``dumpBackup.php`` or
+``Special:Export``, see ``examples/dump.py``) and let the grabbers continue
+incrementally from the time of the dump:
+
+.. code-block:: python
+
+    db.import_xml_dump(api, "dump.xml.bz2")
+    db.sync_with_api(api)
+
+The dump is parsed with :py:func:`xml.etree.ElementTree.iterparse` and the
+elements are discarded as soon as they are processed, so the memory usage does
+not depend on the size of the dump.
+
+Limitations of the import (the data is not available in the dumps):
+
+- Tags of the revisions and log events are not imported.
+- The log parameters are stored verbatim under the ``"dump"`` key of
+  ``log_params``, because the serialization in the dumps differs from the
+  API output. The ``log_page`` column is not set.
+- The suppression of revisions and log events (``DELETED_RESTRICTED``) is not
+  visible in the dumps.
+
+The :py:class:`XMLDumpExporter` does the opposite: it writes the pages (the
+current revisions or the full history) and optionally the log events from the
+database into a dump which can be imported into MediaWiki with
+``importDump.php``:
+
+.. code-block:: python
+
+    db.export_xml_dump("dump.xml.gz", history="full", namespaces=[0, 4])
+
+The rows are fetched with server-side cursors and the XML is written
+incrementally, so the memory usage does not depend on the size of the wiki.
+
+.. _`MediaWiki XML dumps`: https://www.mediawiki.org/wiki/Help:Export
+"""
+
+import bz2
+import gzip
+import lzma
+import logging
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import XMLGenerator
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import insert
+
+from ws.utils import base_enc, parse_date, format_date
+from ws.parser_helpers.title import Title
+import ws.db.mw_constants as mwconst
+import ws.db.selects as selects
+from .execution import DeferrableExecutionQueue
+from . import user_activity
+from .grabbers import GrabberNamespaces, GrabberTags, GrabberInterwiki, GrabberUsers, \
+                      GrabberPages, GrabberRevisions, GrabberLogging
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["parse_xml_dump", "XMLDumpImporter", "XMLDumpExporter"]
+
+def _open(source, mode="rb"):
+    """
+    Open a (possibly compressed) file in binary mode. The compression is
+    determined from the file extension.
+    """
+    if not isinstance(source, str):
+        # file-like object
+        return source
+    if source.endswith(".gz"):
+        return gzip.open(source, mode)
+    if source.endswith(".bz2"):
+        return bz2.open(source, mode)
+    if source.endswith(".xz"):
+        return lzma.open(source, mode)
+    return open(source, mode)
+
+def _localname(tag):
+    # strip the XML namespace, the schema version of the dumps changes over time
+    return tag.rsplit("}", 1)[-1]
+
+def _children(elem):
+    """
+    Returns a dictionary mapping local names to the child elements.
+    """
+    return dict((_localname(child.tag), child) for child in elem)
+
+def _is_deleted(elem):
+    return elem is not None and "deleted" in elem.attrib
+
+def _parse_contributor(elem):
+    """
+    Returns a ``(user, userid, userhidden)`` tuple.
+    """
+    if elem is None or _is_deleted(elem):
+        return "", 0, True
+    children = _children(elem)
+    if "ip" in children:
+        return children["ip"].text or "", 0, False
+    user = children["username"].text or ""
+    userid = int(children["id"].text) if "id" in children else 0
+    return user, userid, False
+
+def _parse_revision(elem):
+    children = _children(elem)
+    user, userid, userhidden = _parse_contributor(children.get("contributor"))
+
+    rev = {
+        "revid": int(children["id"].text),
+        "parentid": int(children["parentid"].text) if "parentid" in children else None,
+        "timestamp": parse_date(children["timestamp"].text),
+        "user": user,
+        "userid": userid,
+        "userhidden": userhidden,
+        "comment": "",
+        "commenthidden": False,
+        "minor": "minor" in children,
+        "contentmodel": children["model"].text if "model" in children else None,
+        "contentformat": children["format"].text if "format" in children else None,
+        "text": None,
+        "texthidden": False,
+        "size": None,
+        "sha1": None,
+    }
+
+    comment = children.get("comment")
+    if _is_deleted(comment):
+        rev["commenthidden"] = True
+    elif comment is not None:
+        rev["comment"] = comment.text or ""
+
+    text = children.get("text")
+    if _is_deleted(text):
+        rev["texthidden"] = True
+    elif text is not None:
+        if "bytes" in text.attrib:
+            rev["size"] = int(text.attrib["bytes"])
+        # stub dumps contain only a reference to the text storage
+        if text.text is not None or rev["size"] == 0 or rev["size"] is None:
+            rev["text"] = text.text or ""
+            if rev["size"] is None:
+                rev["size"] = len(rev["text"].encode("utf-8"))
+
+    sha1 = children.get("sha1")
+    if sha1 is not None and sha1.text:
+        # dumps use the base36 encoding like the MediaWiki database, the API
+        # (and thus the SHA1 type) uses hexadecimal strings
+        rev["sha1"] = str(base_enc(int(sha1.text, 36), 16), "ascii").zfill(40)
+
+    return rev
+
+def _parse_logitem(elem):
+    children = _children(elem)
+    user, userid, userhidden = _parse_contributor(children.get("contributor"))
+
+    logitem = {
+        "logid": int(children["id"].text),
+        "timestamp": parse_date(children["timestamp"].text),
+        "user": user,
+        "userid": userid,
+        "userhidden": userhidden,
+        "comment": "",
+        "commenthidden": False,
+        "type": children["type"].text,
+        "action": children["action"].text,
+        "title": None,
+        "actionhidden": False,
+        "params": None,
+    }
+
+    comment = children.get("comment")
+    if _is_deleted(comment):
+        logitem["commenthidden"] = True
+    elif comment is not None:
+        logitem["comment"] = comment.text or ""
+
+    # the title and parameters are omitted when the action is hidden
+    if _is_deleted(children.get("text")) or "logtitle" not in children:
+        logitem["actionhidden"] = True
+    else:
+        logitem["title"] = children["logtitle"].text
+        if "params" in children:
+            logitem["params"] = children["params"].text
+
+    return logitem
+
+def parse_xml_dump(source):
+    """
+    Parse a MediaWiki XML dump.
+
+    The items are yielded as soon as they are parsed:
+
+    - ``("revision", page, rev)`` for each revision, where ``page`` is a dict
+      with the ``pageid``, ``title``, ``ns`` and ``redirect`` keys (the latter
+      is ``None`` if the page is not a redirect) and ``rev`` is a dict with the
+      revision properties,
+    - ``("page", page)`` after all revisions of a page, the dict is completed
+      with the ``lastrevid``, ``touched``, ``length``, ``contentmodel`` and
+      ``new`` keys describing the latest revision found in the dump,
+    - ``("logitem", logitem)`` for each log event.
+
+    :param source: path to the dump (optionally compressed with gzip, bzip2 or
+                   xz) or a file-like object opened in binary mode
+    """
+    f = _open(source)
+    try:
+        context = ET.iterparse(f, events=("start", "end"))
+        root = None
+        page_elem = None
+        path = []
+        page = None
+        latest = None
+
+        for event, elem in context:
+            tag = _localname(elem.tag)
+            if event == "start":
+                if root is None:
+                    root = elem
+                path.append(tag)
+                if path[-2:] == ["mediawiki", "page"]:
+                    page_elem = elem
+                    page = {"pageid": None, "title": None, "ns": None, "redirect": None}
+                    latest = None
+                continue
+
+            path.pop()
+            parent = path[-1] if path else None
+
+            if parent == "page":
+                if tag == "title":
+                    page["title"] = elem.text
+                elif tag == "ns":
+                    page["ns"] = int(elem.text)
+                elif tag == "id":
+                    page["pageid"] = int(elem.text)
+                elif tag == "redirect":
+                    page["redirect"] = elem.get("title", "")
+                elif tag == "revision":
+                    rev = _parse_revision(elem)
+                    if latest is None or rev["revid"] > latest["revid"]:
+                        latest = rev
+                    yield "revision", page, rev
+                    # drop the processed revision to keep the memory bounded
+                    # even for pages with a long history
+                    page_elem.remove(elem)
+            elif parent == "mediawiki":
+                if tag == "page":
+                    if latest is not None:
+                        page["lastrevid"] = latest["revid"]
+                        page["touched"] = latest["timestamp"]
+                        page["length"] = latest["size"] or 0
+                        page["contentmodel"] = latest["contentmodel"]
+                        page["new"] = not latest["parentid"]
+                        yield "page", page
+                    else:
+                        logger.warning("Skipping page '{}' without revisions in the dump.".format(page["title"]))
+                    page = page_elem = None
+                elif tag == "logitem":
+                    yield "logitem", _parse_logitem(elem)
+                # discard all processed top-level elements
+                root.clear()
+    finally:
+        if f is not source:
+            f.close()
+
+class XMLDumpImporter:
+    """
+    Imports a MediaWiki XML dump into the database.
+
+    The pages, revisions (including their text, if present in the dump) and
+    log events are inserted with the same statements as used by the grabbers.
+    The data which is not contained in the dumps but is needed for consistency
+    of the database (namespaces, interwiki map, users, page properties and
+    restrictions, deleted revisions) is fetched from the API.
+
+    :param ws.client.api.API api: interface to the wiki from which the dump was created
+    :param ws.db.database.Database db: the database
+    """
+
+    def __init__(self, api, db):
+        self.api = api
+        self.db = db
+
+        self.pages = GrabberPages(api, db)
+        self.revisions = GrabberRevisions(api, db)
+        self.logging = GrabberLogging(api, db)
+
+        self.sql = {
+            # users are normally inserted by GrabberUsers, this only takes care
+            # of contributors which were not found by list=allusers
+            ("insert", "user"):
+                insert(db.user).on_conflict_do_nothing(),
+        }
+
+    def gen_user(self, user, userid):
+        if userid and userid not in self.userids:
+            self.userids.add(userid)
+            db_entry = {
+                "user_id": userid,
+                "user_name": user,
+                "user_registration": None,
+                "user_editcount": None,
+            }
+            yield self.sql["insert", "user"], db_entry
+
+    def gen_revision(self, page, rev):
+        yield from self.gen_user(rev["user"], rev["userid"])
+
+        rev_deleted = 0
+        if rev["texthidden"]:
+            rev_deleted |= mwconst.DELETED_TEXT
+        if rev["commenthidden"]:
+            rev_deleted |= mwconst.DELETED_COMMENT
+        if rev["userhidden"]:
+            rev_deleted |= mwconst.DELETED_USER
+
+        # NOTE: all entries must have the same keys for the executemany strategy
+        db_entry = {
+            "rev_id": rev["revid"],
+            "rev_page": page["pageid"],
+            "rev_text_id": None,
+            "rev_comment": rev["comment"],
+            "rev_user": rev["userid"],
+            "rev_user_text": rev["user"],
+            "rev_timestamp": rev["timestamp"],
+            "rev_minor_edit": rev["minor"],
+            "rev_deleted": rev_deleted,
+            "rev_len": rev["size"],
+            "rev_parent_id": rev["parentid"],
+            "rev_sha1": rev["sha1"],
+            "rev_content_model": rev["contentmodel"],
+            "rev_content_format": rev["contentformat"],
+        }
+
+        if rev["text"] is not None:
+            text_id = next(self.text_id_gen)
+            db_entry["rev_text_id"] = text_id
+            yield self.revisions.sql["insert", "text"], {"old_id": text_id, "old_text": rev["text"]}
+
+        yield self.revisions.sql["insert", "revision"], db_entry
+
+    def gen_page(self, page):
+        title = Title(self.context, page["title"])
+        self.pageids.add(page["pageid"])
+        db_entry = {
+            "page_id": page["pageid"],
+            "page_namespace": page["ns"],
+            "page_title": title.dbtitle(page["ns"]),
+            "page_is_redirect": page["redirect"] is not None,
+            "page_is_new": page["new"],
+            "page_touched": page["touched"],
+            "page_links_updated": None,
+            "page_latest": page["lastrevid"],
+            "page_len": page["length"],
+            "page_content_model": page["contentmodel"],
+            "page_lang": None,
+        }
+        yield self.pages.sql["insert", "page"], db_entry
+
+    def gen_logitem(self, logitem):
+        yield from self.gen_user(logitem["user"], logitem["userid"])
+
+        log_deleted = 0
+        if logitem["actionhidden"]:
+            log_deleted |= mwconst.DELETED_ACTION
+        if logitem["commenthidden"]:
+            log_deleted |= mwconst.DELETED_COMMENT
+        if logitem["userhidden"]:
+            log_deleted |= mwconst.DELETED_USER
+
+        if logitem["title"] is None:
+            log_namespace = 0
+            log_title = ""
+        else:
+            # same formatting as in GrabberLogging
+            title = Title(self.context, logitem["title"])
+            log_namespace = title.namespacenumber
+            log_title = title.format(iwprefix=True, namespace=False, sectionname=True)
+            log_title = log_title[:1].upper() + log_title[1:]
+
+        params = {}
+        if logitem["params"]:
+            params["dump"] = logitem["params"]
+
+        db_entry = {
+            "log_id": logitem["logid"],
+            "log_type": logitem["type"],
+            "log_action": logitem["action"],
+            "log_timestamp": logitem["timestamp"],
+            "log_user": logitem["userid"] or None,
+            "log_user_text": logitem["user"],
+            "log_namespace": log_namespace,
+            "log_title": log_title,
+            "log_page": None,
+            "log_comment": logitem["comment"],
+            "log_params": params,
+            "log_deleted": log_deleted,
+        }
+        yield self.logging.sql["insert", "logging"], db_entry
+
+    def gen_page_properties(self):
+        """
+        Fetch the page properties and restrictions of the imported pages from
+        the API.
+        """
+        params = {
+            "generator": "allpages",
+            "gaplimit": "max",
+            "prop": "info|pageprops",
+            "inprop": "protection",
+        }
+        stmt_page = self.pages.sql["insert", "page"]
+        for ns in self.api.site.namespaces.keys():
+            if ns < 0:
+                continue
+            params["gapnamespace"] = ns
+            for page in self.api.generator(params):
+                if page.get("pageid") not in self.pageids:
+                    # created after the dump, GrabberPages will take care of it
+                    continue
+                for stmt, entry in self.pages.gen_inserts_from_page(page):
+                    # the page row itself must match the imported revisions
+                    if stmt is not stmt_page:
+                        yield stmt, entry
+
+    def gen_deleted_revisions(self, conn):
+        """
+        Fetch the deleted revisions from the API, skipping the revisions which
+        were still visible when the dump was created (they are moved to the
+        archive table by GrabberPages.)
+        """
+        for page in self.api.list(self.revisions.adr_params):
+            revids = [rev["revid"] for rev in page["revisions"]]
+            existing = conn.execute(sa.select([self.db.revision.c.rev_id])
+                                      .where(self.db.revision.c.rev_id.in_(revids)))
+            existing = set(row[0] for row in existing)
+            if existing:
+                page["revisions"] = [rev for rev in page["revisions"] if rev["revid"] not in existing]
+            if page["revisions"]:
+                yield from self.revisions.gen_deletedrevisions(page)
+
+    def import_dump(self, source, *, timestamp=None):
+        """
+        Import the dump and set the synchronization timestamps of the
+        ``GrabberPages``, ``GrabberRevisions`` and ``GrabberLogging``
+        grabbers (the last one only if the dump contains log events).
+
+        :param source: path to the dump or a file-like object, see :py:func:`parse_xml_dump`
+        :param datetime.datetime timestamp:
+            the timestamp from which the grabbers should continue. By default,
+            the most recent timestamp found in the dump is used. If the dump
+            was created on a live wiki, the time when the dump was started
+            should be given instead.
+        :returns: the used sync timestamp
+        """
+        # the tables which are not covered by the dump
+        for klass in [GrabberNamespaces, GrabberTags, GrabberInterwiki, GrabberUsers]:
+            klass(self.api, self.db).update()
+
+        self.context = self.db.title_context()
+        self.userids = set()
+        self.pageids = set()
+        self.text_id_gen = self.revisions._get_text_id_gen()
+
+        counts = {"page": 0, "revision": 0, "logitem": 0}
+        last_timestamp = None
+
+        with self.db.engine.begin() as conn:
+            with DeferrableExecutionQueue(conn, self.db.chunk_size) as dfe:
+                for item in parse_xml_dump(source):
+                    kind = item[0]
+                    counts[kind] += 1
+                    if kind == "revision":
+                        gen = self.gen_revision(*item[1:])
+                        ts = item[2]["timestamp"]
+                    elif kind == "page":
+                        gen = self.gen_page(item[1])
+                        ts = None
+                    else:
+                        gen = self.gen_logitem(item[1])
+                        ts = item[1]["timestamp"]
+                    if ts is not None and (last_timestamp is None or ts > last_timestamp):
+                        last_timestamp = ts
+                    for stmt, entry in gen:
+                        dfe.execute(stmt, entry)
+
+                logger.info("Imported {page} pages, {revision} revisions and {logitem} log events from the dump.".format(**counts))
+
+                for stmt, entry in self.gen_page_properties():
+                    dfe.execute(stmt, entry)
+
+                # the dumped revisions must be visible for the check
+                dfe.execute_deferred()
+                self.revisions.text_id_gen = self.text_id_gen
+                for stmt, entry in self.gen_deleted_revisions(conn):
+                    dfe.execute(stmt, entry)
+
+                for stmt in user_activity.gen_rebuild(self.db):
+                    dfe.execute(stmt)
+
+            if timestamp is None:
+                timestamp = last_timestamp
+            if timestamp is None:
+                raise ValueError("The dump does not contain any revisions or log events.")
+
+            grabbers = [self.pages, self.revisions]
+            if counts["logitem"]:
+                grabbers.append(self.logging)
+            for g in grabbers:
+                g._set_sync_timestamp(timestamp, conn)
+
+        return timestamp
+
+class _DumpWriter:
+    """
+    Incremental writer of indented XML elements.
+    """
+    def __init__(self, f):
+        self.gen = XMLGenerator(f, encoding="utf-8", short_empty_elements=True)
+        self.depth = 0
+
+    def start(self, name, attrs=None):
+        self.gen.ignorableWhitespace("  " * self.depth)
+        self.gen.startElement(name, attrs or {})
+        self.gen.ignorableWhitespace("\n")
+        self.depth += 1
+
+    def end(self, name):
+        self.depth -= 1
+        self.gen.ignorableWhitespace("  " * self.depth)
+        self.gen.endElement(name)
+        self.gen.ignorableWhitespace("\n")
+
+    def element(self, name, text=None, attrs=None):
+        self.gen.ignorableWhitespace("  " * self.depth)
+        self.gen.startElement(name, attrs or {})
+        if text:
+            self.gen.characters(text)
+        self.gen.endElement(name)
+        self.gen.ignorableWhitespace("\n")
+
+class XMLDumpExporter:
+    """
+    Exports the contents of the database into a MediaWiki XML dump.
+
+    Notes:
+
+    - The revisions without synchronized text (see
+      :py:meth:`ws.db.database.Database.sync_revisions_content`) are written
+      like in stub dumps, i.e. with an empty ``<text>`` element.
+    - The log parameters are written only for the log events imported from
+      dumps, the API format of the parameters is not understood by MediaWiki.
+    - Deleted revisions (the ``archive`` table) are not exported, like in the
+      dumps created by MediaWiki.
+
+    :param ws.db.database.Database db: the database
+    """
+
+    version = "0.10"
+    xmlns = "http://www.mediawiki.org/xml/export-0.10/"
+
+    def __init__(self, db):
+        self.db = db
+
+    def _title(self, ns, title):
+        if ns == 0:
+            return title
+        return "{}:{}".format(self.namespaces[ns]["*"], title)
+
+    def _write_siteinfo(self, w):
+        w.start("siteinfo")
+        if 4 in self.namespaces:
+            w.element("sitename", self.namespaces[4]["*"])
+        w.element("generator", "wiki-scripts")
+        w.element("case", self.namespaces[0]["case"])
+        w.start("namespaces")
+        for ns in sorted(self.namespaces):
+            attrs = {"key": str(ns), "case": self.namespaces[ns]["case"]}
+            w.element("namespace", self.namespaces[ns]["*"], attrs)
+        w.end("namespaces")
+        w.end("siteinfo")
+
+    def _write_contributor(self, w, user, user_text, hidden):
+        if hidden:
+            w.element("contributor", attrs={"deleted": "deleted"})
+            return
+        w.start("contributor")
+        if user:
+            w.element("username", user_text)
+            w.element("id", str(user))
+        else:
+            w.element("ip", user_text)
+        w.end("contributor")
+
+    def _write_revision(self, w, row):
+        w.start("revision")
+        w.element("id", str(row.rev_id))
+        if row.rev_parent_id:
+            w.element("parentid", str(row.rev_parent_id))
+        w.element("timestamp", format_date(row.rev_timestamp))
+        self._write_contributor(w, row.rev_user, row.rev_user_text, row.rev_deleted & mwconst.DELETED_USER)
+        if row.rev_minor_edit:
+            w.element("minor")
+        if row.rev_deleted & mwconst.DELETED_COMMENT:
+            w.element("comment", attrs={"deleted": "deleted"})
+        elif row.rev_comment:
+            w.element("comment", row.rev_comment)
+        if row.rev_content_model:
+            w.element("model", row.rev_content_model)
+        if row.rev_content_format:
+            w.element("format", row.rev_content_format)
+        if row.rev_deleted & mwconst.DELETED_TEXT:
+            w.element("text", attrs={"deleted": "deleted"})
+        else:
+            attrs = {"xml:space": "preserve"}
+            if row.rev_len is not None:
+                attrs["bytes"] = str(row.rev_len)
+            w.element("text", row.old_text, attrs)
+        if row.rev_sha1:
+            # the dumps use base36 like the MediaWiki database
+            w.element("sha1", str(base_enc(int(row.rev_sha1, 16), 36), "ascii").zfill(31))
+        else:
+            w.element("sha1")
+        w.end("revision")
+
+    def _write_pages(self, conn, w, history, namespaces):
+        page = self.db.page
+        rev = self.db.revision
+        text = self.db.text
+        rd = self.db.redirect
+
+        s = sa.select([page.c.page_id, page.c.page_namespace, page.c.page_title,
+                       rd.c.rd_namespace, rd.c.rd_title, rd.c.rd_interwiki,
+                       rev.c.rev_id, rev.c.rev_parent_id, rev.c.rev_timestamp,
+                       rev.c.rev_user, rev.c.rev_user_text, rev.c.rev_minor_edit,
+                       rev.c.rev_comment, rev.c.rev_deleted, rev.c.rev_len,
+                       rev.c.rev_sha1, rev.c.rev_content_model, rev.c.rev_content_format,
+                       text.c.old_text]) \
+            .select_from(page.join(rev, rev.c.rev_page == page.c.page_id)
+                             .outerjoin(text, rev.c.rev_text_id == text.c.old_id)
+                             .outerjoin(rd, rd.c.rd_from == page.c.page_id))
+        if history == "current":
+            s = s.where(rev.c.rev_id == page.c.page_latest)
+        if namespaces is not None:
+            s = s.where(page.c.page_namespace.in_(namespaces))
+        s = s.order_by(page.c.page_id, rev.c.rev_id)
+
+        pages = revisions = 0
+        current_page = None
+        for row in conn.execute(s):
+            if row.page_id != current_page:
+                if current_page is not None:
+                    w.end("page")
+                current_page = row.page_id
+                pages += 1
+                w.start("page")
+                w.element("title", self._title(row.page_namespace, row.page_title))
+                w.element("ns", str(row.page_namespace))
+                w.element("id", str(row.page_id))
+                if row.rd_title is not None:
+                    if row.rd_interwiki:
+                        target = "{}:{}".format(row.rd_interwiki, row.rd_title)
+                    else:
+                        target = self._title(row.rd_namespace, row.rd_title)
+                    w.element("redirect", attrs={"title": target})
+            self._write_revision(w, row)
+            revisions += 1
+        if current_page is not None:
+            w.end("page")
+        return pages, revisions
+
+    def _write_logitems(self, conn, w, namespaces):
+        log = self.db.logging
+        s = log.select()
+        if namespaces is not None:
+            s = s.where(log.c.log_namespace.in_(namespaces))
+        s = s.order_by(log.c.log_id)
+
+        count = 0
+        for row in conn.execute(s):
+            count += 1
+            w.start("logitem")
+            w.element("id", str(row.log_id))
+            w.element("timestamp", format_date(row.log_timestamp))
+            self._write_contributor(w, row.log_user, row.log_user_text, row.log_deleted & mwconst.DELETED_USER)
+            if row.log_deleted & mwconst.DELETED_COMMENT:
+                w.element("comment", attrs={"deleted": "deleted"})
+            elif row.log_comment:
+                w.element("comment", row.log_comment)
+            w.element("type", row.log_type)
+            w.element("action", row.log_action)
+            if row.log_deleted & mwconst.DELETED_ACTION:
+                w.element("text", attrs={"deleted": "deleted"})
+            else:
+                w.element("logtitle", self._title(row.log_namespace, row.log_title))
+                if "dump" in row.log_params:
+                    w.element("params", row.log_params["dump"], {"xml:space": "preserve"})
+            w.end("logitem")
+        return count
+
+    def export_dump(self, dest, *, history="current", namespaces=None, logs=False):
+        """
+        Write the dump.
+
+        :param dest:
+            path to the output file or a file-like object opened in binary
+            mode. If the path ends with ``.gz``, ``.bz2`` or ``.xz``, the
+            output is compressed on the fly.
+        :param str history:
+            ``"current"`` to export only the latest revision of each page,
+            ``"full"`` to export all revisions
+        :param namespaces:
+            an iterable of namespace numbers to export, ``None`` means all
+            namespaces
+        :param bool logs: whether to export the log events
+        """
+        if history not in {"current", "full"}:
+            raise ValueError("invalid history mode: {}".format(history))
+        if namespaces is not None:
+            namespaces = list(namespaces)
+
+        self.namespaces = selects.get_namespaces(self.db)
+
+        f = _open(dest, "wb")
+        try:
+            w = _DumpWriter(f)
+            w.gen.startDocument()
+            w.start("mediawiki", {
+                "xmlns": self.xmlns,
+                "version": self.version,
+                "xml:lang": "en",
+            })
+            self._write_siteinfo(w)
+
+            # stream_results enables server-side cursors in psycopg2
+            with self.db.engine.connect().execution_options(stream_results=True) as conn:
+                pages, revisions = self._write_pages(conn, w, history, namespaces)
+                logger.info("Exported {} pages with {} revisions.".format(pages, revisions))
+                if logs is True:
+                    count = self._write_logitems(conn, w, namespaces)
+                    logger.info("Exported {} log events.".format(count))
+
+            w.end("mediawiki")
+            w.gen.endDocument()
+        finally:
+            if f is not dest:
+                f.close()
@@ -1,8 +1,9 @@
 #! /usr/bin/env python3
 
-import copy
 import logging
 
+import sqlalchemy as sa
+
 import ws.ArchWiki.lang as lang
 
 
@@ -45,8 +46,7 @@ class MyIterator(object):
     def __next__(self):
         if self._exhausted:
             return
-        # FIXME: workaround for strange behaviour of lists inside tuples -> investigate
-        next_item = copy.deepcopy(self._next_item)
+        next_item = self._next_item
         self._cache_next_item()
         return next_item
 
@@ -55,13 +55,25 @@ class MyIterator(object):
 
 
 class CategoryGraph:
+    """
+    Graph of the categories on the wiki.
+
+    :param api: an instance of :py:class:`ws.client.api.API`
+    :param db:
+        an optional instance of :py:class:`ws.db.database.Database`. If
+        given, the graph is built from the ``categorylinks`` and ``page``
+        tables of the local database (which is synchronized first) instead of
+        crawling all categories through the API.
+    """
 
-    def __init__(self, api):
+    def __init__(self, api, db=None):
         self.api = api
+        self.db = db
 
         # `parents` maps category names to the list of their parents
         self.parents = {}
-        # `subcats` maps category names to the list of their subcategories
+        # `subcats` maps category names to the list of their subcategories,
+        # sorted case-insensitively
         self.subcats = {}
         # a mapping of category names to the corresponding "categoryinfo" dictionary
         self.info = {}
@@ -73,6 +85,15 @@ class CategoryGraph:
         self.subcats.clear()
         self.info.clear()
 
+        if self.db is not None:
+            self._update_from_db()
+        else:
+            self._update_from_api()
+
+        for subcats in self.subcats.values():
+            subcats.sort(key=str.lower)
+
+    def _update_from_api(self):
         for page in self.api.generator(generator="allpages", gaplimit="max", gapnamespace=14, prop="categories|categoryinfo", cllimit="max", clshow="!hidden", clprop="hidden"):
             if "categories" in page:
                 self.parents.setdefault(page["title"], []).extend([cat["title"] for cat in page["categories"]])
@@ -83,21 +104,105 @@ class CategoryGraph:
             if "categoryinfo" in page:
                 i.update(page["categoryinfo"])
 
+    def _update_from_db(self):
+        logger.info("Synchronizing the local database...")
+        self.db.sync_with_api(self.api)
+        self.db.sync_revisions_content(self.api, mode="latest")
+        self.db.update_parser_cache()
+
+        page = self.db.page
+        cl = self.db.categorylinks
+        pp = self.db.page_props
+        nss = self.db.namespace_starname
+
+        # names of the hidden categories
+        hidden_page = page.alias("hidden_page")
+        hidden = sa.select([hidden_page.c.page_title]) \
+                   .select_from(hidden_page.join(pp, hidden_page.c.page_id == pp.c.pp_page)) \
+                   .where(sa.and_(hidden_page.c.page_namespace == 14, pp.c.pp_propname == "hiddencat"))
+        # non-hidden parent categories of all pages
+        parents = sa.select([cl.c.cl_from, cl.c.cl_to]) \
+                    .where(cl.c.cl_to.notin_(hidden)) \
+                    .alias("parents")
+        # numbers of category members by type (the same as the "categoryinfo" prop of the API)
+        def count_type(cl_type):
+            return sa.func.count(sa.case([(cl.c.cl_type == cl_type, 1)]))
+        counts = sa.select([cl.c.cl_to,
+                            count_type("page").label("pages"),
+                            count_type("subcat").label("subcats"),
+                            count_type("file").label("files"),
+                            sa.func.count().label("size")]) \
+                   .group_by(cl.c.cl_to) \
+                   .alias("counts")
+
+        tail = page.join(nss, page.c.page_namespace == nss.c.nss_id)
+        tail = tail.outerjoin(parents, parents.c.cl_from == page.c.page_id)
+        tail = tail.outerjoin(counts, counts.c.cl_to == page.c.page_title)
+        s = sa.select([nss.c.nss_name, page.c.page_title, parents.c.cl_to,
+                       counts.c.pages, counts.c.subcats, counts.c.files, counts.c.size]) \
+              .select_from(tail) \
+              .where(page.c.page_namespace == 14)
+
+        logger.info("Fetching the category graph from the local database...")
+        with self.db.engine.connect() as conn:
+            for row in conn.execute(s):
+                title = "{}:{}".format(row.nss_name, row.page_title)
+                if row.cl_to is not None:
+                    parent = "{}:{}".format(row.nss_name, row.cl_to)
+                    self.parents.setdefault(title, []).append(parent)
+                    self.subcats.setdefault(parent, []).append(title)
+                if title not in self.info:
+                    # empty categories don't have any counts
+                    self.info[title] = {
+                        "files": row.files or 0,
+                        "pages": row.pages or 0,
+                        "subcats": row.subcats or 0,
+                        "size": row.size or 0,
+                    }
+
     @staticmethod
     def walk(graph, node, levels=None, visited=None):
+        """
+        Walk the graph depth-first from ``node``, visiting the children in the
+        case-insensitive order.
+
+        Yields ``(child, parent, levels)`` tuples, where ``levels`` is the list
+        of indexes of the nodes on the path from ``node`` to ``child``. Nodes
+        already present on the current path are skipped to avoid cycles, but a
+        node reachable by multiple paths is visited once for each path.
+
+        The traversal is iterative, so it does not hit the recursion limit on
+        deep graphs. Note that the same ``levels`` list is updated between the
+        yielded items.
+        """
         if levels is None:
             levels = []
         if visited is None:
             visited = set()
-        children = graph.get(node, [])
-        for i, child in enumerate(sorted(children, key=str.lower)):
-            if child not in visited:
-                levels.append(i)
-                visited.add(child)
-                yield child, node, levels
-                yield from CategoryGraph.walk(graph, child, levels, visited)
-                visited.remove(child)
-                levels.pop(-1)
+        # the lists in CategoryGraph.subcats are already sorted, but the graph
+        # may come from elsewhere, so each node is sorted once per walk
+        sorted_children = {}
+        def children(node):
+            if node not in sorted_children:
+                sorted_children[node] = sorted(graph.get(node, []), key=str.lower)
+            return enumerate(sorted_children[node])
+
+        stack = [(node, children(node))]
+        while stack:
+            parent, siblings = stack[-1]
+            for i, child in siblings:
+                if child not in visited:
+                    levels.append(i)
+                    visited.add(child)
+                    yield child, parent, levels
+                    stack.append((child, children(child)))
+                    break
+            else:
+                stack.pop()
+                # the initial node is not on the path
+                if stack:
+                    visited.remove(parent)
+                    levels.pop(-1)
 
     @staticmethod
     def compare_components(graph, left, right):
@@ -108,11 +213,26 @@ class CategoryGraph:
                 return 1
             elif right is None:
                 return -1
-            return cmp( (-len(left[2]), lang.detect_language(left[0])[0]),
-                        (-len(right[2]), lang.detect_language(right[0])[0]) )
-
-        lgen = MyIterator(CategoryGraph.walk(graph, left))
-        rgen = MyIterator(CategoryGraph.walk(graph, right))
+            return cmp( (-len(left[2]), language_key(left[0])),
+                        (-len(right[2]), language_key(right[0])) )
+
+        # the language-independent titles are computed once per category
+        language_keys = {}
+        def language_key(title):
+            try:
+                return language_keys[title]
+            except KeyError:
+                key = language_keys[title] = lang.detect_language(title)[0]
+                return key
+
+        # the walk updates the levels list in place, but the items are compared
+        # one step behind the generator, so each item needs its own copy
+        def copying_walk(node):
+            for child, parent, levels in CategoryGraph.walk(graph, node):
+                yield child, parent, list(levels)
+
+        lgen = MyIterator(copying_walk(left))
+        rgen = MyIterator(copying_walk(right))
 
         try:
             lval = next(lgen)
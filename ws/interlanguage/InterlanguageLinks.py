@@ -6,10 +6,12 @@
 import itertools
 import re
 import logging
+import concurrent.futures
+import multiprocessing
 
 import mwparserfromhell
 
-from ws.client import APIError
+from ws.client.edit_queue import EditQueue
 from ws.interactive import *
 import ws.ArchWiki.lang as lang
 import ws.ArchWiki.header as header
@@ -57,33 +59,65 @@ class InterlanguageLinks:
            - Fetch content of the page.
            - Update the langlinks of the page.
            - If there is a difference, save the page.
+
+    If the ``db`` parameter (an instance of :py:class:`ws.db.database.Database`)
+    is given, the list of pages with their langlinks in step 1. is read from the
+    local database after synchronizing it with the wiki, which is much faster
+    than fetching it from the API.
+
+    The ``jobs`` parameter sets the number of worker processes for updating
+    the wikicode of the pages and ``fetch_workers`` sets the number of
+    concurrent queries for the content of the pages to be updated. All
+    queries share the rate limit of the ``api`` object.
     """
 
     content_namespaces = [0, 4, 10, 12, 14]
     edit_summary = "update interlanguage links"
 
-    def __init__(self, api):
+    def __init__(self, api, db=None, *, jobs=1, fetch_workers=1):
+        if jobs < 1:
+            raise ValueError("The number of jobs must be positive.")
+        if fetch_workers < 1:
+            raise ValueError("The number of fetch workers must be positive.")
         self.api = api
+        self.db = db
+        self.jobs = jobs
+        self.fetch_workers = fetch_workers
 
+        self.allpages_titles = None
         self.families = None
         self.family_index = None
 
     def _get_allpages(self):
-        logger.info("Fetching langlinks property of all pages...")
-        allpages = []
-        # not necessary to wrap in each iteration since lists are mutable
-        wrapped_titles = ws.utils.ListOfDictsAttrWrapper(allpages, "title")
+        if self.db is not None:
+            return self._get_allpages_db()
 
+        logger.info("Fetching langlinks property of all pages...")
+        allpages = {}
         for ns in self.content_namespaces:
             g = self.api.generator(generator="allpages", gapfilterredir="nonredirects", gapnamespace=ns, gaplimit="max", prop="langlinks", lllimit="max")
             for page in g:
                 # the same page may be yielded multiple times with different pieces
                 # of the information, hence the ws.utils.dmerge
-                try:
-                    db_page = ws.utils.bisect_find(allpages, page["title"], index_list=wrapped_titles)
+                db_page = allpages.get(page["pageid"])
+                if db_page is None:
+                    allpages[page["pageid"]] = page
+                else:
                     ws.utils.dmerge(page, db_page)
-                except IndexError:
-                    ws.utils.bisect_insert_or_replace(allpages, page["title"], data_element=page, index_list=wrapped_titles)
+
+        # sort by title
+        return sorted(allpages.values(), key=lambda page: page["title"])
+
+    def _get_allpages_db(self):
+        logger.info("Synchronizing the local database...")
+        self.db.sync_with_api(self.api)
+        self.db.sync_revisions_content(self.api, mode="latest")
+        self.db.update_parser_cache()
+
+        logger.info("Fetching langlinks property of all pages from the local database...")
+        allpages = []
+        for ns in self.content_namespaces:
+            allpages.extend(self.db.query(generator="allpages", gapfilterredir="nonredirects", gapnamespace=ns, gaplimit="max", prop="langlinks"))
 
         # sort by title
         allpages.sort(key=lambda page: page["title"])
@@ -132,6 +166,7 @@ class InterlanguageLinks:
     @ws.utils.LazyProperty
     def allpages(self):
         allpages = self._get_allpages()
+        self.allpages_titles = set(page["title"] for page in allpages)
         self.families = self._group_into_families(allpages)
 
         # create inverse mapping for fast searching
@@ -339,42 +374,169 @@ class InterlanguageLinks:
     def update_allpages(self):
         # always start from scratch
         del self.allpages
+        self._update_pages(self.allpages)
 
-        def _updates_gen(pages_gen):
-            for page in pages_gen:
-                title = page["title"]
-                # unsupported languages need to be skipped now
-                if not self._is_valid_interlanguage(title):
-                    logger.warning("Skipping page '{}' (unsupported language)".format(title))
-                    continue
-                langlinks = self.get_langlinks(title)
-                if self._needs_update(page, langlinks):
-                    yield page, langlinks
+    def get_changed_titles(self, since):
+        """
+        Get the titles of pages which were created, edited, moved, deleted or
+        restored since the given timestamp, based on the recent changes.
+
+        :param datetime.datetime since: the timestamp of the oldest change
+        :returns: a ``(titles, timestamp)`` tuple, where ``titles`` is a set
+                  of titles and ``timestamp`` is the timestamp of the newest
+                  change (or ``since`` if there are no changes)
+        """
+        if self.db is not None:
+            changes = self.db.query(list="recentchanges", rcstart=since, rcdir="newer", rclimit="max",
+                                    rctype={"edit", "new", "log"}, rcprop={"title", "timestamp", "loginfo"})
+        else:
+            changes = self.api.list(list="recentchanges", rcstart=since, rcdir="newer", rclimit="max",
+                                    rctype="edit|new|log", rcprop="title|timestamp|loginfo")
+
+        titles = set()
+        timestamp = since
+        for change in changes:
+            timestamp = max(timestamp, change["timestamp"])
+            if change["type"] == "log" and change.get("logtype") not in {"move", "delete"}:
+                continue
+            if "title" in change:
+                titles.add(change["title"])
+            # both the source and the target of a move are affected
+            target = change.get("logparams", {}).get("target_title")
+            if target is not None:
+                titles.add(target)
+        return titles, timestamp
+
+    def _get_affected_pages(self, titles):
+        """
+        Returns the pages whose langlinks may be affected by changes of the
+        given pages: the pages in the same families and the pages in the
+        families which link to them.
+        """
+        def _key(title):
+            return lang.detect_language(title)[0].lower()
 
-        for chunk in ws.utils.iter_chunks(_updates_gen(self.allpages), self.api.max_ids_per_query):
-            pages_props, pages_langlinks = zip(*list(chunk))
-            pageids = "|".join(str(page["pageid"]) for page in pages_props)
+        changed_keys = set(_key(title) for title in titles)
+        affected_keys = set(changed_keys)
+        for page in self.allpages:
+            for langlink in page.get("langlinks", ()):
+                if _key(self._title_from_langlink(langlink)) in changed_keys:
+                    affected_keys.add(_key(page["title"]))
+                    break
+
+        return [page for page in self.allpages if _key(page["title"]) in affected_keys]
+
+    def update_changed_pages(self, since):
+        """
+        Incremental variant of :py:meth:`update_allpages`, which updates only
+        the pages in the families affected by the changes since the given
+        timestamp. The full update should still be run from time to time to
+        fix the inconsistencies not captured by the recent changes.
+
+        Note that without the local database, the langlinks of all pages are
+        still fetched from the API to find the affected families, which takes
+        about as long as in the full update. Only the content of the pages to
+        be updated is fetched in both cases.
+
+        :param datetime.datetime since: the timestamp of the last update
+        :returns: the timestamp to be passed as ``since`` to the next update
+        """
+        if self.db is None and since < self.api.oldest_rc_timestamp:
+            logger.warning("The recent changes since {} are not available, running the full update.".format(since))
+            timestamp = self.api.newest_rc_timestamp
+            self.update_allpages()
+            return timestamp
+
+        del self.allpages
+        if self.db is not None:
+            from ws.db.selects import oldest_rc_timestamp, newest_rc_timestamp
+
+            # the database must be synchronized before reading the recent changes
+            self.allpages
+            # old changes are deleted from the local recentchanges table too
+            oldest = oldest_rc_timestamp(self.db)
+            if oldest is None or since < oldest:
+                logger.warning("The recent changes since {} are not available in the local database, running the full update.".format(since))
+                timestamp = newest_rc_timestamp(self.db) or since
+                self._update_pages(self.allpages)
+                return timestamp
+
+        titles, timestamp = self.get_changed_titles(since)
+        if not titles:
+            logger.info("No pages have changed since {}.".format(since))
+            return timestamp
+
+        pages = self._get_affected_pages(titles)
+        logger.info("Checking {} pages in the families affected by {} changed pages...".format(len(pages), len(titles)))
+        self._update_pages(pages)
+        return timestamp
+
+    def _update_pages(self, pages):
+        # plan the updates first, the langlinks are computed from the data in memory
+        updates = []
+        for page in pages:
+            title = page["title"]
+            # unsupported languages need to be skipped now
+            if not self._is_valid_interlanguage(title):
+                logger.warning("Skipping page '{}' (unsupported language)".format(title))
+                continue
+            langlinks = self.get_langlinks(title)
+            if self._needs_update(page, langlinks):
+                updates.append((page, langlinks))
+        logger.info("Langlinks of {} pages need to be updated.".format(len(updates)))
+        if not updates:
+            return
+
+        def fetch(chunk):
+            pageids = "|".join(str(page["pageid"]) for page, _ in chunk)
             result = self.api.call_api(action="query", pageids=pageids, prop="revisions", rvprop="content|timestamp", rvslots="main")
-            pages = result["pages"]
-
-            for page, langlinks in zip(pages_props, pages_langlinks):
-                # substitute the dictionary with langlinks with the dictionary with content
-                page = pages[str(page["pageid"])]
-
-                timestamp = page["revisions"][0]["timestamp"]
-                text_old = page["revisions"][0]["slots"]["main"]["*"]
-                try:
-                    text_new = self.update_page(page["title"], text_old, langlinks, weak_update=False)
-                except header.HeaderError:
-                    logger.error("Error: failed to extract header elements. Please investigate.")
-                    continue
-
-                if text_old != text_new:
-                    try:
-#                        edit_interactive(self.api, page["title"], page["pageid"], text_old, text_new, timestamp, self.edit_summary, bot="")
-                        self.api.edit(page["title"], page["pageid"], text_new, timestamp, self.edit_summary, bot="")
-                    except APIError:
-                        pass
+            return result["pages"]
+
+        chunks = list(ws.utils.list_chunks(updates, self.api.max_ids_per_query))
+
+        # the worker processes must be forked before starting any threads
+        pool = None
+        if self.jobs > 1:
+            pool = multiprocessing.get_context("fork").Pool(self.jobs)
+        try:
+            # the edits are applied in the background while the next chunks are being processed
+            with EditQueue(self.api) as queue, \
+                    concurrent.futures.ThreadPoolExecutor(max_workers=self.fetch_workers) as fetcher:
+                # fetch the content of several chunks concurrently
+                for window in ws.utils.list_chunks(chunks, self.fetch_workers):
+                    for chunk, contents in zip(window, fetcher.map(fetch, window)):
+                        self._update_chunk(chunk, contents, queue, pool)
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+
+    def _update_chunk(self, chunk, contents, queue, pool=None):
+        items = []
+        for page, langlinks in chunk:
+            content = contents.get(str(page["pageid"]))
+            if content is None or "missing" in content:
+                logger.warning("Skipping page '{}' (deleted since the langlinks were fetched)".format(page["title"]))
+                continue
+            # substitute the dictionary with langlinks with the dictionary with content
+            page = content
+            timestamp = page["revisions"][0]["timestamp"]
+            text_old = page["revisions"][0]["slots"]["main"]["*"]
+            items.append((page, langlinks, timestamp, text_old))
+
+        # the wikicode rewrites are done in the worker processes if available
+        args = [(page["title"], text_old, langlinks) for page, langlinks, _, text_old in items]
+        if pool is None:
+            texts_new = map(_update_page_text, args)
+        else:
+            texts_new = pool.map(_update_page_text, args)
+
+        for (page, langlinks, timestamp, text_old), text_new in zip(items, texts_new):
+            if text_new is not None and text_old != text_new:
+                def rebase(title, text, langlinks=langlinks):
+                    return self.update_page(title, text, langlinks, weak_update=False)
+#                edit_interactive(self.api, page["title"], page["pageid"], text_old, text_new, timestamp, self.edit_summary, bot="")
+                queue.edit(page["title"], page["pageid"], text_new, timestamp, self.edit_summary, rebase=rebase, bot="")
 
     def find_orphans(self):
         """
@@ -393,7 +555,7 @@ class InterlanguageLinks:
 
     def _page_exists(self, title):
         # self.allpages does not include redirects, but that's fine...
-        return canonicalize(title) in set(page["title"] for page in self.allpages)
+        return canonicalize(title) in self.allpages_titles
 
     def rename_non_english(self):
         del self.allpages
@@ -419,3 +581,16 @@ class InterlanguageLinks:
                             if ans is True:
                                 summary = "comply with [[Help:I18n#Page titles]] and match the title of the English page"
                                 self.api.move(source, target, summary)
+
+def _update_page_text(args):
+    """
+    Wrapper around :py:meth:`InterlanguageLinks.update_page` for the worker
+    processes. Returns the new text or ``None`` if the page could not be
+    updated.
+    """
+    title, text, langlinks = args
+    try:
+        return str(InterlanguageLinks.update_page(title, text, langlinks, weak_update=False))
+    except header.HeaderError:
+        logger.error("Error: failed to extract header elements. Please investigate.")
+        return None
@@ -1,12 +1,15 @@
 #! /usr/bin/env python3
 
+import collections
 import datetime
 import itertools
 
+import sqlalchemy as sa
+
 __all__ = ["UserStatsModules"]
 
 class UserStatsModules:
-    def __init__(self, db, *, round_to_midnight=False, active_days=30):
+    def __init__(self, db, *, round_to_midnight=False, active_days=30, backend="sql"):
         """
         :param db:
             an instance of :py:class:`ws.db.Database`
@@ -15,10 +18,21 @@ class UserStatsModules:
         :param active_days:
             the time span in days to consider users as active (used by the
             `recent_edit_count` method)
+        :param backend:
+            ``"sql"`` to compute the statistics with aggregate queries in the
+            database, ``"rollup"`` to compute them from the daily rollup in
+            the ``ws_user_activity`` table (see :py:mod:`ws.db.user_activity`),
+            or ``"python"`` to load all revisions and compute the statistics in
+            Python (slow, kept as a fallback). The ``"rollup"`` backend is the
+            fastest, but the time of the edits is not known, so the lengths of
+            the streaks are counted in calendar days and the current streaks
+            include the edits from the previous UTC day even when
+            ``round_to_midnight`` is ``False``.
         """
         self.db = db
         self.round_to_midnight = round_to_midnight
         self.active_days = active_days
+        self.backend = backend
 
         # current UTC date
         self.today = datetime.datetime.utcnow()
@@ -26,6 +40,22 @@ class UserStatsModules:
             # round to midnight, keep the datetime.datetime type
             self.today = datetime.datetime(*(self.today.timetuple()[:3]))
 
+        # mapping of user names to (edit count, first timestamp, last timestamp) tuples
+        self._totals = {}
+        # mapping of user names to the number of recent edits
+        self._recent_edit_counts = {}
+
+        if backend == "sql":
+            self._init_sql()
+        elif backend == "rollup":
+            self._init_rollup()
+        elif backend == "python":
+            self._init_python()
+        else:
+            raise ValueError("Invalid backend: {}".format(backend))
+
+    def _init_python(self):
+        db = self.db
         revisions = list(db.query(list="allrevisions", arvlimit="max", arvdir="newer", arvend=self.today, arvprop={"ids", "timestamp", "user", "userid"}))
         revisions += list(db.query(list="alldeletedrevisions", adrlimit="max", adrdir="newer", adrend=self.today, adrprop={"ids", "timestamp", "user", "userid"}))
 
@@ -33,7 +63,8 @@ class UserStatsModules:
         # (does not include all revisions - "diffable" log events such as
         # page protection changes or page moves are omitted)
         firstday = self.today - datetime.timedelta(days=self.active_days)
-        self.recent_changes = list(self.db.query(list="recentchanges", rctype={"edit", "new"}, rcprop={"user", "timestamp"}, rclimit="max", rcstart=self.today, rcend=firstday))
+        recent_changes = self.db.query(list="recentchanges", rctype={"edit", "new"}, rcprop={"user", "timestamp"}, rclimit="max", rcstart=self.today, rcend=firstday)
+        self._recent_edit_counts = dict(collections.Counter(r["user"] for r in recent_changes))
 
         # sort revisions by multiple keys: 1. user, 2. timestamp
         # this way we can group the list by users and iterate through user_revisions
@@ -44,7 +75,160 @@ class UserStatsModules:
         # a list containing revisions made by given user, sorted by timestamp
         self.revisions_groups = {}
         for user, user_revisions in revisions_grouper:
-            self.revisions_groups[user] = list(user_revisions)
+            user_revisions = list(user_revisions)
+            self.revisions_groups[user] = user_revisions
+            self._totals[user] = (len(user_revisions), user_revisions[0]["timestamp"], user_revisions[-1]["timestamp"])
+
+    def _edits_cte(self):
+        """
+        Returns a CTE with the ``user`` and ``timestamp`` columns of all
+        revisions and deleted revisions up to :py:attr:`self.today`.
+        """
+        rev = self.db.revision
+        ar = self.db.archive
+        s1 = sa.select([rev.c.rev_user_text.label("user"), rev.c.rev_timestamp.label("timestamp")]) \
+               .where(rev.c.rev_timestamp <= self.today)
+        s2 = sa.select([ar.c.ar_user_text.label("user"), ar.c.ar_timestamp.label("timestamp")]) \
+               .where(ar.c.ar_timestamp <= self.today)
+        return sa.union_all(s1, s2).cte("edits")
+
+    def _init_sql(self):
+        edits = self._edits_cte()
+
+        # per-user totals
+        s = sa.select([edits.c.user,
+                       sa.func.count(),
+                       sa.func.min(edits.c.timestamp),
+                       sa.func.max(edits.c.timestamp)]) \
+              .group_by(edits.c.user)
+
+        # days with edits of each user
+        day = sa.func.date_trunc("day", edits.c.timestamp)
+        days = sa.select([edits.c.user,
+                          day.label("day"),
+                          sa.func.count().label("editcount"),
+                          sa.func.min(edits.c.timestamp).label("first"),
+                          sa.func.max(edits.c.timestamp).label("last")]) \
+                 .group_by(edits.c.user, day) \
+                 .cte("days")
+
+        self._init_aggregates(s, days)
+
+    def _init_rollup(self):
+        ua = self.db.ws_user_activity
+
+        # days with edits of each user (the time of the edits is not known, so
+        # the first and last timestamps are set to the midnight of the day)
+        day = sa.cast(ua.c.wsua_day, sa.DateTime)
+        days = sa.select([ua.c.wsua_user_text.label("user"),
+                          day.label("day"),
+                          sa.cast(sa.func.sum(ua.c.wsua_edits), sa.Integer).label("editcount"),
+                          day.label("first"),
+                          day.label("last")]) \
+                 .group_by(ua.c.wsua_user_text, ua.c.wsua_day)
+        if self.round_to_midnight:
+            days = days.where(ua.c.wsua_day < self.today.date())
+        else:
+            days = days.where(ua.c.wsua_day <= self.today.date())
+        days = days.cte("days")
+
+        # per-user totals
+        s = sa.select([days.c.user,
+                       sa.cast(sa.func.sum(days.c.editcount), sa.Integer),
+                       sa.func.min(days.c.first),
+                       sa.func.max(days.c.last)]) \
+              .group_by(days.c.user)
+
+        self._init_aggregates(s, days)
+
+    def _is_current(self, last):
+        """
+        Check if a streak ending with the given timestamp is current, i.e. if
+        the last edit has been made at most 24 hours ago (or, when
+        round_to_midnight is True, at most on the previous UTC day).
+        """
+        if self.backend == "rollup":
+            return self.today.date() - last.date() <= datetime.timedelta(days=1)
+        return self.today - last <= datetime.timedelta(days=1)
+
+    def _init_aggregates(self, s_totals, days):
+        """
+        Compute the statistics from the per-user totals and the days with
+        edits, which are given as SQL queries.
+
+        :param s_totals:
+            a select with the user name, edit count, first timestamp and
+            last timestamp columns
+        :param days:
+            a CTE with the ``user``, ``day``, ``editcount``, ``first`` and
+            ``last`` columns, one row per user and day
+        """
+        rc = self.db.recentchanges
+
+        # number of recent edits
+        # (does not include all revisions - "diffable" log events such as
+        # page protection changes or page moves are omitted)
+        firstday = self.today - datetime.timedelta(days=self.active_days)
+        s_recent = sa.select([rc.c.rc_user_text, sa.func.count()]) \
+                     .where(rc.c.rc_type.in_(["edit", "new"])) \
+                     .where(rc.c.rc_timestamp >= firstday) \
+                     .where(rc.c.rc_timestamp <= self.today) \
+                     .group_by(rc.c.rc_user_text)
+
+        # streaks ("gaps and islands"): days with edits are numbered for each
+        # user, consecutive days then have the same difference between the
+        # day and its number
+        number = sa.func.row_number().over(partition_by=days.c.user, order_by=days.c.day)
+        islands = sa.select([days.c.user,
+                             days.c.editcount,
+                             days.c.first,
+                             days.c.last,
+                             (days.c.day - number * sa.literal_column("interval '1 day'")).label("island")]) \
+                    .cte("islands")
+        streaks = sa.select([islands.c.user,
+                             sa.func.sum(islands.c.editcount).label("editcount"),
+                             sa.func.min(islands.c.first).label("first"),
+                             sa.func.max(islands.c.last).label("last")]) \
+                    .group_by(islands.c.user, islands.c.island) \
+                    .cte("streaks")
+        # same as timedelta.days + 1 in the Python implementation
+        length = sa.cast(sa.func.date_part("day", streaks.c.last - streaks.c.first), sa.Integer) + 1
+        columns = [streaks.c.user, length.label("length"), streaks.c.first, streaks.c.last, streaks.c.editcount]
+        # the first of the longest streaks and the last streak of each user
+        s_longest = sa.select(columns) \
+                      .distinct(streaks.c.user) \
+                      .order_by(streaks.c.user, length.desc(), streaks.c.first.asc())
+        s_current = sa.select(columns) \
+                      .distinct(streaks.c.user) \
+                      .order_by(streaks.c.user, streaks.c.first.desc())
+
+        def _streak(row):
+            return {
+                "length": row.length,
+                "start": row.first.date(),
+                "end": row.last.date(),
+                "editcount": int(row.editcount),
+            }
+
+        self._longest_streaks = {}
+        self._current_streaks = {}
+
+        with self.db.engine.connect() as conn:
+            for user, count, first, last in conn.execute(s_totals):
+                self._totals[user] = (count, first, last)
+            for user, count in conn.execute(s_recent):
+                self._recent_edit_counts[user] = count
+            for row in conn.execute(s_longest):
+                self._longest_streaks[row.user] = _streak(row)
+            for row in conn.execute(s_current):
+                if self._is_current(row.last):
+                    self._current_streaks[row.user] = _streak(row)
+
+    def users(self):
+        """
+        Returns the names of all users with at least one edit.
+        """
+        return list(self._totals)
 
     def get_streaks(self, user):
         """
@@ -62,6 +246,11 @@ class UserStatsModules:
                   recorded streak ended more than a day ago, ``current`` is ``None``. When there is
                   no streak recorded, both ``longest`` and ``current`` are ``None``.
         """
+        if self.backend in {"sql", "rollup"}:
+            return self._longest_streaks.get(user), self._current_streaks.get(user)
+        if user not in self.revisions_groups:
+            return None, None
+
         def _streak(revision):
             """ Return streak ID number for given revision.
             """
@@ -139,9 +328,8 @@ class UserStatsModules:
         """
         if registration_timestamp is None:
             return float('nan')
-        revisions = self.revisions_groups[user]
         delta = self.today - registration_timestamp
-        return len(revisions) / (delta.days + 1)
+        return self.total_edit_count(user) / (delta.days + 1)
 
     def active_edits_per_day(self, user):
         """
@@ -149,9 +337,11 @@ class UserStatsModules:
         :returns:
             a ``float`` value of the average edits per day between the first and last edit dates
         """
-        revisions = self.revisions_groups[user]
-        delta = revisions[-1]["timestamp"] - revisions[0]["timestamp"]
-        return len(revisions) / (delta.days + 1)
+        if user not in self._totals:
+            return 0.0
+        count, first, last = self._totals[user]
+        delta = last - first
+        return count / (delta.days + 1)
 
     def total_edit_count(self, user):
         """
@@ -165,10 +355,9 @@ class UserStatsModules:
         moving a page and deleted revisions which were permanently removed from
         the upstream database.
         """
-        if user not in self.revisions_groups:
+        if user not in self._totals:
             return 0
-        revisions = self.revisions_groups[user]
-        return len(revisions)
+        return self._totals[user][0]
 
     def recent_edit_count(self, user):
         """
@@ -181,8 +370,7 @@ class UserStatsModules:
         so "diffable" log events such as page protection changes or page moves
         are omitted.
         """
-        revisions = [r for r in self.recent_changes if r["user"] == user]
-        return len(revisions)
+        return self._recent_edit_counts.get(user, 0)
 
     def active_users_count(self):
         """
@@ -195,8 +383,7 @@ class UserStatsModules:
         so "diffable" log events such as page protection changes or page moves
         are omitted.
         """
-        active_users = set(r["user"] for r in self.recent_changes)
-        return len(active_users)
+        return len(self._recent_edit_counts)
 
     def format_first_date(self, *, format="%Y-%m-%d"):
         firstdate = self.today - datetime.timedelta(days=self.active_days)
@@ -232,7 +419,7 @@ if __name__ == "__main__":
 
     fields = ["User", "Current streak", "Longest streak", "Total avg.", "Active avg."]
     rows = []
-    for user in usm.revisions_groups.keys():
+    for user in usm.users():
         longest, current = usm.get_streaks(user)
         if longest is not None:
             longest = longest["length"]
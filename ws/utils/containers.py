@@ -104,6 +104,40 @@ def gen_nested_values(indict, keys=None):
     else:
         yield keys, indict
 
+def _parse_timestamp(value):
+    """
+    Convert a timestamp string returned by the API to datetime.datetime.
+    Strings which are not timestamps are returned unchanged.
+    """
+    lower = value.lower()
+    if lower == "infinity" or lower == "infinite":
+        return datetime.datetime.max
+    elif lower == "-infinity":
+        return datetime.datetime.min
+    elif lower == "indefinite":
+        return None
+    elif (len(value) == 20 and value[4] == "-" and value[7] == "-" and
+            value[10] == "T" and value[13] == ":" and value[16] == ":"
+            and value[19] == "Z"):
+        try:
+            return parse_date(value)
+        except ValueError:
+            pass
+    return value
+
+def _is_timestamp_key(key):
+    # skip fields which are not timestamps (e.g. user=infinity)
+    return "timestamp" in key or "registration" in key or "expiry" in key or "touched" in key
+
+def _parse_timestamps_in_value(value):
+    if isinstance(value, str):
+        return _parse_timestamp(value)
+    elif isinstance(value, dict):
+        return dict((k, _parse_timestamps_in_value(v)) for k, v in value.items())
+    elif isinstance(value, list):
+        return [_parse_timestamps_in_value(v) for v in value]
+    return value
+
 def parse_timestamps_in_struct(struct):
     """
     Convert all timestamps in a nested structure from str to
@@ -116,30 +150,32 @@ def parse_timestamps_in_struct(struct):
 
     for keys, value in gen_nested_values(struct):
         if isinstance(value, str):
-            # skip fields which are not timestamps (e.g. user=infinity)
             _strkeys = "".join(str(k) for k in keys)
-            if "timestamp" not in _strkeys and "registration" not in _strkeys and "expiry" not in _strkeys and "touched" not in _strkeys:
+            if not _is_timestamp_key(_strkeys):
                 continue
 
-            if value.lower() == "infinity" or value.lower() == "infinite":
-                set_ts(struct, keys, datetime.datetime.max)
-            elif value.lower() == "-infinity":
-                set_ts(struct, keys, datetime.datetime.min)
-            elif value.lower() == "indefinite":
-                set_ts(struct, keys, None)
-            elif (len(value) == 20 and value[4] == "-" and value[7] == "-" and
-                    value[10] == "T" and value[13] == ":" and value[16] == ":"
-                    and value[19] == "Z"):
-                try:
-                    ts = parse_date(value)
-                except ValueError:
-                    continue
+            ts = _parse_timestamp(value)
+            if ts is not value:
                 set_ts(struct, keys, ts)
 
+def timestamps_object_hook(dct):
+    """
+    An ``object_hook`` for :py:func:`json.loads` which converts timestamps
+    from str to datetime.datetime while the JSON document is being decoded.
+
+    The result is the same as if :py:func:`parse_timestamps_in_struct` was
+    called on the decoded structure, but only the values of keys related to
+    timestamps are inspected, so it is much faster for large API responses.
+    """
+    for key, value in dct.items():
+        if _is_timestamp_key(key):
+            dct[key] = _parse_timestamps_in_value(value)
+    return dct
+
 def serialize_timestamps_in_struct(struct):
     """
-    Convert all timestamps in a nested structure from str to
-    datetime.datetime.
+    Convert all timestamps in a nested structure from datetime.datetime
+    to str.
     """
     def set_ts(struct, keys, value):
         for k in keys[:-1]:
@@ -149,3 +185,19 @@ def serialize_timestamps_in_struct(struct):
     for keys, value in gen_nested_values(struct):
         if isinstance(value, datetime.datetime):
             set_ts(struct, keys, format_date(value))
+
+def serialize_timestamps_in_params(params):
+    """
+    Return a shallow copy of a flat dictionary of API parameters with all
+    timestamps converted from datetime.datetime to str. Timestamps in list
+    or tuple values are converted as well. The original dictionary is not
+    modified.
+    """
+    def serialize(value):
+        if isinstance(value, datetime.datetime):
+            return format_date(value)
+        elif isinstance(value, (list, tuple)):
+            return [serialize(v) for v in value]
+        return value
+
+    return dict((key, serialize(value)) for key, value in params.items())
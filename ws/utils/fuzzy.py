@@ -0,0 +1,114 @@
+#! /usr/bin/env python3
+
+"""
+:py:class:`FuzzyIndex` is an index for approximate string matching, e.g. for
+suggesting the most similar titles or section anchors for a broken link.
+
+The strings are indexed by their character trigrams (after normalization and
+padding). A search considers only the strings which share at least one trigram
+with the key, so it does not have to compare the key with every indexed
+string. The candidates are ranked by the similarity ratio of
+:py:class:`difflib.SequenceMatcher`, cheaper upper bounds of the ratio are used
+to skip the candidates which can't reach the cutoff.
+
+.. code-block:: python
+
+    index = FuzzyIndex(["Installation guide", "General recommendations"])
+    index.search("Instalation guide", limit=1)
+    # [("Installation guide", 0.9714285714285714)]
+
+Note that the strings without a common trigram with the key are never
+returned, even if their ratio is above the cutoff. This does not happen with
+natural text for cutoffs greater than about 0.8.
+"""
+
+import collections
+import difflib
+import heapq
+
+__all__ = ["FuzzyIndex"]
+
+def trigrams(text):
+    """
+    Returns the set of character trigrams of a (normalized) string. The string
+    is padded with two spaces at the beginning and one at the end, so that
+    even short strings have some trigrams and matching prefixes weigh more.
+    """
+    padded = "  " + text + " "
+    return {padded[i:i+3] for i in range(len(padded) - 2)}
+
+class FuzzyIndex:
+    """
+    Trigram index for approximate string matching.
+
+    :param iterable: strings to be indexed
+    :param normalize:
+        a function applied to the indexed strings and keys before extracting
+        the trigrams (the similarity ratio is computed from the original
+        strings)
+    """
+    def __init__(self, iterable=(), *, normalize=str.lower):
+        self.normalize = normalize
+        self._items = []
+        self._ids = {}
+        # mapping of trigrams to the lists of item IDs
+        self._postings = collections.defaultdict(list)
+        for item in iterable:
+            self.add(item)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, item):
+        return item in self._ids
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def add(self, item):
+        """
+        Add a string to the index. Duplicates are ignored.
+        """
+        if item in self._ids:
+            return
+        id_ = len(self._items)
+        self._items.append(item)
+        self._ids[item] = id_
+        for trigram in trigrams(self.normalize(item)):
+            self._postings[trigram].append(id_)
+
+    def candidates(self, key):
+        """
+        Returns a list of the indexed strings which share at least one trigram
+        with the key, ordered by the number of common trigrams.
+        """
+        counts = collections.Counter()
+        for trigram in trigrams(self.normalize(key)):
+            counts.update(self._postings.get(trigram, ()))
+        return [self._items[id_] for id_, _ in counts.most_common()]
+
+    def search(self, key, *, limit=10, cutoff=0.0):
+        """
+        Find the indexed strings most similar to the key.
+
+        :param str key: the string to search for
+        :param int limit: maximum number of results (``None`` for all)
+        :param float cutoff: minimum similarity ratio of the results
+        :returns:
+            a list of ``(item, ratio)`` tuples sorted by ``ratio`` in
+            descending order, where ``ratio`` is the similarity ratio of
+            :py:class:`difflib.SequenceMatcher`
+        """
+        sm = difflib.SequenceMatcher(b=key)
+        ranks = []
+        for item in self.candidates(key):
+            sm.set_seq1(item)
+            if sm.real_quick_ratio() < cutoff or sm.quick_ratio() < cutoff:
+                continue
+            ratio = sm.ratio()
+            if ratio >= cutoff:
+                ranks.append( (item, ratio) )
+        if limit is None:
+            ranks.sort(key=lambda match: match[1], reverse=True)
+            return ranks
+        return heapq.nlargest(limit, ranks, key=lambda match: match[1])
@@ -10,7 +10,7 @@ class DatetimeEncoder(json.JSONEncoder):
             isinstance(obj, datetime.timedelta)):
             return repr(obj)
         else:
-            return super(DateTimeEncoder, self).default(obj)
+            return super(DatetimeEncoder, self).default(obj)
 
 def datetime_parser(dct):
     for k, v in dct.items():
@@ -32,3 +32,104 @@ def datetime_parser(dct):
             elif v.startswith("datetime.timedelta("):
                 dct[k] = datetime.timedelta(*args)
     return dct
+
+class _ObjectBuilder:
+    """
+    Builds Python objects from the events generated by :py:func:`ijson.parse`,
+    the ``object_hook`` is applied to every completed JSON object like in
+    :py:func:`json.loads`.
+    """
+    def __init__(self, object_hook=None):
+        self.object_hook = object_hook
+        self.containers = []
+        self.keys = []
+        self.value = None
+
+    def _attach(self, value):
+        if not self.containers:
+            self.value = value
+        elif isinstance(self.containers[-1], list):
+            self.containers[-1].append(value)
+        else:
+            self.containers[-1][self.keys[-1]] = value
+
+    def event(self, event, value):
+        if event == "map_key":
+            self.keys[-1] = value
+        elif event == "start_map" or event == "start_array":
+            self.containers.append({} if event == "start_map" else [])
+            self.keys.append(None)
+        elif event == "end_map" or event == "end_array":
+            obj = self.containers.pop()
+            self.keys.pop()
+            if event == "end_map" and self.object_hook is not None:
+                obj = self.object_hook(obj)
+            self._attach(obj)
+        else:
+            self._attach(value)
+
+def iter_json_items(chunks, path, *, object_hook=None):
+    """
+    Incrementally decode a JSON document and yield the items of the array or
+    object located at ``path`` as soon as they are complete. Only one item is
+    kept in memory at a time.
+
+    Requires the :py:mod:`ijson` module.
+
+    :param chunks: an iterable of :py:class:`bytes` forming the JSON document
+                   (e.g. :py:meth:`requests.Response.iter_content`)
+    :param str path: dot-separated path of the container in the document,
+                     e.g. ``"query.pages"``
+    :param object_hook: same as for :py:func:`json.loads`
+    :yields: the items of an array or the values of an object at ``path``
+    :returns: the rest of the document, with an empty container at ``path``
+              (it is the value of the :py:exc:`StopIteration` exception, so
+              it can be obtained with ``rest = yield from iter_json_items(...)``)
+    """
+    # lazy import - ijson is an optional dependency
+    import ijson
+
+    def gen_events():
+        events = ijson.sendable_list()
+        coro = ijson.parse_coro(events, use_float=True)
+        for chunk in chunks:
+            coro.send(chunk)
+            yield from events
+            del events[:]
+        coro.close()
+        yield from events
+
+    rest = _ObjectBuilder(object_hook)
+    # builder of the current item and the nesting level inside the item
+    item = None
+    depth = 0
+    # whether we are directly inside the container at path
+    inside = False
+
+    for prefix, event, value in gen_events():
+        if item is not None:
+            item.event(event, value)
+            if event == "start_map" or event == "start_array":
+                depth += 1
+            elif event == "end_map" or event == "end_array":
+                depth -= 1
+                if depth == 0:
+                    yield item.value
+                    item = None
+        elif inside is True:
+            if prefix == path and (event == "end_map" or event == "end_array"):
+                inside = False
+                rest.event(event, value)
+            elif event == "start_map" or event == "start_array":
+                item = _ObjectBuilder(object_hook)
+                item.event(event, value)
+                depth = 1
+            elif event != "map_key":
+                # scalar item
+                yield value
+        else:
+            rest.event(event, value)
+            if prefix == path and (event == "start_map" or event == "start_array"):
+                inside = True
+
+    return rest.value
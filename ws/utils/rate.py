@@ -24,10 +24,14 @@ Or at runtime by wrapping the function call:
 
     # allow at most 10 calls in 2 seconds
     wrapped = RateLimited(10, 2)(PrintNumber)
+
+The decorated function can be called from multiple threads, the limit applies
+to all calls together.
 """
 
 from functools import wraps
 import time
+import threading
 import logging
 
 import ws
@@ -36,12 +40,19 @@ logger = logging.getLogger(__name__)
 
 __all__ = ["RateLimited"]
 
+# Functions called as ``callback(qualname, seconds)`` whenever a rate-limited
+# function sleeps. Used for instrumentation, see ws.client.instrumentation.
+sleep_callbacks = []
+
 def RateLimited(rate, per):
     def decorator(func):
         # globals for the decorator
         # defined as lists to avoid problems with the 'global' keyword
         allowance = [rate]
+        # time of the last granted call (may be in the future when the calls
+        # of other threads are waiting)
         last_check = [time.time()]
+        lock = threading.Lock()
 
         @wraps(func)
         def rate_limit_func(*args, **kargs):
@@ -49,24 +60,29 @@ def RateLimited(rate, per):
             if hasattr(ws, "_tests_are_running"):
                 return func(*args, **kargs)
 
-            current = time.time()
-            time_passed = current - last_check[0]
-            last_check[0] = current
-            allowance[0] += time_passed * (rate / per)
-            if allowance[0] > rate:
-                allowance[0] = rate    # throttle
-            if allowance[0] < 1.0:
-                # the original used    to_sleep = (1 - allowance[0]) * (per / rate)
-                # but we want longer timeout after burst limit is exceeded
-                to_sleep = (1 - allowance[0]) * per
-                logger.info("rate limit for function {} exceeded, sleeping for {:0.3f} seconds".format(func.__qualname__, to_sleep))
+            # reserve the call before sleeping or calling the function
+            with lock:
+                now = time.time()
+                current = max(now, last_check[0])
+                allowance[0] += (current - last_check[0]) * (rate / per)
+                if allowance[0] > rate:
+                    allowance[0] = rate    # throttle
+                if allowance[0] < 1.0:
+                    # the original used    to_sleep = (1 - allowance[0]) * (per / rate)
+                    # but we want longer timeout after burst limit is exceeded
+                    current += (1 - allowance[0]) * per
+                    allowance[0] = rate
+                    logger.info("rate limit for function {} exceeded, sleeping for {:0.3f} seconds".format(func.__qualname__, current - now))
+                else:
+                    allowance[0] -= 1.0
+                last_check[0] = current
+                to_sleep = current - now
+
+            if to_sleep > 0:
+                for callback in sleep_callbacks:
+                    callback(func.__qualname__, to_sleep)
                 time.sleep(to_sleep)
-                ret = func(*args, **kargs)
-                allowance[0] = rate
-            else:
-                ret = func(*args, **kargs)
-                allowance[0] -= 1.0
-            return ret
+            return func(*args, **kargs)
 
         return rate_limit_func
 